@@ -0,0 +1,106 @@
+import argparse
+import timeit
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, get_type_hints, get_args
+
+from turns_app.model.turns import Turn
+
+
+@dataclass
+class LegacyBaseDataclass:
+    """BaseDataclass before the cached codecs, resolving the type hints on every call"""
+
+    @classmethod
+    def from_dict(cls, values: dict[str, Any]) -> 'LegacyBaseDataclass':
+        hints = get_type_hints(cls)
+        constructor_args = {key: value for key, value in values.items()
+                            if key in hints}
+
+        init_args = {}
+        for key, value in constructor_args.items():
+            attr_type = hints[key]
+            if issubclass(attr_type, LegacyBaseDataclass):
+                init_args[key] = attr_type.from_dict(value)
+            else:
+                init_args[key] = value
+
+        # noinspection PyArgumentList
+        return cls(**init_args)
+
+    def __post_init__(self):
+        hints = get_type_hints(self)
+        for attr, attr_type in hints.items():
+            value = getattr(self, attr)
+            if hasattr(attr_type, "__origin__") and attr_type.__origin__ == list:
+                inner_type = get_args(attr_type)[0]
+                if not all(isinstance(item, inner_type) for item in value):
+                    raise TypeError(f"Attribute '{attr}' must be a list of type '{inner_type}'")
+            elif not isinstance(value, attr_type):
+                raise TypeError(f"Attribute '{attr}' must be of type '{attr_type}', got '{type(value)}'")
+
+    def to_dict(self) -> dict[str, Any]:
+        hints = get_type_hints(self.__class__)
+        result = {}
+        for key, attr_type in hints.items():
+            value = getattr(self, key)
+            if issubclass(attr_type, LegacyBaseDataclass):
+                result[key] = value.to_dict()
+            else:
+                result[key] = value
+
+        return result
+
+
+@dataclass
+class LegacyNamedUser(LegacyBaseDataclass):
+    id: str
+    name: str
+
+
+@dataclass
+class LegacyTurn(LegacyBaseDataclass):
+    idx: str
+    start_time: datetime
+    end_time: datetime
+    user: LegacyNamedUser
+    office_id: str
+
+
+TURN_DICT = {
+    "idx": "TURN-26.02.2024-08.00-OFF_01",
+    "start_time": datetime(2024, 2, 26, 8, 0),
+    "end_time": datetime(2024, 2, 26, 10, 0),
+    "user": {"id": "USER_01", "name": "Virginia D'Espósito"},
+    "office_id": "OFF_01"
+}
+
+
+def best_time(statement, number: int, repeat: int = 5) -> float:
+    """Best time per call in microseconds"""
+    return min(timeit.repeat(statement, number=number, repeat=repeat)) / number * 1e6
+
+
+def run(number: int) -> dict[str, tuple[float, float]]:
+    legacy_turn = LegacyTurn.from_dict(TURN_DICT)
+    turn = Turn.from_dict(TURN_DICT)
+
+    return {
+        "from_dict": (best_time(lambda: LegacyTurn.from_dict(TURN_DICT), number),
+                      best_time(lambda: Turn.from_dict(TURN_DICT), number)),
+        "to_dict": (best_time(legacy_turn.to_dict, number),
+                    best_time(turn.to_dict, number)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the cached codecs with the previous BaseDataclass")
+    parser.add_argument("--number", type=int, default=10000, help="Calls per measurement")
+    args = parser.parse_args()
+
+    for name, (legacy, current) in run(args.number).items():
+        print(f"Turn.{name}: legacy {legacy:.2f} us, codec {current:.2f} us, speedup x{legacy / current:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import json
+
+from turns_app.model.turns import Turn, make_week_dict, make_raw_week_dict
+from turns_app.model.users import User
+from turns_app.utils.json_utils import JSON_BACKENDS, get_json_backend
+from turns_app.utils.time_utils import get_week_by_day, days_in_range
+from tests.benchmarks.bench_week_grouping import WEEK_DAY, week_turns, best_time
+
+
+class LegacyJSONEncoder(json.JSONEncoder):
+    """The encoder that api_service.py installed globally as json.JSONEncoder"""
+    def default(self, obj):
+        if isinstance(obj, Turn):
+            return obj.to_str_dict()
+        if isinstance(obj, User):
+            return obj.to_dict()
+        return json.JSONEncoder.default(self, obj)
+
+
+def run(size: int) -> dict[str, float]:
+    week_days = days_in_range(get_week_by_day(WEEK_DAY))
+    turns = week_turns(size)
+    week = make_week_dict(turns, week_days)
+    raw_week = make_raw_week_dict((turn.to_dict() for turn in turns), week_days)
+
+    results = {
+        "legacy encoder (Turns)": best_time(lambda: json.dumps(week, cls=LegacyJSONEncoder)),
+        "legacy encoder (response shape)": best_time(lambda: json.dumps(raw_week, cls=LegacyJSONEncoder)),
+    }
+    for name in JSON_BACKENDS:
+        try:
+            backend = get_json_backend(name)
+        except RuntimeError as e:
+            print(f"Skipping the {name} backend: {e}")
+            continue
+        results[f"{name} backend (Turns)"] = best_time(lambda: backend.dumps(week))
+        results[f"{name} backend (response shape)"] = best_time(lambda: backend.dumps(raw_week))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the JSON backends serializing a week of turns")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000], help="Turns in the week")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        print(f"{size} turns")
+        for name, elapsed in run(size).items():
+            print(f"  {name}: {elapsed:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+import argparse
+import dataclasses
+import json
+import platform
+import statistics
+import sys
+import timeit
+from collections import defaultdict
+from contextlib import contextmanager, ExitStack
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from tests.benchmarks.bench_week_grouping import WEEK_DAY, week_turns
+from tests.defaults import TEST_CONFIG_PATH, TEST_USERS_FILE
+from turns_app.model.turns import Turn, MongoTurnsManager, TurnNotAvailableError, turn_from_source_dict, \
+    make_week_dict, get_week_turns, turn_id_generator, business_slot_minutes
+from turns_app.model.users import NamedUser
+from turns_app.utils.config_utils import AppConfig, load_app_config_from_toml, close_mongo_clients
+from turns_app.utils.time_utils import DATETIME_FORMAT, get_week_by_day, days_in_range
+
+# Recorded on each machine with --save, the times of another machine are not comparable
+BASELINES_PATH = Path(__file__).parent / "baselines.json"
+BENCHMARK_DB = "turns_app-benchmark"
+# A case regresses when it is slower than its baseline by more than this fraction, or by more than
+# NOISE_FACTOR times the spread of its rounds when the case is noisier than that
+DEFAULT_THRESHOLD = 0.1
+NOISE_FACTOR = 2
+# Cases faster than this, in milliseconds, are timer noise and are not compared
+MIN_COMPARED_TIME = 0.01
+BACKENDS = ["mongomock", "mongod"]
+REPEAT = 5
+DEFAULT_ROUNDS = 3
+
+
+@dataclass
+class Case:
+    name: str
+    function: Callable[[], Any]
+
+
+@dataclass
+class Timing:
+    best: float   # Median of the best time per call of each round, in milliseconds
+    noise: float  # Spread of the rounds: the slowest minus the fastest, as a fraction of the median
+
+    @classmethod
+    def from_rounds(cls, times: list[float]) -> 'Timing':
+        best = statistics.median(times)
+        return cls(best, (max(times) - min(times)) / best)
+
+
+def best_time(function: Callable[[], Any]) -> float:
+    """Best time per call in milliseconds, with enough calls in each timing to last at least 0.2 seconds"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=REPEAT, number=number)) / number * 1e3
+
+
+@contextmanager
+def benchmark_config(backend: str) -> Iterator[AppConfig]:
+    """The test config over the benchmark database, in a local mongod or in memory with mongomock"""
+    with ExitStack() as stack:
+        app_config = load_app_config_from_toml(TEST_CONFIG_PATH)
+        app_config.mongo = dataclasses.replace(app_config.mongo, db_name=BENCHMARK_DB)
+        if backend == "mongomock":
+            try:
+                import mongomock
+            except ImportError as e:
+                raise ImportError("The mongomock backend needs mongomock, install it with 'pip install mongomock'") \
+                    from e
+            # The clients are created on first use, so they are created by the patched pymongo.MongoClient
+            stack.enter_context(mongomock.patch(servers=((app_config.mongo.server, app_config.mongo.port),)))
+
+        close_mongo_clients()
+        try:
+            yield app_config
+        finally:
+            app_config.mongo.client.drop_database(BENCHMARK_DB)
+            close_mongo_clients()
+
+
+def benchmark_turns(size: int) -> list[Turn]:
+    """The turns of week_turns with a user per office, so none of them conflict"""
+    return [dataclasses.replace(turn, user=NamedUser(id=f"USER_{turn.office_id}", name=f"User {turn.office_id}"))
+            for turn in week_turns(size)]
+
+
+def source_record(turn: Turn) -> dict[str, Any]:
+    """The turn as found in the JSON exports"""
+    return {
+        "idx": turn.idx,
+        "start_date": turn.start_time.strftime(DATETIME_FORMAT),
+        "end_date": turn.end_time.strftime(DATETIME_FORMAT),
+        "user": turn.user.to_dict(),
+        "office_id": turn.office_id,
+    }
+
+
+def model_cases(size: int) -> list[Case]:
+    week_days = days_in_range(get_week_by_day(WEEK_DAY))
+    turns = benchmark_turns(size)
+    documents = [turn.to_dict() for turn in turns]
+    records = [source_record(turn) for turn in turns]
+
+    return [
+        Case("Turn.from_dict", lambda: [Turn.from_dict(document) for document in documents]),
+        Case("Turn.to_dict", lambda: [turn.to_dict() for turn in turns]),
+        Case("turn_from_source_dict", lambda: [turn_from_source_dict(record) for record in records]),
+        Case("make_week_dict", lambda: make_week_dict(turns, week_days)),
+    ]
+
+
+def insert_conflict(manager: MongoTurnsManager, turn: Turn) -> None:
+    try:
+        manager.insert_turn(turn)
+    except TurnNotAvailableError:
+        pass
+    else:
+        raise AssertionError(f"The turn {turn.idx} should conflict")
+
+
+def query_cases(app_config: AppConfig, size: int) -> list[Case]:
+    turns = benchmark_turns(size)
+    slot_minutes = business_slot_minutes(app_config.business)
+    manager = MongoTurnsManager(app_config.mongo, slot_minutes)
+    manager.collection.drop()
+    manager.ensure_indexes()
+    manager.insert_turns(turns)
+
+    indexed_manager = MongoTurnsManager(app_config.mongo, slot_minutes)
+    indexed_manager.load_schedule_index(get_week_by_day(WEEK_DAY))
+
+    # The time of the first turn of the week, in the same office, and a free time
+    taken = dataclasses.replace(turns[0], user=NamedUser(id="USER_OTHER", name="Other User"))
+    free_start = WEEK_DAY + timedelta(days=6, hours=22)
+    free = dataclasses.replace(turns[0], idx=turn_id_generator(free_start, turns[0].office_id),
+                               start_time=free_start, end_time=free_start + timedelta(minutes=30))
+
+    return [
+        Case("get_week_turns", lambda: get_week_turns(manager, WEEK_DAY)),
+        Case("get_week_turns raw", lambda: get_week_turns(manager, WEEK_DAY, raw=True)),
+        Case("conflict_turn taken (database)", lambda: manager.conflict_turn(taken)),
+        Case("conflict_turn free (database)", lambda: manager.conflict_turn(free)),
+        Case("insert_turn conflict (schedule index)", lambda: insert_conflict(indexed_manager, taken)),
+    ]
+
+
+def api_cases(app_config: AppConfig, size: int) -> list[Case]:
+    from turns_app.api_service import create_app
+
+    # The week of the query cases, and the users of the tests
+    users = json.loads(TEST_USERS_FILE.read_text())
+    app_config.mongo.db.users.drop()
+    app_config.mongo.db.users.insert_many(users)
+
+    client = create_app(app_config=app_config).test_client()
+    week_url = f"/turns/get_week?day={WEEK_DAY:%d.%m.%Y}"
+    etag = client.get(week_url).headers["ETag"]
+
+    return [
+        Case("GET /turns/get_week (cached)", lambda: client.get(week_url)),
+        Case("GET /turns/get_week (not modified)", lambda: client.get(week_url, headers={"If-None-Match": etag})),
+        Case("GET /turns/get_week stream", lambda: client.get(week_url + "&stream=ndjson").get_data()),
+        Case("GET /users/get_users", lambda: client.get("/users/get_users")),
+        Case("GET /business_info", lambda: client.get("/business_info")),
+    ]
+
+
+def run(backend: str, sizes: list[int], name_filter: str | None = None,
+        rounds: int = DEFAULT_ROUNDS) -> dict[str, Timing]:
+    """
+    Timing of every case and size, named as 'case[size]'.
+    The rounds time all the cases one after the other, so a slow period of the machine
+    shows up as the spread of every case instead of as the slowdown of a few of them.
+    """
+    times = defaultdict(list)
+    with benchmark_config(backend) as app_config:
+        for size in sizes:
+            cases = model_cases(size) + query_cases(app_config, size) + api_cases(app_config, size)
+            cases = [case for case in cases if name_filter is None or name_filter in f"{case.name}[{size}]"]
+            for _ in range(rounds):
+                for case in cases:
+                    times[f"{case.name}[{size}]"].append(best_time(case.function))
+    return {name: Timing.from_rounds(case_times) for name, case_times in times.items()}
+
+
+def load_baselines() -> dict[str, Any]:
+    if not BASELINES_PATH.exists():
+        return {}
+    return json.loads(BASELINES_PATH.read_text(encoding="utf-8"))
+
+
+def save_baselines(backend: str, results: dict[str, Timing]) -> None:
+    baselines = load_baselines()
+    baselines[backend] = {
+        "machine": f"{platform.machine()} {platform.system()}, Python {platform.python_version()}",
+        "results": {**baselines.get(backend, {}).get("results", {}),
+                    **{name: {"best": round(timing.best, 5), "noise": round(timing.noise, 4)}
+                       for name, timing in results.items()}}
+    }
+    BASELINES_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def case_threshold(timing: Timing, baseline: Timing, min_threshold: float) -> float:
+    """Slowdown over the baseline, as a fraction, that the noise of the case can not explain"""
+    return max(min_threshold, NOISE_FACTOR * max(timing.noise, baseline.noise))
+
+
+def compare(results: dict[str, Timing], baselines: dict[str, dict[str, float]], min_threshold: float) -> list[str]:
+    """Print the results next to their baselines and return the names of the regressed cases"""
+    regressions = []
+    width = max(len(name) for name in results)
+    for name, timing in results.items():
+        line = f"  {name:<{width}}  {timing.best:9.4f} ms  ±{timing.noise:4.0%}"
+        if timing.best < MIN_COMPARED_TIME:
+            print(f"{line}  (too fast to compare)")
+            continue
+        if name not in baselines:
+            print(f"{line}  (no baseline)")
+            continue
+
+        baseline = Timing(**baselines[name])
+        threshold = case_threshold(timing, baseline, min_threshold)
+        ratio = timing.best / baseline.best
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{line}  baseline {baseline.best:9.4f} ms  x{ratio:.2f} (limit x{1 + threshold:.2f})"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the model, query and API hot paths against baselines")
+    parser.add_argument("--backend", choices=BACKENDS, default="mongomock",
+                        help="Database: in memory with mongomock, or the mongod of the test config")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000], help="Turns in the benchmark week")
+    parser.add_argument("--filter", type=str, default=None, help="Only run the cases whose name contains it")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Smallest slowdown over the baseline, as a fraction, that fails the run. "
+                             "Noisy cases need a larger slowdown, see NOISE_FACTOR")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS,
+                        help="Times that every case is timed, their spread is the noise of the case")
+    parser.add_argument("--save", action="store_true", help="Store the results as the baselines of the backend")
+    args = parser.parse_args()
+
+    results = run(args.backend, args.sizes, args.filter, args.rounds)
+    if not results:
+        print(f"No cases match '{args.filter}'")
+        return
+    if args.save:
+        save_baselines(args.backend, results)
+        print(f"Saved {len(results)} baselines of {args.backend} to {BASELINES_PATH}")
+
+    # The baselines are only comparable on the machine that recorded them, record them with --save
+    baselines = load_baselines().get(args.backend, {})
+    print(f"{args.backend} baselines recorded on {baselines.get('machine', 'no machine')}")
+    regressions = compare(results, baselines.get("results", {}), args.threshold)
+    if regressions:
+        print(f"{len(regressions)} cases are slower than their baselines by more than their noise")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+
+from tests.benchmarks.bench_dataclass_utils import LegacyTurn
+from turns_app.model.turns import Turn, TurnsInterner, turn_id_generator
+
+
+def month_documents(offices: int, users: int, days: int = 30, turns_per_day: int = 12) -> list[dict]:
+    """Turn documents of a month for a clinic, as read from Mongo"""
+    documents = []
+    month_start = datetime(2024, 2, 1, 8, 0)
+    for day in range(days):
+        for office in range(offices):
+            office_id = f"OFF_{office:02d}"
+            for module in range(turns_per_day):
+                start_time = month_start + timedelta(days=day, hours=module)
+                user = (day + office + module) % users
+                documents.append({
+                    "idx": turn_id_generator(start_time, office_id),
+                    "start_time": start_time,
+                    "end_time": start_time + timedelta(hours=1),
+                    # Every document has its own strings, as decoded by the driver
+                    "user": {"id": "".join(["USER_", str(user)]), "name": " ".join(["User", str(user)])},
+                    "office_id": "".join(["OFF_", f"{office:02d}"])
+                })
+    return documents
+
+
+def measure(build) -> int:
+    """Bytes allocated by the objects returned by build"""
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def run(offices: int, users: int) -> dict[str, tuple[int, int]]:
+    documents = month_documents(offices, users)
+
+    def interned():
+        interner = TurnsInterner()
+        return [interner.turn(document) for document in documents]
+
+    return {
+        "dict dataclass": (len(documents), measure(lambda: [LegacyTurn.from_dict(d) for d in documents])),
+        "slotted": (len(documents), measure(lambda: [Turn.from_dict(d) for d in documents])),
+        "slotted + interned": (len(documents), measure(interned)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the memory used by a month of turns")
+    parser.add_argument("--offices", type=int, default=20, help="Number of offices of the clinic")
+    parser.add_argument("--users", type=int, default=12, help="Number of professionals")
+    args = parser.parse_args()
+
+    for name, (turns, size) in run(args.offices, args.users).items():
+        print(f"{name}: {turns} turns, {size / 1024:.0f} KiB, {size / turns:.0f} bytes per turn")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import timeit
+from datetime import datetime, timedelta
+
+from pymongo.errors import PyMongoError
+
+from tests.defaults import TEST_CONFIG_PATH
+from turns_app.model.turns import Turn, make_week_dict, make_raw_week_dict, make_raw_week_dict_from_groups, \
+    turn_id_generator, WEEK_TURN_PROJECTION, WeekTurns
+from turns_app.model.users import NamedUser
+from turns_app.utils.config_utils import load_app_config_from_toml
+from turns_app.utils.mongo_utils import turns_by_day_pipeline
+from turns_app.utils.time_utils import DATE_FORMAT, Day, get_week_by_day, days_in_range
+
+WEEK_DAY = datetime(2024, 2, 26)
+BENCHMARK_COLLECTION = "benchmark_turns"
+
+
+def legacy_make_week_dict(turns: list[Turn], week_days: list[Day]) -> WeekTurns:
+    """make_week_dict before grouping by day offsets, formatting every start time"""
+    week_days_names = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+    week_dict = {day: {"turns": [], "date": date} for day, date in zip(week_days_names, week_days)}
+    for turn in turns:
+
+        day = turn.start_time.strftime("%A").lower()
+        date = turn.start_time.strftime(DATE_FORMAT)
+
+        if week_dict[day]["date"] != date:
+            raise ValueError(f"There are turns from two different weeks in the list. "
+                             f"Turns must be from the same week.")
+
+        week_dict[day]["turns"].append(turn)
+
+    return week_dict
+
+
+def week_turns(size: int) -> list[Turn]:
+    """A week with `size` turns of 30 minutes spread over the days and offices"""
+    user = NamedUser(id="USER_01", name="Benchmark User")
+    turns = []
+    for i in range(size):
+        start_time = WEEK_DAY + timedelta(days=i % 7, hours=8, minutes=30 * (i // 7 % 26))
+        office_id = f"OFF_{i // 182:03d}"
+        turns.append(Turn(idx=turn_id_generator(start_time, office_id), start_time=start_time,
+                          end_time=start_time + timedelta(minutes=30), user=user, office_id=office_id))
+    return turns
+
+
+def best_time(statement, number: int = 20, repeat: int = 5) -> float:
+    """Best time per call in milliseconds"""
+    return min(timeit.repeat(statement, number=number, repeat=repeat)) / number * 1e3
+
+
+def run(size: int, with_mongo: bool) -> dict[str, float]:
+    week = get_week_by_day(WEEK_DAY)
+    week_days = days_in_range(week)
+    turns = week_turns(size)
+    documents = [turn.to_dict() for turn in turns]
+
+    results = {
+        "strftime grouper (Turns)": best_time(lambda: legacy_make_week_dict(turns, week_days)),
+        "day offset grouper (Turns)": best_time(lambda: make_week_dict(turns, week_days)),
+        "day offset grouper + response shape (documents)": best_time(lambda: make_raw_week_dict(documents, week_days)),
+    }
+
+    if with_mongo:
+        collection = load_app_config_from_toml(TEST_CONFIG_PATH).mongo.db[BENCHMARK_COLLECTION]
+        try:
+            collection.drop()
+            collection.insert_many(documents)
+            pipeline = turns_by_day_pipeline(week, WEEK_TURN_PROJECTION)
+            find_query = {"start_time": {"$lt": week.end_time}, "end_time": {"$gt": week.start_time}}
+
+            results["find + day offset grouper"] = best_time(
+                lambda: make_raw_week_dict(collection.find(find_query, WEEK_TURN_PROJECTION), week_days), number=5)
+            results["$group aggregation"] = best_time(
+                lambda: make_raw_week_dict_from_groups(
+                    {group["_id"]: group["turns"] for group in collection.aggregate(pipeline)}, week_days), number=5)
+        except PyMongoError as e:
+            print(f"Skipping the Mongo benchmarks: {e}")
+        finally:
+            collection.drop()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the ways of grouping a week of turns by day")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000], help="Turns in the week")
+    parser.add_argument("--mongo", action="store_true", help="Also benchmark against the test mongod")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        print(f"{size} turns")
+        for name, elapsed in run(size, args.mongo).items():
+            print(f"  {name}: {elapsed:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,9 +3,10 @@ import json
 import pytest
 
 from tests.defaults import TEST_CONFIG_PATH, TEST_TURNS_FILE, TEST_USERS_FILE
-from turns_app.model.turns import turn_from_source_dict
-from turns_app.model.users import User
+from turns_app.model.turns import MongoTurnsManager, business_slot_minutes
+from turns_app.model.users import User, MongoUsersManager
 from turns_app.utils.config_utils import AppConfig, load_app_config_from_toml
+from turns_app.utils.import_utils import iter_json_records
 
 
 def get_test_config() -> AppConfig:
@@ -18,16 +19,21 @@ def test_config() -> AppConfig:
     return get_test_config()
 
 
+def make_turns_manager(config: AppConfig) -> MongoTurnsManager:
+    """A turns manager with the slots of the business, as the API writes them"""
+    return MongoTurnsManager(config.mongo, business_slot_minutes(config.business))
+
+
 def init_database(config):
     mongo_config = config.mongo
 
     mongo_config.db.drop_collection('turns')
     mongo_config.db.drop_collection('users')
+    turns_manager = make_turns_manager(config)
+    turns_manager.ensure_indexes()
+    MongoUsersManager(mongo_config).ensure_indexes()
 
-    with open(TEST_TURNS_FILE, "r", encoding='utf-8') as f:
-        data = json.load(f)
-    turns = [turn_from_source_dict(turn) for turn in data]
-    mongo_config.db.turns.insert_many([turn.to_dict() for turn in turns])
+    turns_manager.import_turns(iter_json_records(TEST_TURNS_FILE))
 
     with open(TEST_USERS_FILE, "r", encoding='utf-8') as f:
         data = json.load(f)
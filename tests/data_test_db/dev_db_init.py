@@ -1,31 +1,21 @@
 import argparse
 import json
 import random
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 
 from tests.defaults import TEST_USERS_FILE
 from turns_app.defaults import CONFIGS_PATH
-from turns_app.model.turns import Turn, turn_id_generator, MongoTurnsManager, TurnNotAvailableError
-from turns_app.utils.time_utils import TimeRange, Day, DATETIME_FORMAT, get_week_by_day, days_in_range
-from turns_app.model.users import User
+from turns_app.model.availability import day_modules
+from turns_app.model.turns import Turn, turn_id_generator, MongoTurnsManager, business_slot_minutes
+from turns_app.utils.time_utils import TimeRange, Day, get_week_by_day, days_in_range
+from turns_app.model.users import User, MongoUsersManager
 from turns_app.utils.config_utils import load_app_config_from_toml, AppConfig, BusinessConfig
+from turns_app.utils.import_utils import iter_json_records
 
 DEV_CONFIG_FILE = CONFIGS_PATH / "app_config.dev.toml"
 
 
-def day_modules(day: Day, bc: BusinessConfig) -> list[TimeRange]:
-    """Get the time ranges for each module in a day"""
-    modules = []
-    current_time = datetime.strptime(f"{day}_{bc.start_time}", DATETIME_FORMAT)
-    day_end_time = datetime.strptime(f"{day}_{bc.end_time}", DATETIME_FORMAT)
-    while current_time < day_end_time:
-        end_time = current_time + timedelta(minutes=bc.min_module_time)
-        modules.append(TimeRange(current_time, end_time))
-        current_time = end_time
-    return modules
-
-
 def random_turn_time(bc: BusinessConfig, day: Day) -> TimeRange:
     modules = day_modules(day, bc)
     start_module = random.randint(0, len(modules) - 1)
@@ -39,7 +29,7 @@ def random_turn_time(bc: BusinessConfig, day: Day) -> TimeRange:
     return TimeRange(start_time, end_time)
 
 
-def init_database(config: Path):
+def init_database(config: Path, turns_file: Path | None = None):
     dev_config: AppConfig = load_app_config_from_toml(config)
     mongo_config = dev_config.mongo
     business_config = dev_config.business
@@ -48,6 +38,11 @@ def init_database(config: Path):
     mongo_config.db.drop_collection('turns')
     mongo_config.db.drop_collection('users')
 
+    print("Creating the indexes...")
+    turns_manager = MongoTurnsManager(mongo_config, business_slot_minutes(business_config))
+    turns_manager.ensure_indexes()
+    MongoUsersManager(mongo_config).ensure_indexes()
+
     print('Setting up the users dev database...')
     with open(TEST_USERS_FILE, "r", encoding='utf-8') as f:
         data = json.load(f)
@@ -56,32 +51,37 @@ def init_database(config: Path):
     users_ids = [idx for idx in users.keys()]
 
     print('Setting up the turns dev database...')
-    turns_manager = MongoTurnsManager(mongo_config)
+
+    if turns_file is not None:
+        report = turns_manager.import_turns(iter_json_records(turns_file))
+        print(f"Imported {report.imported} turns from {turns_file}")
+        for result in report.rejected:
+            print(f"  Skipped {result.turn.idx}: {result.reason}")
+        return
 
     now = datetime.now()
     week_range = get_week_by_day(now)
     week_days = days_in_range(week_range)
 
-    # Generate random turns for the week.
+    # Generate random turns for the week, retrying with new candidates for the rejected ones.
     total = 40
     generated = 0
     while generated < total:
-        day = random.choice(week_days)
-        time_range = random_turn_time(business_config, day)
-        user_id = random.choice(users_ids)
-        office = random.choice(business_config.offices)
+        candidates = []
+        for _ in range(total - generated):
+            day = random.choice(week_days)
+            time_range = random_turn_time(business_config, day)
+            user_id = random.choice(users_ids)
+            office = random.choice(business_config.offices)
 
-        turn = Turn(idx=turn_id_generator(time_range.start_time, office),
-                    user=users[user_id].get_named_user(),
-                    office_id=office,
-                    start_time=time_range.start_time,
-                    end_time=time_range.end_time)
+            candidates.append(Turn(idx=turn_id_generator(time_range.start_time, office),
+                                   user=users[user_id].get_named_user(),
+                                   office_id=office,
+                                   start_time=time_range.start_time,
+                                   end_time=time_range.end_time))
 
-        try:
-            turns_manager.insert_turn(turn)
-            generated += 1
-        except TurnNotAvailableError:
-            continue
+        results = turns_manager.insert_turns(candidates)
+        generated += sum(result.accepted for result in results)
 
 
 def main():
@@ -92,11 +92,18 @@ def main():
         default=DEV_CONFIG_FILE,
         help="The path to the configuration file"
     )
+    parser.add_argument(
+        "--turns-file",
+        type=str,
+        default=None,
+        help="A JSON or JSON lines export of turns to import instead of generating random turns"
+    )
     args = parser.parse_args()
 
     config = Path(args.config)
+    turns_file = Path(args.turns_file) if args.turns_file else None
 
-    init_database(config)
+    init_database(config, turns_file)
 
 
 if __name__ == '__main__':
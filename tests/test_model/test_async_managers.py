@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from tests.conftest import init_database, make_turns_manager, test_config
+from turns_app.model.turns import Turn, TurnNotAvailableError, get_week_turns, business_slot_minutes
+from turns_app.model.users import NamedUser, User, MongoUsersManager, UserExistsError
+from turns_app.utils.config_utils import close_async_mongo_clients
+from turns_app.utils.time_utils import TimeRange
+
+pytest.importorskip("motor")
+
+from turns_app.model.async_managers import AsyncMongoTurnsManager, AsyncMongoUsersManager, \
+    get_week_turns_async  # noqa: E402
+
+
+def run(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            close_async_mongo_clients()
+    return asyncio.run(main())
+
+
+def test_async_turns_manager(test_config):
+    init_database(test_config)
+    week = TimeRange(datetime(2024, 2, 26), datetime(2024, 3, 4))
+    sync_manager = make_turns_manager(test_config)
+    user = NamedUser(id="USER_ASYNC", name="Async User")
+    turn = Turn(idx="TURN-28.02.2024-16.00-OFF_01", start_time=datetime(2024, 2, 28, 16, 0),
+                end_time=datetime(2024, 2, 28, 17, 0), user=user, office_id="OFF_01")
+
+    async def scenario():
+        manager = AsyncMongoTurnsManager(test_config.mongo, business_slot_minutes(test_config.business))
+        turns = await manager.get_turns_in_range(week)
+        assert sorted(turns, key=lambda t: t.idx) == sorted(sync_manager.get_turns_in_range(week), key=lambda t: t.idx)
+
+        version = await manager.week_version(turn.start_time)
+        assert await manager.conflict_turn(turn) is None
+        await manager.insert_turn(turn)
+        assert await manager.week_version(turn.start_time) == version + 1
+        assert await manager.get_turn_by_id(turn.idx) == turn
+        with pytest.raises(TurnNotAvailableError):
+            await manager.insert_turn(Turn(idx="TURN-28.02.2024-16.30-OFF_01",
+                                           start_time=datetime(2024, 2, 28, 16, 30),
+                                           end_time=datetime(2024, 2, 28, 17, 30), user=user, office_id="OFF_01"))
+        assert (await manager.conflict_turn(turn)).idx == turn.idx
+        return await get_week_turns_async(manager, datetime(2024, 2, 28)), version
+
+    week_turns, version = run(scenario())
+    # Both managers share the documents and the week versions
+    assert sync_manager.week_version(turn.start_time) == version + 1
+    expected = get_week_turns(sync_manager, datetime(2024, 2, 28), raw=True)
+    assert week_turns == expected
+
+
+def test_async_users_manager(test_config):
+    init_database(test_config)
+    sync_manager = MongoUsersManager(test_config.mongo)
+    user = User(id="USER_ASYNC_01", name="Async", email="async@test.com", phone="1", activity="Test")
+
+    async def scenario():
+        manager = AsyncMongoUsersManager(test_config.mongo)
+        assert sorted(await manager.get_users(), key=lambda u: u.id) == \
+               sorted(sync_manager.get_users(), key=lambda u: u.id)
+        assert await manager.get_user_dicts() == list(sync_manager.iter_users())
+
+        version = await manager.version()
+        await manager.create_user(user)
+        assert await manager.version() == version + 1
+        with pytest.raises(UserExistsError):
+            await manager.create_user(user)
+        return await manager.get_by_id(user.id), await manager.get_by_id("USER_404")
+
+    created, missing = run(scenario())
+    assert created == user
+    assert missing is None
+    assert sync_manager.get_by_id(user.id) == user
+
+
+def test_async_turns_manager_first_write_creates_indexes(test_config):
+    init_database(test_config)
+    test_config.mongo.db.turns.drop_indexes()
+    user = NamedUser(id="USER_ASYNC", name="Async User")
+    turn = Turn(idx="TURN-28.02.2024-18.00-OFF_01", start_time=datetime(2024, 2, 28, 18, 0),
+                end_time=datetime(2024, 2, 28, 19, 0), user=user, office_id="OFF_01")
+
+    async def scenario():
+        manager = AsyncMongoTurnsManager(test_config.mongo, business_slot_minutes(test_config.business))
+        await manager.insert_turn(turn)
+
+    run(scenario())
+    assert "slots_unique" in test_config.mongo.db.turns.index_information()
+
+
+def test_async_turns_manager_without_slots_index(test_config, monkeypatch):
+    init_database(test_config)
+    user = NamedUser(id="USER_ASYNC", name="Async User")
+    # Overlaps the stored turn of OFF_01 from 08.00 to 10.00
+    turn = Turn(idx="TURN-26.02.2024-09.00-OFF_01", start_time=datetime(2024, 2, 26, 9, 0),
+                end_time=datetime(2024, 2, 26, 10, 0), user=user, office_id="OFF_01")
+
+    async def guards(self) -> bool:
+        return False
+
+    monkeypatch.setattr(AsyncMongoTurnsManager, "slots_index_guards", guards)
+    test_config.mongo.db.turns.drop_indexes()
+
+    async def scenario():
+        manager = AsyncMongoTurnsManager(test_config.mongo, business_slot_minutes(test_config.business))
+        with pytest.raises(TurnNotAvailableError):
+            await manager.insert_turn(turn)
+
+    run(scenario())
+    assert test_config.mongo.db.turns.find_one({"idx": turn.idx}) is None
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pytest
+
+from tests.conftest import init_database, make_turns_manager
+from turns_app.model.availability import day_modules, merge_ranges, free_slots, get_available_slots, AvailableSlot
+from turns_app.utils.config_utils import BusinessConfig
+from turns_app.utils.time_utils import TimeRange
+from tests.conftest import test_config
+
+
+def hours(start: float, end: float, day: int = 26) -> TimeRange:
+    return TimeRange(datetime(2024, 2, day, int(start), int(start % 1 * 60)),
+                     datetime(2024, 2, day, int(end), int(end % 1 * 60)))
+
+
+@pytest.fixture
+def business_config() -> BusinessConfig:
+    return BusinessConfig(name='Test', start_time="08.00", end_time="14.00", min_module_time=60,
+                          offices=["OFF_01", "OFF_02"])
+
+
+def test_day_modules(business_config):
+    modules = day_modules("26.02.2024", business_config)
+    assert modules == [hours(hour, hour + 1) for hour in range(8, 14)]
+
+
+def test_merge_ranges():
+    result = merge_ranges([hours(8, 10), hours(9, 11), hours(11, 12), hours(13, 14)])
+    assert result == [hours(8, 12), hours(13, 14)]
+    assert merge_ranges([]) == []
+
+
+def test_free_slots(business_config):
+    modules = day_modules("26.02.2024", business_config) + day_modules("27.02.2024", business_config)
+
+    result = free_slots(modules, [hours(9, 10), hours(11.5, 12)])
+    assert result == [hours(8, 9), hours(10, 11), hours(12, 14), hours(8, 14, day=27)]
+
+    assert free_slots(modules, []) == [hours(8, 14), hours(8, 14, day=27)]
+    assert free_slots(modules, [TimeRange(datetime(2024, 2, 26), datetime(2024, 2, 28))]) == []
+
+
+def slot(office_id: str, start: float, end: float) -> AvailableSlot:
+    time_range = hours(start, end)
+    return AvailableSlot(office_id, time_range.start_time, time_range.end_time)
+
+
+def test_get_available_slots(test_config, business_config):
+    init_database(test_config)
+    manager = make_turns_manager(test_config)
+    day = TimeRange(datetime(2024, 2, 26), datetime(2024, 2, 27))
+
+    # The test turns of the day take OFF_01 from 08.00 to 11.00 and OFF_02 from 11.00 to 13.00
+    result = get_available_slots(manager, business_config, day, office_id="OFF_01")
+    assert result == [slot("OFF_01", 11, 14)]
+
+    result = get_available_slots(manager, business_config, day)
+    assert result == [slot("OFF_01", 11, 14), slot("OFF_02", 8, 11), slot("OFF_02", 13, 14)]
+
+    # All of them are turns of USER_01
+    result = get_available_slots(manager, business_config, day, user_id="USER_01")
+    assert result == [slot("OFF_01", 13, 14), slot("OFF_02", 13, 14)]
+
+    assert result[0].to_str_dict() == {"office_id": "OFF_01", "start_time": "26.02.2024_13.00",
+                                       "end_time": "26.02.2024_14.00"}
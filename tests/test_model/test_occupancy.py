@@ -0,0 +1,86 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from tests.conftest import init_database, make_turns_manager, test_config
+from turns_app.model.availability import get_available_slots
+from turns_app.model.occupancy import OccupancyMap, load_occupancy
+from turns_app.model.turns import Turn
+from turns_app.model.users import NamedUser
+from turns_app.utils.config_utils import BusinessConfig
+from turns_app.utils.time_utils import TimeRange
+
+
+@pytest.fixture
+def business_config() -> BusinessConfig:
+    return BusinessConfig(name='Test', start_time="08.00", end_time="14.00", min_module_time=60,
+                          offices=["OFF_01", "OFF_02"])
+
+
+@pytest.fixture
+def week() -> TimeRange:
+    return TimeRange(datetime(2024, 2, 26), datetime(2024, 3, 4))
+
+
+def test_occupancy_bitmaps(business_config, week):
+    occupancy = OccupancyMap(business_config, week)
+    assert occupancy.modules_per_day == 6
+
+    user = NamedUser(id="USER_01", name="User")
+    occupancy.add(Turn(idx="A", start_time=datetime(2024, 2, 26, 9, 0), end_time=datetime(2024, 2, 26, 11, 0),
+                       user=user, office_id="OFF_01"))
+    # Partially taken modules are taken
+    occupancy.add(Turn(idx="B", start_time=datetime(2024, 2, 26, 12, 30), end_time=datetime(2024, 2, 26, 13, 0),
+                       user=user, office_id="OFF_02"))
+    assert occupancy.occupancy("OFF_01", datetime(2024, 2, 26).date()) == 0b000110
+    assert occupancy.occupancy("OFF_02", datetime(2024, 2, 26).date()) == 0b010000
+    assert occupancy.user_occupancy("USER_01", datetime(2024, 2, 26).date()) == 0b010110
+
+    day = TimeRange(datetime(2024, 2, 26), datetime(2024, 2, 27))
+    result = occupancy.free_slots(day, min_modules=2)
+    assert [(slot.office_id, slot.start_time.hour, slot.end_time.hour) for slot in result] == \
+           [("OFF_01", 11, 14), ("OFF_02", 8, 12)]
+
+    result = occupancy.free_slots(day, min_modules=1, office_id="OFF_02", user_id="USER_01")
+    assert [(slot.start_time.hour, slot.end_time.hour) for slot in result] == [(8, 9), (11, 12), (13, 14)]
+
+
+def test_occupancy_matches_sweep(test_config, business_config, week):
+    init_database(test_config)
+    manager = make_turns_manager(test_config)
+    occupancy = load_occupancy(manager, business_config, week)
+
+    rng = random.Random(1)
+    users = [NamedUser(id=f"OCCUPANCY_USER_{i}", name=f"User {i}") for i in range(3)]
+    candidates = []
+    for i in range(40):
+        start_time = week.start_time + timedelta(days=rng.randint(0, 6), hours=rng.randint(8, 13))
+        candidates.append(Turn(idx=f"OCCUPANCY-{i}", start_time=start_time,
+                               end_time=start_time + timedelta(hours=rng.randint(1, 3)),
+                               user=rng.choice(users), office_id=rng.choice(business_config.offices)))
+    manager.insert_turns(candidates)
+
+    for min_modules in range(1, 5):
+        for user_id in [None, "OCCUPANCY_USER_0"]:
+            assert occupancy.free_slots(week, min_modules, user_id=user_id) == \
+                   get_available_slots(manager, business_config, week, user_id=user_id, min_modules=min_modules)
+
+
+def test_occupancy_other_process_inserts(test_config, business_config, week):
+    init_database(test_config)
+    manager = make_turns_manager(test_config)
+    occupancy = load_occupancy(manager, business_config, week)
+    day = TimeRange(datetime(2024, 2, 29), datetime(2024, 3, 1))
+    taken = occupancy.occupancy("OFF_02", day.start_time.date())
+
+    user = NamedUser(id="OCCUPANCY_USER", name="User")
+    other = make_turns_manager(test_config)
+    other.insert_turn(Turn(idx="OCCUPANCY-OTHER", start_time=datetime(2024, 2, 29, 8, 0),
+                           end_time=datetime(2024, 2, 29, 9, 0), user=user, office_id="OFF_02"))
+    assert occupancy.occupancy("OFF_02", day.start_time.date()) == taken
+
+    manager.refresh_weeks(occupancy, day)
+    assert occupancy.occupancy("OFF_02", day.start_time.date()) == taken | 0b1
+    assert occupancy.free_slots(week, user_id="OCCUPANCY_USER") == \
+           get_available_slots(manager, business_config, week, user_id="OCCUPANCY_USER")
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+
+from turns_app.model.users import MongoUsersManager
+from turns_app.utils.mongo_utils import turns_in_range_query, conflict_query, winning_plan_stages, after_key_query
+from turns_app.utils.time_utils import TimeRange, get_week_by_day
+from tests.conftest import test_config, make_turns_manager
+
+
+TIME_RANGE = TimeRange(datetime(2024, 2, 26, 9, 0), datetime(2024, 2, 26, 12, 0))
+
+# Every filter the turns manager sends to Mongo
+TURNS_QUERIES = [
+    {"idx": "TURN-26.02.2024-08.00-OFF_01"},
+    turns_in_range_query(get_week_by_day(datetime(2024, 2, 26))),
+    turns_in_range_query(TIME_RANGE, office_id="OFF_01"),
+    turns_in_range_query(TIME_RANGE, user_id="USER_01"),
+    conflict_query(TIME_RANGE, office_id="OFF_01", user_id="USER_01"),
+    after_key_query(turns_in_range_query(TIME_RANGE), datetime(2024, 2, 26, 9, 0), "TURN-26.02.2024-09.00-OFF_01"),
+    {"slots": {"$in": ["office:OFF_01:15m:1890180", "user:USER_01:15m:1890180"]}},
+]
+
+# Filters of the migrations, that run with the API stopped. The turns without slots are not in the partial
+# slots index, so backfill_slots scans the collection
+TURNS_MIGRATION_QUERIES = [
+    {"slots": {"$exists": False}},
+]
+
+# Every filter the users manager sends to Mongo
+USERS_QUERIES = [
+    {"id": "USER_01"},
+]
+
+
+def assert_index_scan(collection, query):
+    stages = winning_plan_stages(collection.find(query).explain())
+    assert "IXSCAN" in stages
+    assert "COLLSCAN" not in stages
+
+
+@pytest.mark.parametrize("query", TURNS_QUERIES)
+def test_turns_queries_use_indexes(test_config, query):
+    manager = make_turns_manager(test_config)
+    manager.ensure_indexes()
+    assert_index_scan(manager.collection, query)
+
+
+@pytest.mark.parametrize("query", TURNS_MIGRATION_QUERIES)
+def test_turns_migration_queries_scan(test_config, query):
+    manager = make_turns_manager(test_config)
+    manager.ensure_indexes()
+    assert "COLLSCAN" in winning_plan_stages(manager.collection.find(query).explain())
+
+
+@pytest.mark.parametrize("query", USERS_QUERIES)
+def test_users_queries_use_indexes(test_config, query):
+    manager = MongoUsersManager(test_config.mongo)
+    manager.ensure_indexes()
+    assert_index_scan(manager.collection, query)
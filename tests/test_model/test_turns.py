@@ -1,13 +1,19 @@
 import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
 from typing import Any
-from datetime import datetime
+from datetime import datetime, timedelta, date
 
 import pytest
+from pymongo.errors import BulkWriteError
 
-from tests.conftest import init_database
+from tests.conftest import init_database, make_turns_manager
 from tests.data_test_db.dev_db_init import day_modules
-from turns_app.model.turns import turn_id_generator, Turn, turn_from_source_dict, MongoTurnsManager, make_week_dict, \
-    TurnNotAvailableError
+from turns_app.model.turns import turn_id_generator, Turn, turn_from_source_dict, make_week_dict, \
+    TurnNotAvailableError, TURNS_INDEXES, TurnsInterner, get_week_turns, turn_response_dict, WeekTurnsCache, turn_slots, \
+    iter_raw_week_turns, business_slot_minutes, WeekVersions
+from turns_app.utils.mongo_utils import index_name
 from turns_app.model.users import NamedUser
 from turns_app.utils.time_utils import TimeRange, get_week_by_day, days_in_range
 
@@ -81,8 +87,23 @@ def test_turn_from_source_dict(turn_dict, named_user):
     assert turn.office_id == 'OFF_01'
 
 
+def test_turn_slots(turn):
+    assert not hasattr(turn, '__dict__')
+    assert not hasattr(turn.user, '__dict__')
+
+
+def test_turns_interner(turns_list):
+    interner = TurnsInterner()
+    turns = [interner.turn(turn.to_dict()) for turn in turns_list]
+    assert turns == turns_list
+
+    same_user = [turn for turn in turns if turn.user.id == 'USER_01']
+    assert len(same_user) > 1
+    assert all(turn.user is same_user[0].user for turn in same_user)
+
+
 def test_turns_manager(test_config, turn):
-    manger = MongoTurnsManager(test_config.mongo)
+    manger = make_turns_manager(test_config)
 
     result = manger.get_turn_by_id(turn.idx)
     assert result == turn
@@ -90,7 +111,7 @@ def test_turns_manager(test_config, turn):
 
 def test_turns_manager_range(test_config, turns_list):
     init_database(test_config)
-    manger = MongoTurnsManager(test_config.mongo)
+    manger = make_turns_manager(test_config)
 
     start_time = datetime(2024, 2, 26, 8, 0)
     end_time = datetime(2024, 2, 27, 14, 0)
@@ -115,7 +136,7 @@ def test_turns_manager_range(test_config, turns_list):
 
 
 def test_turns_manager_insert(test_config, named_user):
-    manger = MongoTurnsManager(test_config.mongo)
+    manger = make_turns_manager(test_config)
     turn = Turn(
         idx='TURN-26.02.2024-16.00-OFF_01',
         start_time=datetime(2024, 2, 26, 16, 0),
@@ -149,6 +170,295 @@ def test_turns_manager_insert(test_config, named_user):
         manger.insert_turn(conflict_user_turn)
 
 
+def test_turns_manager_indexes(test_config):
+    manger = make_turns_manager(test_config)
+    manger.ensure_indexes()
+    manger.ensure_indexes()
+
+    existing = manger.collection.index_information()
+    for index in TURNS_INDEXES:
+        assert index_name(index) in existing
+    assert existing["idx_unique"]["unique"] is True
+
+    report = manger.index_report()
+    assert report.missing == []
+    assert report.undeclared == []
+
+
+def test_turn_slot_keys(named_user):
+    turn = Turn(
+        idx='XXXX',
+        start_time=datetime(2024, 2, 26, 8, 0),
+        end_time=datetime(2024, 2, 26, 8, 30),
+        user=named_user,
+        office_id='OFF_01'
+    )
+    result = turn_slots(turn, slot_minutes=15)
+    assert len(result) == 4
+    assert result[0].startswith('office:OFF_01:15m:')
+    assert result[2].startswith('user:USER_01:15m:')
+
+    next_turn = Turn(
+        idx='YYYY',
+        start_time=datetime(2024, 2, 26, 8, 30),
+        end_time=datetime(2024, 2, 26, 9, 10),
+        user=named_user,
+        office_id='OFF_01'
+    )
+    next_slots = turn_slots(next_turn, slot_minutes=15)
+    assert len(next_slots) == 6
+    assert not set(result) & set(next_slots)
+    assert set(turn_slots(next_turn, slot_minutes=60)) & set(turn_slots(turn, slot_minutes=60))
+    # The slots of another length never match
+    assert not set(turn_slots(turn, slot_minutes=30)) & set(result)
+
+
+@pytest.mark.parametrize("start_time, module, expected", [("08.00", 60, 60), ("08.00", 20, 20), ("08.00", 10, 10),
+                                                          ("08.30", 60, 30), ("08.00", 45, 15), ("08.00", 50, 10)])
+def test_business_slot_minutes(start_time, module, expected, named_user):
+    bc = BusinessConfig(name="B", start_time=start_time, end_time="20.00", min_module_time=module, offices=["OFF_01"])
+    slot_minutes = business_slot_minutes(bc)
+    assert slot_minutes == expected
+
+    # Back-to-back modules, on two days, never share a slot
+    for day in ["26.02.2024", "27.02.2024"]:
+        modules = day_modules(day, bc)
+        for first, second in zip(modules, modules[1:]):
+            turns = [Turn(idx=f"T-{module.start_time}", start_time=module.start_time, end_time=module.end_time,
+                          user=named_user, office_id="OFF_01") for module in [first, second]]
+            assert not set(turn_slots(turns[0], slot_minutes)) & set(turn_slots(turns[1], slot_minutes))
+
+
+def test_turns_manager_concurrent_insert(test_config):
+    init_database(test_config)
+    manger = make_turns_manager(test_config)
+    rng = random.Random(0)
+    users = [NamedUser(id=f"STRESS_USER_{i}", name=f"Stress User {i}") for i in range(4)]
+    day_start = datetime(2024, 4, 1, 8, 0)
+
+    # Many candidates for a few slots, most of them overlap
+    candidates = []
+    for i in range(300):
+        start_time = day_start + timedelta(minutes=15 * rng.randint(0, 16))
+        candidates.append(Turn(
+            idx=f"STRESS-{i}",
+            start_time=start_time,
+            end_time=start_time + timedelta(minutes=15 * rng.randint(1, 4)),
+            user=rng.choice(users),
+            office_id=rng.choice(['OFF_01', 'OFF_02'])
+        ))
+
+    def insert(turn: Turn) -> bool:
+        try:
+            manger.insert_turn(turn)
+            return True
+        except TurnNotAvailableError:
+            return False
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        accepted = list(executor.map(insert, candidates))
+
+    stored = manger.get_turns_in_range(TimeRange(day_start, day_start + timedelta(days=1)))
+    assert 0 < len(stored) == sum(accepted) < len(candidates)
+    for turn, other in combinations(stored, 2):
+        if turn.office_id == other.office_id or turn.user.id == other.user.id:
+            assert turn.end_time <= other.start_time or other.end_time <= turn.start_time
+
+
+def test_turns_manager_first_write_creates_indexes(test_config, named_user):
+    test_config.mongo.db.drop_collection('turns')
+    manger = make_turns_manager(test_config)
+    turn = Turn(idx='FIRST', start_time=datetime(2024, 2, 26, 8, 0), end_time=datetime(2024, 2, 26, 9, 0),
+                user=named_user, office_id='OFF_01')
+    manger.insert_turn(turn)
+    assert 'slots_unique' in manger.collection.index_information()
+
+    with pytest.raises(TurnNotAvailableError):
+        manger.insert_turn(Turn(idx='SECOND', start_time=datetime(2024, 2, 26, 8, 0),
+                                end_time=datetime(2024, 2, 26, 9, 0), user=named_user, office_id='OFF_02'))
+    init_database(test_config)
+
+
+def test_turns_manager_without_slots_index(test_config, named_user, monkeypatch):
+    init_database(test_config)
+    manger = make_turns_manager(test_config)
+    monkeypatch.setattr(manger, "slots_index_guards", lambda: False)
+    # A collection without the slots index, with a stored turn without slots, 08.00 - 10.00 in OFF_01
+    manger.collection.drop_indexes()
+    manger.collection.update_many({}, {"$unset": {"slots": ""}})
+
+    with pytest.raises(TurnNotAvailableError):
+        manger.insert_turn(Turn(idx='NO-INDEX', start_time=datetime(2024, 2, 26, 9, 0),
+                                end_time=datetime(2024, 2, 26, 10, 0), user=named_user, office_id='OFF_01'))
+    report = manger.insert_turns([Turn(idx='NO-INDEX', start_time=datetime(2024, 2, 26, 9, 0),
+                                       end_time=datetime(2024, 2, 26, 10, 0), user=named_user, office_id='OFF_01')])
+    assert not report[0].accepted
+    init_database(test_config)
+
+
+def test_backfill_slots(test_config, named_user):
+    test_config.mongo.db.drop_collection('turns')
+    manger = make_turns_manager(test_config)
+    turns = [Turn(idx=f'OLD-{hour}', start_time=datetime(2024, 2, 26, hour, 0),
+                  end_time=datetime(2024, 2, 26, hour + 2, 0), user=named_user, office_id='OFF_01')
+             for hour in [8, 9, 12]]
+    # Stored before the slots, the second one overlaps the first one
+    manger.collection.insert_many([turn.to_dict() for turn in turns])
+
+    report = manger.backfill_slots()
+    assert sorted(result.turn.idx for result in report if result.accepted) == ['OLD-12', 'OLD-8']
+    rejected = [result for result in report if not result.accepted]
+    assert [result.turn.idx for result in rejected] == ['OLD-9']
+    assert rejected[0].reason == "User USER_01 has a turn at the same time."
+    assert manger.collection.find_one({"idx": "OLD-9"}).get("slots") is None
+    init_database(test_config)
+
+
+def test_import_turns(test_config, turn_dict):
+    init_database(test_config)
+    manger = make_turns_manager(test_config)
+    week_start = datetime(2024, 2, 26)
+    version = manger.week_version(week_start)
+
+    free = dict(turn_dict, idx="IMPORT-1", start_date="26.02.2024_19.00", end_date="26.02.2024_20.00")
+    # Overlaps the stored turn of the office, the first one of the test turns
+    taken = dict(turn_dict, idx="IMPORT-2", start_date="26.02.2024_09.00", end_date="26.02.2024_10.00")
+    # Overlaps the previous turn of the export
+    overlap = dict(turn_dict, idx="IMPORT-3", start_date="26.02.2024_19.00", end_date="26.02.2024_21.00")
+    report = manger.import_turns([free, taken, overlap])
+
+    assert report.imported == 1
+    assert [result.turn.idx for result in report.rejected] == ["IMPORT-2", "IMPORT-3"]
+    assert manger.get_turn_by_id("IMPORT-1").end_time == datetime(2024, 2, 26, 20, 0)
+    assert manger.week_version(week_start) == version + 1
+
+
+def test_import_turns_other_errors(test_config, turn_dict):
+    init_database(test_config)
+    manger = make_turns_manager(test_config)
+    week_start = datetime(2024, 2, 26)
+    version = manger.week_version(week_start)
+
+    # An idx that is already stored is not a conflict of the slots, the import fails
+    free = dict(turn_dict, idx="IMPORT-1", start_date="26.02.2024_19.00", end_date="26.02.2024_20.00")
+    duplicate = dict(turn_dict, start_date="27.02.2024_19.00", end_date="27.02.2024_20.00")
+    with pytest.raises(BulkWriteError):
+        manger.import_turns([free, duplicate])
+
+    # The turns written before the error are visible to the week caches
+    assert manger.get_turn_by_id("IMPORT-1") is not None
+    assert manger.week_version(week_start) == version + 1
+
+
+def test_turns_manager_insert_turns(test_config, named_user):
+    init_database(test_config)
+    manger = make_turns_manager(test_config)
+    other_user = NamedUser(id='USER_02', name='Federico Bogado')
+
+    def make_turn(idx: str, start_hour: int, end_hour: int, user: NamedUser, office_id: str) -> Turn:
+        return Turn(idx=idx, start_time=datetime(2024, 2, 26, start_hour, 0),
+                    end_time=datetime(2024, 2, 26, end_hour, 0), user=user, office_id=office_id)
+
+    turns = [
+        make_turn('BULK-1', 17, 19, named_user, 'OFF_01'),
+        # Overlaps BULK-1 in the same office
+        make_turn('BULK-2', 18, 20, other_user, 'OFF_01'),
+        # Overlaps BULK-1 with the same user
+        make_turn('BULK-3', 16, 18, named_user, 'OFF_02'),
+        # Overlaps a stored turn of OFF_01 (08.00 - 10.00)
+        make_turn('BULK-4', 9, 10, other_user, 'OFF_01'),
+        make_turn('BULK-5', 19, 20, other_user, 'OFF_01'),
+    ]
+    report = manger.insert_turns(turns, batch_size=3)
+
+    assert [result.turn for result in report] == turns
+    assert [result.accepted for result in report] == [False, True, True, False, False]
+    assert report[0].reason == "User USER_01 has a turn at the same time."
+    assert report[3].reason == "Office OFF_01 has a turn at the same time."
+    assert report[1].reason is None
+
+    assert manger.get_turn_by_id('BULK-2').office_id == 'OFF_01'
+    assert manger.collection.find_one({"idx": 'BULK-1'}) is None
+
+
+def test_schedule_index(test_config, named_user):
+    init_database(test_config)
+    manger = make_turns_manager(test_config)
+    week = get_week_by_day(datetime(2024, 2, 26))
+    schedule_index = manger.load_schedule_index(week)
+
+    assert schedule_index.covers(TimeRange(datetime(2024, 2, 26, 8, 0), datetime(2024, 2, 26, 9, 0)))
+    assert not schedule_index.covers(TimeRange(datetime(2024, 3, 4, 8, 0), datetime(2024, 3, 4, 9, 0)))
+    assert not schedule_index.is_free(TimeRange(datetime(2024, 2, 26, 9, 0), datetime(2024, 2, 26, 9, 30)),
+                                      office_id='OFF_01')
+    assert [turn.idx for turn in schedule_index.turns(week, office_id='OFF_01')][:2] == \
+           ['TURN-26.02.2024-08.00-OFF_01', 'TURN-26.02.2024-10.00-OFF_01']
+
+    turn = Turn(
+        idx='TURN-26.02.2024-19.00-OFF_01',
+        start_time=datetime(2024, 2, 26, 19, 0),
+        end_time=datetime(2024, 2, 26, 20, 0),
+        user=named_user,
+        office_id='OFF_01'
+    )
+    assert manger.conflict_turn(turn) is None
+    manger.insert_turn(turn)
+    assert manger.conflict_turn(turn) == turn
+    assert not schedule_index.is_free(turn.duration, user_id=named_user.id)
+
+    # Rejected from memory, without going to the database
+    manger.collection = None
+    with pytest.raises(TurnNotAvailableError):
+        manger.insert_turn(turn)
+
+
+def test_schedule_index_other_process_inserts(test_config, named_user):
+    init_database(test_config)
+    manger = make_turns_manager(test_config)
+    week = get_week_by_day(datetime(2024, 2, 26))
+    schedule_index = manger.load_schedule_index(week)
+    own_turn = Turn(idx='TURN-26.02.2024-19.00-OFF_01', start_time=datetime(2024, 2, 26, 19, 0),
+                    end_time=datetime(2024, 2, 26, 20, 0), user=named_user, office_id='OFF_01')
+    manger.insert_turn(own_turn)
+    version = schedule_index.week_versions.get(week.start_time.date())
+    assert version == manger.week_version(week.start_time)
+
+    # Another process inserts a turn in the week, the index reloads the week before answering
+    other = make_turns_manager(test_config)
+    turn = Turn(idx='TURN-27.02.2024-19.00-OFF_01', start_time=datetime(2024, 2, 27, 19, 0),
+                end_time=datetime(2024, 2, 27, 20, 0), user=named_user, office_id='OFF_01')
+    other.insert_turn(turn)
+    assert schedule_index.is_free(turn.duration, office_id='OFF_01')
+    assert manger.conflict_turn(turn) == turn
+    assert schedule_index.week_versions.get(week.start_time.date()) == version + 1
+    assert schedule_index.turns(turn.duration, office_id='OFF_01') == [turn]
+
+
+def test_week_versions():
+    week = date(2024, 2, 26)
+    week_versions = WeekVersions()
+    week_versions.loaded(week, 3)
+
+    # An insert of this process, the only change of the week since it was loaded
+    marks = week_versions.reload_marks([week])
+    week_versions.advance({week: 4}, marks)
+    assert week_versions.get(week) == 4
+
+    # Another process inserted a turn too
+    week_versions.advance({week: 6}, week_versions.reload_marks([week]))
+    assert week_versions.get(week) == 4
+
+    # The week was reloaded while the insert was applied, maybe without its turn
+    marks = week_versions.reload_marks([week])
+    week_versions.loaded(week, 4)
+    week_versions.advance({week: 5}, marks)
+    assert week_versions.get(week) == 4
+
+    assert week_versions.due([week], now=10.0, poll_interval=1) == [week]
+    assert week_versions.due([week], now=10.5, poll_interval=1) == []
+    assert week_versions.due([week], now=11.0, poll_interval=1) == [week]
+
+
 def test_make_week_dict(turns_list):
     week_days = days_in_range(get_week_by_day(turns_list[0].start_time))
 
@@ -169,6 +479,86 @@ def test_make_week_dict(turns_list):
 
     assert isinstance(result['tuesday']['turns'][0], Turn)
 
+    other_week = Turn(idx='XXXX', start_time=datetime(2024, 3, 4, 8, 0), end_time=datetime(2024, 3, 4, 9, 0),
+                      user=turns_list[0].user, office_id='OFF_01')
+    with pytest.raises(ValueError):
+        make_week_dict(turns_list + [other_week], week_days)
+
+
+def test_get_week_turns_raw(test_config, turns_list):
+    init_database(test_config)
+    manger = make_turns_manager(test_config)
+    day = datetime(2024, 2, 27)
+
+    result = get_week_turns(manger, day, raw=True)
+    expected = get_week_turns(manger, day)
+    assert result.keys() == expected.keys()
+    for name, day_turns in expected.items():
+        assert result[name]["date"] == day_turns["date"]
+        assert result[name]["turns"] == [turn_response_dict(turn.to_dict()) for turn in day_turns["turns"]]
+
+    aggregated = get_week_turns(manger, day, raw="aggregate")
+    for name, day_turns in result.items():
+        assert aggregated[name]["date"] == day_turns["date"]
+        assert sorted(aggregated[name]["turns"], key=lambda turn: turn["idx"]) == \
+               sorted(day_turns["turns"], key=lambda turn: turn["idx"])
+
+    monday_turn = result["monday"]["turns"][0]
+    assert set(monday_turn) == {"idx", "start_time", "end_time", "user", "office_id"}
+    assert monday_turn["start_time"] == "2024-02-26 08:00:00"
+
+
+def test_week_turns_cache(test_config, named_user):
+    init_database(test_config)
+    manger = make_turns_manager(test_config)
+    cache = manger.enable_week_cache(WeekTurnsCache())
+    day = datetime(2024, 2, 27)
+
+    result = get_week_turns(manger, day)
+    assert get_week_turns(manger, datetime(2024, 2, 29, 18, 0)) is result
+    assert get_week_turns(manger, day, raw=True) is get_week_turns(manger, day, raw=True)
+    assert cache.stats.hits == 2
+    assert cache.stats.misses == 2
+
+    # Spans from Sunday to Monday, both weeks are invalidated
+    next_week = get_week_turns(manger, datetime(2024, 3, 4))
+    manger.insert_turn(Turn(
+        idx='TURN-03.03.2024-23.00-OFF_01',
+        start_time=datetime(2024, 3, 3, 23, 0),
+        end_time=datetime(2024, 3, 4, 1, 0),
+        user=named_user,
+        office_id='OFF_01'
+    ))
+    assert cache.stats.invalidations == 2
+
+    result = get_week_turns(manger, day)
+    assert len(result['sunday']['turns']) == 1
+    assert len(get_week_turns(manger, day, raw=True)['sunday']['turns']) == 1
+    assert next_week['monday']['turns'] == []
+    assert len(get_week_turns(manger, datetime(2024, 3, 4))['monday']['turns']) == 1
+    assert len(get_week_turns(manger, datetime(2024, 3, 4), raw="aggregate")['monday']['turns']) == 1
+    assert cache.stats.misses == 7
+
+
+def test_week_turns_cache_shared_versions(test_config, named_user):
+    init_database(test_config)
+    manager = make_turns_manager(test_config)
+    manager.enable_week_cache(WeekTurnsCache())
+    # Another process, its inserts are not seen by the listeners of the first manager
+    other = make_turns_manager(test_config)
+    day = datetime(2024, 3, 4)
+
+    assert get_week_turns(manager, day, raw=True)['monday']['turns'] == []
+    other.insert_turn(Turn(
+        idx='TURN-04.03.2024-08.00-OFF_01',
+        start_time=datetime(2024, 3, 4, 8, 0),
+        end_time=datetime(2024, 3, 4, 9, 0),
+        user=named_user,
+        office_id='OFF_01'
+    ))
+    assert len(get_week_turns(manager, day, raw=True)['monday']['turns']) == 1
+    assert manager.week_cache.stats.misses == 2
+
 
 def test_day_modules(turns_list):
     bc = BusinessConfig(name='Test', start_time="08.00", end_time="18.00", min_module_time=30, offices=["OFF_01"])
@@ -182,3 +572,67 @@ def test_day_modules(turns_list):
     assert modules[10].end_time == datetime(2024, 2, 26, 13, 30)
     assert modules[19].start_time == datetime(2024, 2, 26, 17, 30)
     assert modules[19].end_time == datetime(2024, 2, 26, 18, 0)
+
+
+def test_get_turns_page(test_config):
+    manger = make_turns_manager(test_config)
+    month = TimeRange(datetime(2024, 2, 1), datetime(2024, 3, 1))
+    expected = sorted(manger.get_turns_in_range(month), key=lambda turn: (turn.start_time, turn.idx))
+    assert len(expected) > 3
+
+    result, after = [], None
+    while True:
+        page = manger.get_turns_page(month, 3, after)
+        assert len(page.turns) <= 3
+        result.extend(page.turns)
+        after = page.next_key
+        if after is None:
+            break
+    assert result == expected
+
+    page = manger.get_turns_page(month, len(expected) + 1, office_id='OFF_01')
+    assert page.next_key is None
+    assert page.turns == [turn for turn in expected if turn.office_id == 'OFF_01']
+
+
+def test_iter_raw_week_turns(test_config):
+    manger = make_turns_manager(test_config)
+    day = datetime(2024, 2, 28)
+    expected = get_week_turns(manger, day, raw=True)
+
+    result = {name: {"turns": list(turns), "date": date} for name, date, turns in iter_raw_week_turns(manger, day)}
+    assert list(result) == list(expected)
+    for name, day_turns in expected.items():
+        assert result[name]["date"] == day_turns["date"]
+        assert result[name]["turns"] == sorted(day_turns["turns"], key=lambda turn: (turn["start_time"], turn["idx"]))
+
+
+def test_week_version(test_config, named_user):
+    manger = make_turns_manager(test_config)
+    week_day, next_week_day = datetime(2024, 3, 13, 10, 0), datetime(2024, 3, 18)
+    version, next_version = manger.week_version(week_day), manger.week_version(next_week_day)
+
+    manger.insert_turn(Turn(idx='TURN-13.03.2024-10.00-OFF_01', start_time=datetime(2024, 3, 13, 10, 0),
+                            end_time=datetime(2024, 3, 13, 11, 0), user=named_user, office_id='OFF_01'))
+    assert manger.week_version(week_day) == version + 1
+    assert manger.week_version(datetime(2024, 3, 11)) == version + 1
+    assert manger.week_version(next_week_day) == next_version
+
+    # Turns of many weeks bump each week once
+    results = manger.insert_turns([
+        Turn(idx='TURN-14.03.2024-10.00-OFF_01', start_time=datetime(2024, 3, 14, 10, 0),
+             end_time=datetime(2024, 3, 14, 11, 0), user=named_user, office_id='OFF_01'),
+        Turn(idx='TURN-15.03.2024-10.00-OFF_01', start_time=datetime(2024, 3, 15, 10, 0),
+             end_time=datetime(2024, 3, 15, 11, 0), user=named_user, office_id='OFF_01'),
+        Turn(idx='TURN-17.03.2024-23.00-OFF_01', start_time=datetime(2024, 3, 17, 23, 0),
+             end_time=datetime(2024, 3, 18, 1, 0), user=named_user, office_id='OFF_01'),
+    ])
+    assert all(result.accepted for result in results)
+    assert manger.week_version(week_day) == version + 2
+    assert manger.week_version(next_week_day) == next_version + 1
+
+    # Rejected turns do not change the week
+    with pytest.raises(TurnNotAvailableError):
+        manger.insert_turn(Turn(idx='TURN-13.03.2024-10.30-OFF_01', start_time=datetime(2024, 3, 13, 10, 30),
+                                end_time=datetime(2024, 3, 13, 11, 30), user=named_user, office_id='OFF_01'))
+    assert manger.week_version(week_day) == version + 2
@@ -3,7 +3,8 @@ import json
 import pytest
 
 from tests.defaults import TEST_USERS_FILE
-from turns_app.model.users import User, MongoUsersManager, UserExistsError, NamedUser
+from turns_app.model.users import User, MongoUsersManager, UserExistsError, NamedUser, USERS_INDEXES, UsersDirectory
+from turns_app.utils.mongo_utils import index_name
 from tests.conftest import test_config
 
 
@@ -79,10 +80,27 @@ def test_user_to_named_user(user_dict):
 
 def test_users_manager_create(test_config, user):
     manger = MongoUsersManager(test_config.mongo)
+    version = manger.version()
     manger.create_user(user)
+    assert manger.version() == version + 1
 
     with pytest.raises(UserExistsError):
         manger.create_user(user)
+    assert manger.version() == version + 1
+
+
+def test_users_manager_create_concurrent(test_config, monkeypatch):
+    manger = MongoUsersManager(test_config.mongo)
+    user = User(id="USER_CONCURRENT_01", name="Concurrent", email="concurrent@test.com", phone="1", activity="Test")
+    manger.collection.delete_one({"id": user.id})
+    manger.create_user(user)
+    version = manger.version()
+
+    # Another request created the user after the existence check, the unique index rejects it
+    monkeypatch.setattr(manger.collection, "find_one", lambda *args, **kwargs: None)
+    with pytest.raises(UserExistsError):
+        manger.create_user(user)
+    assert manger.version() == version
 
 
 def test_users_manager_get_by_id(test_config, users_list):
@@ -93,3 +111,47 @@ def test_users_manager_get_by_id(test_config, users_list):
 
     result = manger.get_by_id("USER_05")
     assert result is None
+
+
+def test_users_manager_indexes(test_config):
+    manger = MongoUsersManager(test_config.mongo)
+    manger.ensure_indexes()
+
+    existing = manger.collection.index_information()
+    for index in USERS_INDEXES:
+        assert index_name(index) in existing
+    assert existing["id_unique"]["unique"] is True
+
+
+def test_iter_users(test_config):
+    manager = MongoUsersManager(test_config.mongo)
+    users = list(manager.iter_users())
+    assert users == sorted((user.to_dict() for user in manager.get_users()), key=lambda user: user["id"])
+
+
+def test_users_directory(test_config):
+    manager = MongoUsersManager(test_config.mongo)
+    expected = sorted(manager.get_users(), key=lambda user: user.id)
+
+    directory = manager.enable_directory(poll_interval=3600, watch=False)
+    assert isinstance(directory, UsersDirectory)
+    assert manager.get_users() == expected
+    assert manager.get_by_id(expected[0].id) == expected[0]
+    assert manager.get_by_id("USER_404") is None
+    assert manager.user_dicts() == [user.to_dict() for user in expected]
+
+    # Created users are served right away
+    user = User(id="USER_DIRECTORY_01", name="Directory", email="dir@test.com", phone="1", activity="Test")
+    manager.create_user(user)
+    assert manager.get_by_id(user.id) == user
+    assert manager.current_version() == manager.version()
+
+    # Users created by other processes are seen when the version is polled
+    other = MongoUsersManager(test_config.mongo)
+    other_user = User(id="USER_DIRECTORY_02", name="Other", email="other@test.com", phone="2", activity="Test")
+    other.create_user(other_user)
+    assert manager.get_by_id(other_user.id) is None
+    manager.poll_interval = 0
+    assert manager.get_by_id(other_user.id) == other_user
+    assert manager.current_version() == other.version()
+    assert manager.directory is not directory
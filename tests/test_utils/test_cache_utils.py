@@ -0,0 +1,52 @@
+import pytest
+
+from turns_app.utils.cache_utils import LRUCache, MISSING, CacheStats
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("turns_app.utils.cache_utils.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    assert cache.get("a") is MISSING
+
+    cache.set("a", 1)
+    cache.set("b", None)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    # "b" is the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert len(cache) == 2
+
+    cache.delete("a")
+    assert cache.get("a") is MISSING
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_lru_cache_ttl(clock):
+    cache = LRUCache(ttl=10)
+    cache.set("a", 1)
+
+    clock[0] += 9
+    assert cache.get("a") == 1
+
+    clock[0] += 2
+    assert cache.get("a") is MISSING
+
+
+def test_cache_stats():
+    stats = CacheStats()
+    assert stats.hit_rate == 0.0
+
+    stats.hits += 3
+    stats.misses += 1
+    assert stats.hit_rate == 0.75
+    assert stats.to_dict() == {"hits": 3, "misses": 1, "invalidations": 0, "hit_rate": 0.75}
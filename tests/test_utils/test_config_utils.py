@@ -1,9 +1,12 @@
+import os
 from dataclasses import dataclass
 
 import pytest
 
 from turns_app.utils.dataclass_utils import BaseDataclass
-from turns_app.utils.config_utils import singleton, load_app_config_from_toml, AppConfig, MongoConfig, BusinessConfig
+from turns_app.utils.config_utils import singleton, load_app_config_from_toml, AppConfig, MongoConfig, BusinessConfig, \
+    close_mongo_clients, ServerConfig
+from turns_app.utils import config_utils
 from tests.defaults import TEST_CONFIG_PATH
 
 
@@ -78,3 +81,50 @@ def test_app_config():
     app_config.mongo.server = "other_server"
     assert app_config.mongo.server == "other_server"
     assert other_config.mongo.server == "other_server"
+
+
+def test_mongo_config_shared_client():
+    mongo_config = MongoConfig(server="localhost", db_name="turns_app-test", port=27017)
+    same_config = MongoConfig(server="localhost", db_name="other_db", port=27017)
+    other_config = MongoConfig(server="localhost", db_name="turns_app-test", port=27017, max_pool_size=5)
+
+    assert mongo_config.client is mongo_config.client
+    assert mongo_config.client is same_config.client
+    assert mongo_config.client is not other_config.client
+    assert other_config.client.options.pool_options.max_pool_size == 5
+
+    client = mongo_config.client
+    close_mongo_clients()
+    assert mongo_config.client is not client
+    close_mongo_clients()
+
+
+def test_server_config():
+    AppConfig.delete_instance()  # type: ignore
+    app_config = load_app_config_from_toml(TEST_CONFIG_PATH)
+    # The server section is optional
+    assert app_config.server is None
+
+    AppConfig.delete_instance()  # type: ignore
+    values = app_config.to_dict()
+    values["server"] = {"port": 8000, "workers": 4}
+    app_config = AppConfig.from_dict(values)  # type: ignore
+    assert app_config.server == ServerConfig(port=8000, workers=4)
+    assert app_config.server.threads == 8
+    AppConfig.delete_instance()  # type: ignore
+
+
+def test_mongo_clients_forgotten_after_fork():
+    mongo_config = MongoConfig(server="localhost", db_name="turns_app-test", port=27017)
+    client = mongo_config.client
+    assert config_utils._mongo_clients
+
+    pid = os.fork()
+    if pid == 0:
+        # The child must not reuse the parent client
+        os._exit(0 if not config_utils._mongo_clients and mongo_config.client is not client else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert mongo_config.client is client
+    close_mongo_clients()
@@ -1,8 +1,12 @@
+import threading
+
 import pytest
 from dataclasses import dataclass
 
 
-from turns_app.utils.dataclass_utils import BaseDataclass
+from turns_app.utils import dataclass_utils
+from turns_app.utils.dataclass_utils import BaseDataclass, get_codec, ValidationPolicy, ValidationMode, \
+    TRUSTED_SOURCE, validation_policy
 
 
 @dataclass
@@ -99,3 +103,113 @@ def test_nested_to_dict(example_dict):
     nested_example = NestedDataclass(1, ExampleDataclass(**example_dict))
     result = nested_example.to_dict()
     assert result == {'idx': 1, 'example': example_dict}
+
+
+@dataclass
+class ListDataclass(BaseDataclass):
+    names: list[str]
+
+
+def test_codec_cached():
+    codec = get_codec(NestedDataclass)
+    assert get_codec(NestedDataclass) is codec
+    assert [plan.name for plan in codec.fields] == ['idx', 'example']
+    assert codec.fields[1].nested is get_codec(ExampleDataclass)
+
+
+def test_list_validation():
+    result = ListDataclass.from_dict({'names': ['a', 'b']})
+    assert result.to_dict() == {'names': ['a', 'b']}
+
+    with pytest.raises(TypeError):
+        ListDataclass.from_dict({'names': ['a', 1]})
+
+
+def test_validation_policy(wrong_type_dict):
+    result = ExampleDataclass.from_dict(wrong_type_dict, TRUSTED_SOURCE)
+    assert result.idx == '1'
+
+    with validation_policy(TRUSTED_SOURCE):
+        result = ExampleDataclass(idx='1', name='name')
+        assert result.idx == '1'
+
+        # An explicit policy overrides the one of the context
+        with pytest.raises(TypeError):
+            ExampleDataclass.from_dict(wrong_type_dict, ValidationPolicy(ValidationMode.STRICT))
+
+    with pytest.raises(TypeError):
+        ExampleDataclass.from_dict(wrong_type_dict)
+
+
+def test_sampled_validation(wrong_type_dict):
+    policy = ValidationPolicy(ValidationMode.SAMPLED, sample_rate=3)
+    failures = 0
+    for _ in range(9):
+        try:
+            ExampleDataclass.from_dict(wrong_type_dict, policy)
+        except TypeError:
+            failures += 1
+    assert failures == 3
+
+
+@dataclass
+class OptionalNestedDataclass(BaseDataclass):
+    name: str
+    nested: ExampleDataclass | None = None
+
+
+def test_optional_nested_dataclass(example_dict):
+    result = OptionalNestedDataclass.from_dict({'name': 'parent', 'nested': example_dict})
+    assert result.nested == ExampleDataclass(1, 'name', 'optional')
+    assert result.to_dict() == {'name': 'parent', 'nested': example_dict}
+
+    result = OptionalNestedDataclass.from_dict({'name': 'parent'})
+    assert result.nested is None
+    assert result.to_dict() == {'name': 'parent', 'nested': None}
+
+    result = OptionalNestedDataclass.from_dict({'name': 'parent', 'nested': None})
+    assert result.nested is None
+
+    with pytest.raises(TypeError):
+        OptionalNestedDataclass(name='parent', nested={'idx': 1})
+
+
+@dataclass
+class TreeDataclass(BaseDataclass):
+    name: str
+    parent: 'TreeDataclass | None' = None
+
+
+def test_self_referencing_codec():
+    codec = get_codec(TreeDataclass)
+    assert codec.fields[1].nested is codec
+    result = TreeDataclass.from_dict({'name': 'child', 'parent': {'name': 'root'}})
+    assert result.parent == TreeDataclass('root')
+    assert result.to_dict() == {'name': 'child', 'parent': {'name': 'root', 'parent': None}}
+
+
+def test_codec_published_after_compile(monkeypatch):
+    @dataclass
+    class SlowDataclass(BaseDataclass):
+        idx: int
+
+    compiling = threading.Event()
+    release = threading.Event()
+    compile_codec = dataclass_utils.DataclassCodec.compile
+
+    def slow_compile(codec):
+        compiling.set()
+        release.wait(5)
+        compile_codec(codec)
+
+    monkeypatch.setattr(dataclass_utils.DataclassCodec, "compile", slow_compile)
+    thread = threading.Thread(target=get_codec, args=(SlowDataclass,))
+    thread.start()
+    compiling.wait(5)
+    # Not visible to the other threads while it has no fields
+    assert SlowDataclass not in dataclass_utils._codecs
+    release.set()
+    thread.join()
+
+    monkeypatch.undo()
+    assert SlowDataclass.from_dict({'idx': 1}).to_dict() == {'idx': 1}
@@ -0,0 +1,177 @@
+import json
+from datetime import timedelta
+
+from flask import Flask, Response
+
+from turns_app.api_service import create_app
+from turns_app.utils import flask_utils
+from turns_app.utils.flask_utils import json_array_parts, ndjson_parts, join_chunks, conditional_get, config_hash, \
+    ApiState
+from turns_app.utils.config_utils import BusinessConfig, ServerConfig
+from turns_app.model.users import User
+from turns_app.utils.dataclass_utils import set_codec_observer
+from turns_app.utils.time_utils import TimeRange
+from tests.conftest import test_config
+
+
+def test_json_array_parts():
+    items = [{"id": 1}, {"id": 2, "name": "B"}, "c"]
+    assert json.loads("".join(json_array_parts(items))) == items
+    assert "".join(json_array_parts([])) == "[]"
+
+
+def test_ndjson_parts():
+    items = [{"id": 1}, {"id": 2}]
+    lines = "".join(ndjson_parts(items)).splitlines()
+    assert [json.loads(line) for line in lines] == items
+
+
+def test_join_chunks():
+    parts = ["ab", "cd", "e", "fgh", "i"]
+    result = list(join_chunks(parts, chunk_size=4))
+    assert result == ["abcd", "efgh", "i"]
+    assert list(join_chunks([], chunk_size=4)) == []
+
+
+def test_conditional_get():
+    app = Flask(__name__)
+    state = {"version": 1, "calls": 0}
+
+    def etag():
+        return f"v{state['version']}"
+
+    @app.route("/data")
+    @conditional_get(etag)
+    def data():
+        state["calls"] += 1
+        return {"version": state["version"]}
+
+    @app.route("/stream")
+    @conditional_get(etag)
+    def stream():
+        return Response("[]", mimetype="application/json")
+
+    client = app.test_client()
+    response = client.get("/data")
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"v1"'
+    assert client.get("/stream").headers["ETag"] == '"v1"'
+
+    response = client.get("/data", headers={"If-None-Match": '"v1"'})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == '"v1"'
+    assert state["calls"] == 1
+    assert client.get("/data", headers={"If-None-Match": 'W/"v1"'}).status_code == 304
+
+    state["version"] = 2
+    response = client.get("/data", headers={"If-None-Match": '"v1"'})
+    assert response.status_code == 200
+    assert response.get_json() == {"version": 2}
+    assert state["calls"] == 2
+
+
+def test_config_hash():
+    config = BusinessConfig(name="Test", start_time="08.00", end_time="18.00", min_module_time=30, offices=["OFF_01"])
+    same = BusinessConfig(name="Test", start_time="08.00", end_time="18.00", min_module_time=30, offices=["OFF_01"])
+    other = BusinessConfig(name="Test", start_time="08.00", end_time="19.00", min_module_time=30, offices=["OFF_01"])
+    assert config_hash(config) == config_hash(same)
+    assert config_hash(config) != config_hash(other)
+
+
+def test_create_app_builds_api_state_per_process(test_config):
+    app = create_app(app_config=test_config)
+    assert "api_config" not in app.config
+
+    client = app.test_client()
+    assert client.get("/turns/cache_stats").status_code == 200
+    api_state = app.config["api_config"]
+    assert isinstance(api_state, ApiState)
+
+    client.get("/turns/cache_stats")
+    assert app.config["api_config"] is api_state
+
+    # As seen from a forked worker
+    app.config["api_config_pid"] = -1
+    client.get("/turns/cache_stats")
+    assert app.config["api_config"] is not api_state
+
+
+def test_create_app_serves_selected_blueprints(test_config):
+    client = create_app(app_config=test_config, blueprints=["business"]).test_client()
+    response = client.get("/heartbeat")
+    assert response.status_code == 200
+    assert response.json["status"] == "ok"
+    assert client.get("/turns/cache_stats").status_code == 404
+
+
+def test_invalid_query_parameters(test_config):
+    client = create_app(app_config=test_config).test_client()
+    assert client.get("/turns/range?start_day=26.02.2024&end_day=27.02.2024").status_code == 200
+    for query in ["end_day=27.02.2024", "start_day=26.02.2024", "start_day=26.02.2024&end_day=27-02-2024",
+                  "start_day=26.02.2024&end_day=27.02.2024&limit=ten"]:
+        response = client.get(f"/turns/range?{query}")
+        assert response.status_code == 400, query
+
+    assert client.get("/turns/availability?start_day=26.02.2024&end_day=27.02.2024").status_code == 200
+    for query in ["end_day=27.02.2024", "start_day=26.02.2024&end_day=27.02.2024&modules=two"]:
+        assert client.get(f"/turns/availability?{query}").status_code == 400, query
+
+    for query in ["", "day=26-02-2024", "day=26-02-2024&stream=ndjson"]:
+        assert client.get(f"/turns/get_week?{query}").status_code == 400, query
+
+
+def test_api_state_rolls_views(test_config, monkeypatch):
+    api_state = ApiState.from_app_config(test_config, lazy=False)
+    turns_manager = api_state.turns_manager
+    views_range = api_state.views_range
+    assert turns_manager.schedule_index.time_range == views_range
+    assert api_state.occupancy.time_range == views_range
+
+    api_state.roll_views()
+    assert api_state.views_range is views_range
+
+    # A new week started
+    next_range = TimeRange(views_range.start_time + timedelta(weeks=1), views_range.end_time + timedelta(weeks=1))
+    monkeypatch.setattr(flask_utils, "schedule_index_range", lambda: next_range)
+    api_state.roll_views()
+    assert api_state.views_range == next_range
+    assert turns_manager.schedule_index.time_range == next_range
+    assert api_state.occupancy.time_range == next_range
+    # The previous views are not updated anymore
+    assert turns_manager.week_views == [turns_manager.schedule_index, api_state.occupancy]
+
+
+def test_lazy_api_state(test_config):
+    api_state = ApiState.from_app_config(test_config, lazy=True)
+    assert api_state.occupancy is None
+    assert api_state.turns_manager.schedule_index is None
+    assert api_state.turns_manager.week_cache is not None
+
+    users_manager = api_state.users_manager
+    assert users_manager.directory is None
+    users = users_manager.get_users()
+    assert users_manager.directory is not None
+    assert sorted(user.id for user in users) == sorted(user["id"] for user in users_manager.collection.find())
+
+    # The indexes are not created at startup, the first write creates them
+    users_manager.collection.drop_indexes()
+    users_manager.create_user(User(id="USER_LAZY_01", name="Lazy", email="lazy@test.com", phone="1", activity="Test"))
+    assert "id_unique" in users_manager.collection.index_information()
+
+
+def test_metrics_endpoint(test_config):
+    client = create_app(app_config=test_config).test_client()
+    assert client.get("/metrics").status_code == 404
+
+    test_config.server = ServerConfig(metrics=True)
+    client = create_app(app_config=test_config).test_client()
+    try:
+        client.get("/turns/get_week?day=26.02.2024")
+        response = client.get("/metrics")
+    finally:
+        set_codec_observer(None)
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",endpoint="/turns/get_week",status="200"}' in response.text
+    assert 'turns_week_cache_requests{result="miss"}' in response.text
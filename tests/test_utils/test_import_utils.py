@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from tests.defaults import TEST_TURNS_FILE
+from turns_app.utils.import_utils import iter_json_records, batched
+
+
+@pytest.fixture
+def records() -> list[dict]:
+    with open(TEST_TURNS_FILE, "r", encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_iter_json_array(records):
+    assert list(iter_json_records(TEST_TURNS_FILE)) == records
+    # Records split between many chunks
+    assert list(iter_json_records(TEST_TURNS_FILE, chunk_size=7)) == records
+
+
+def test_iter_json_lines(tmp_path, records):
+    file_path = tmp_path / "turns.jsonl"
+    with open(file_path, "w", encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    assert list(iter_json_records(file_path)) == records
+    assert list(iter_json_records(file_path, chunk_size=5)) == records
+
+
+def test_iter_json_empty(tmp_path):
+    file_path = tmp_path / "empty.json"
+    file_path.write_text("[ ]\n", encoding='utf-8')
+    assert list(iter_json_records(file_path)) == []
+
+    file_path.write_text("", encoding='utf-8')
+    assert list(iter_json_records(file_path)) == []
+
+
+def test_iter_json_invalid(tmp_path):
+    file_path = tmp_path / "invalid.json"
+    file_path.write_text('[{"idx": 1}, {"idx": ', encoding='utf-8')
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_records(file_path))
+
+    # An invalid record in the middle of a long file fails without reading the rest of the file
+    file_path.write_text('[{"idx": 1}, {"idx": ]' + ', {"idx": 2}' * 1000 + ']', encoding='utf-8')
+    records = iter_json_records(file_path, chunk_size=16, max_record_size=64)
+    assert next(records) == {"idx": 1}
+    with pytest.raises(json.JSONDecodeError) as error:
+        next(records)
+    assert len(error.value.doc) <= 64 + 16
+
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(batched([], 2)) == []
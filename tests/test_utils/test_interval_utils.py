@@ -0,0 +1,62 @@
+from datetime import datetime
+
+import pytest
+
+from turns_app.utils.interval_utils import IntervalIndex
+
+
+def hour(value: int) -> datetime:
+    return datetime(2024, 2, 26, value, 0)
+
+
+@pytest.fixture
+def index() -> IntervalIndex:
+    index = IntervalIndex()
+    # Added out of order
+    index.add(hour(13), hour(15), "C")
+    index.add(hour(8), hour(10), "A")
+    index.add(hour(10), hour(11), "B")
+    return index
+
+
+def test_interval_index_overlapping(index):
+    assert len(index) == 3
+    assert index.overlapping(hour(7), hour(20)) == ["A", "B", "C"]
+    assert index.overlapping(hour(9), hour(10)) == ["A"]
+    assert index.overlapping(hour(9), hour(14)) == ["A", "B", "C"]
+    assert index.overlapping(hour(11), hour(13)) == []
+    # The ends are not included
+    assert index.overlapping(hour(15), hour(16)) == []
+    assert index.overlapping(hour(6), hour(8)) == []
+
+
+def test_interval_index_first_overlapping(index):
+    assert index.first_overlapping(hour(9), hour(14)) == "A"
+    assert index.first_overlapping(hour(12), hour(14)) == "C"
+    assert index.first_overlapping(hour(11), hour(13)) is None
+    assert index.is_free(hour(11), hour(13))
+    assert not index.is_free(hour(14), hour(16))
+    assert IntervalIndex().is_free(hour(8), hour(9))
+
+
+def test_interval_index_remove_overlapping(index):
+    index.remove_overlapping(hour(9), hour(11))
+    assert index.overlapping(hour(7), hour(20)) == ["C"]
+    index.remove_overlapping(hour(11), hour(13))
+    assert len(index) == 1
+
+
+def test_interval_index_overlapping_intervals():
+    # Turns stored before the slots index may overlap
+    index = IntervalIndex()
+    index.add(hour(8), hour(18), "LONG")
+    index.add(hour(9), hour(10), "A")
+    index.add(hour(12), hour(13), "B")
+    assert index.overlapping(hour(11), hour(12)) == ["LONG"]
+    assert index.overlapping(hour(12), hour(14)) == ["LONG", "B"]
+    assert index.first_overlapping(hour(17), hour(19)) == "LONG"
+    assert not index.is_free(hour(10), hour(11))
+
+    index.remove_overlapping(hour(12), hour(13))
+    assert index.overlapping(hour(7), hour(20)) == ["A"]
+    assert index.is_free(hour(10), hour(11))
@@ -0,0 +1,59 @@
+import json
+from datetime import datetime, date
+
+import pytest
+from flask import Flask
+
+from turns_app.model.turns import Turn
+from turns_app.model.users import NamedUser, User
+from turns_app.utils.json_utils import JSON_BACKENDS, get_json_backend, TurnsJSONProvider, json_default
+
+
+@pytest.fixture
+def turn() -> Turn:
+    return Turn(idx="TURN-26.02.2024-08.00-OFF_01", start_time=datetime(2024, 2, 26, 8, 0),
+                end_time=datetime(2024, 2, 26, 9, 0), user=NamedUser(id="USER_01", name="Jöhn Doe"),
+                office_id="OFF_01")
+
+
+def test_json_default(turn):
+    assert json_default(datetime(2024, 2, 26, 8, 0)) == "26.02.2024_08.00"
+    assert json_default(date(2024, 2, 26)) == "26.02.2024"
+    assert json_default(turn) == turn.to_str_dict()
+    user = User(id="USER_01", name="John", email="john@test.com", phone="1234", activity="Test")
+    assert json_default(user) == user.to_dict()
+    with pytest.raises(TypeError):
+        json_default(object())
+
+
+@pytest.mark.parametrize("name", list(JSON_BACKENDS))
+def test_json_backends(name, turn):
+    try:
+        backend = get_json_backend(name)
+    except RuntimeError:
+        pytest.skip(f"The {name} backend is not installed")
+
+    value = {"turns": [turn], "day": datetime(2024, 2, 26, 8, 0), "count": 1, "name": "Jöhn"}
+    expected = {"turns": [turn.to_str_dict()], "day": "26.02.2024_08.00", "count": 1, "name": "Jöhn"}
+    assert backend.loads(backend.dumps(value)) == expected
+    assert json.loads(backend.dumps(value)) == expected
+
+
+def test_get_json_backend():
+    assert get_json_backend().name in JSON_BACKENDS
+    with pytest.raises(ValueError):
+        get_json_backend("xml")
+
+
+def test_json_provider(turn):
+    app = Flask(__name__)
+    app.json = TurnsJSONProvider(app, get_json_backend("json"))
+    with app.app_context():
+        response = app.json.response({"turn": turn})
+    assert response.mimetype == "application/json"
+    assert json.loads(response.data) == {"turn": turn.to_str_dict()}
+    assert app.json.loads('{"a": 1}') == {"a": 1}
+
+    # The json module defaults are not modified
+    with pytest.raises(TypeError):
+        json.dumps(turn)
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+from turns_app.model.users import User
+from turns_app.utils.dataclass_utils import set_codec_observer
+from turns_app.utils.metrics_utils import Counter, Histogram, Gauge, MetricsRegistry, DATACLASS_CODEC_DURATION, \
+    MONGO_COMMAND_DURATION, MONGO_COMMAND_FAILURES, observe_codec
+from turns_app.utils.mongo_utils import CommandMetricsListener
+
+
+def test_histogram_buckets():
+    histogram = Histogram("latency_seconds", "Latency", ("endpoint",), buckets=(0.1, 1.0))
+    for value in [0.05, 0.1, 0.5, 3.0]:
+        histogram.observe(value, ("/a",))
+
+    lines = list(histogram.samples())
+    assert lines == [
+        'latency_seconds_bucket{endpoint="/a",le="0.1"} 2',
+        'latency_seconds_bucket{endpoint="/a",le="1"} 3',
+        'latency_seconds_bucket{endpoint="/a",le="+Inf"} 4',
+        'latency_seconds_sum{endpoint="/a"} 3.65',
+        'latency_seconds_count{endpoint="/a"} 4',
+    ]
+    assert histogram.count(("/a",)) == 4
+    assert histogram.count(("/b",)) == 0
+
+
+def test_registry_render():
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("errors_total", "Errors", ("kind",)))
+    counter.inc(('say "hi"',))
+    counter.inc(('say "hi"',), 2)
+    registry.register(Gauge("ratio", "Ratio", lambda: {(): 0.25}))
+    # The first metric with a name is kept
+    assert registry.register(Counter("errors_total", "Other")) is counter
+
+    assert registry.render() == (
+        "# HELP errors_total Errors\n"
+        "# TYPE errors_total counter\n"
+        'errors_total{kind="say \\"hi\\""} 3\n'
+        "# HELP ratio Ratio\n"
+        "# TYPE ratio gauge\n"
+        "ratio 0.25\n"
+    )
+
+
+def test_codec_observer():
+    user = User(id="U1", name="A", email="a@b.c", phone="1", activity="X")
+    decodes = DATACLASS_CODEC_DURATION.count(("User", "decode"))
+    encodes = DATACLASS_CODEC_DURATION.count(("User", "encode"))
+
+    set_codec_observer(observe_codec)
+    try:
+        assert User.from_dict(user.to_dict()) == user
+    finally:
+        set_codec_observer(None)
+    User.from_dict(user.to_dict())
+
+    assert DATACLASS_CODEC_DURATION.count(("User", "decode")) == decodes + 1
+    assert DATACLASS_CODEC_DURATION.count(("User", "encode")) == encodes + 1
+
+
+def test_command_metrics_listener():
+    listener = CommandMetricsListener()
+    finds = MONGO_COMMAND_DURATION.count(("find",))
+    failures = MONGO_COMMAND_FAILURES.values.get(("find",), 0)
+
+    listener.succeeded(SimpleNamespace(command_name="find", duration_micros=1500))
+    listener.failed(SimpleNamespace(command_name="find", duration_micros=200))
+
+    assert MONGO_COMMAND_DURATION.count(("find",)) == finds + 2
+    assert MONGO_COMMAND_FAILURES.values[("find",)] == failures + 1
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+
+from turns_app.utils.mongo_utils import turns_in_range_query, conflict_query, winning_plan_stages, after_key_query, \
+    encode_page_cursor, decode_page_cursor
+from turns_app.utils.time_utils import TimeRange
+
+
+@pytest.fixture
+def time_range() -> TimeRange:
+    return TimeRange(datetime(2024, 2, 26, 8, 0), datetime(2024, 2, 26, 10, 0))
+
+
+def test_turns_in_range_query(time_range):
+    result = turns_in_range_query(time_range)
+    assert result == {
+        "end_time": {"$gt": datetime(2024, 2, 26, 8, 0)},
+        "start_time": {"$lt": datetime(2024, 2, 26, 10, 0)}
+    }
+
+    result = turns_in_range_query(time_range, office_id="OFF_01", user_id="USER_01")
+    assert result["office_id"] == "OFF_01"
+    assert result["user.id"] == "USER_01"
+    assert result["end_time"] == {"$gt": datetime(2024, 2, 26, 8, 0)}
+    assert result["start_time"] == {"$lt": datetime(2024, 2, 26, 10, 0)}
+
+
+def test_conflict_query(time_range):
+    result = conflict_query(time_range, office_id="OFF_01", user_id="USER_01")
+    assert result == {"$or": [
+        turns_in_range_query(time_range, office_id="OFF_01"),
+        turns_in_range_query(time_range, user_id="USER_01")
+    ]}
+
+
+def test_winning_plan_stages():
+    explain = {"queryPlanner": {"winningPlan": {
+        "stage": "SUBPLAN",
+        "inputStage": {
+            "stage": "FETCH",
+            "inputStage": {
+                "stage": "OR",
+                "inputStages": [
+                    {"stage": "IXSCAN", "indexName": "office_time_range"},
+                    {"stage": "IXSCAN", "indexName": "user_time_range"}
+                ]
+            }
+        }
+    }}}
+    assert winning_plan_stages(explain) == {"SUBPLAN", "FETCH", "OR", "IXSCAN"}
+
+    sbe_explain = {"queryPlanner": {"winningPlan": {"queryPlan": {"stage": "COLLSCAN"}}}}
+    assert winning_plan_stages(sbe_explain) == {"COLLSCAN"}
+
+
+def test_after_key_query(time_range):
+    query = turns_in_range_query(time_range)
+    result = after_key_query(query, datetime(2024, 2, 26, 9, 0), "TURN-A")
+    assert result["$or"] == [
+        {"start_time": {"$gt": datetime(2024, 2, 26, 9, 0)}},
+        {"start_time": datetime(2024, 2, 26, 9, 0), "idx": {"$gt": "TURN-A"}}
+    ]
+    assert result["end_time"] == query["end_time"]
+    assert "$or" not in query
+
+
+def test_page_cursor():
+    key = (datetime(2024, 2, 26, 9, 30), "TURN-26.02.2024-09.30-OFF_01")
+    cursor = encode_page_cursor(*key)
+    assert decode_page_cursor(cursor) == key
+
+    for invalid in ["not a cursor", "bm90IGpzb24=", encode_page_cursor(*key)[:-4]]:
+        with pytest.raises(ValueError):
+            decode_page_cursor(invalid)
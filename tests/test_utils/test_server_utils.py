@@ -0,0 +1,12 @@
+from turns_app.utils.config_utils import ServerConfig
+from turns_app.utils.server_utils import gunicorn_options
+
+
+def test_gunicorn_options():
+    options = gunicorn_options(ServerConfig(host="0.0.0.0", port=8000, workers=4, threads=8, preload=True))
+    assert options == {"bind": "0.0.0.0:8000", "workers": 4, "threads": 8, "worker_class": "gthread",
+                       "preload_app": True}
+
+    options = gunicorn_options(ServerConfig(threads=1, preload=False))
+    assert options["worker_class"] == "sync"
+    assert options["preload_app"] is False
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+
+# Packages that only the blueprints, managers and servers need
+HEAVY_MODULES = ["pymongo", "flask_restx", "motor", "turns_app.model", "turns_app.api"]
+
+
+def loaded_modules(module: str) -> set[str]:
+    code = f"import sys, {module}; print('\\n'.join(sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return set(result.stdout.splitlines())
+
+
+def test_api_service_import_is_light():
+    for module in ["turns_app.api_service", "turns_app.utils.config_utils"]:
+        modules = loaded_modules(module)
+        heavy = [name for name in modules if any(name == h or name.startswith(h + ".") for h in HEAVY_MODULES)]
+        assert heavy == [], module
+
@@ -1,6 +1,9 @@
-from datetime import datetime
+from datetime import datetime, date
 
-from turns_app.utils.time_utils import get_week_by_day, days_in_range
+import pytest
+
+from turns_app.utils.time_utils import get_week_by_day, days_in_range, parse_datetime, DATETIME_FORMAT, TimeRange, \
+    weeks_in_range
 
 
 def test_get_week_by_day():
@@ -22,3 +25,32 @@ def test_days_in_range():
     assert result[0] == "26.02.2024"
     assert result[1] == "27.02.2024"
     assert result[-1] == "03.03.2024"
+
+
+def test_parse_datetime():
+    for value in ["26.02.2024_08.00", "01.12.1999_23.59", "29.02.2024_00.05"]:
+        assert parse_datetime(value) == datetime.strptime(value, DATETIME_FORMAT)
+
+    # Without the leading zeros, padded with spaces, or with other digits
+    for value in ["26.02.2024_8.00", "1.02.2024_8.00", "01.2.2024_08.5", " 1.02.2024_08.00", "2٦.02.2024_08.00"]:
+        assert parse_datetime(value) == datetime.strptime(value, DATETIME_FORMAT)
+
+    for value in ["26.02.2024 08.00", "26-02-2024_08.00", "32.02.2024_08.00", "aa.02.2024_08.00", "26.02.2024",
+                  "+1.02.2024_08.00", "26.02.2024_-8.00"]:
+        with pytest.raises(ValueError):
+            parse_datetime(value)
+
+
+def test_weeks_in_range():
+    result = weeks_in_range(TimeRange(datetime(2024, 2, 26, 8, 0), datetime(2024, 2, 26, 9, 0)))
+    assert result == [date(2024, 2, 26)]
+
+    # Ends when the next week starts
+    result = weeks_in_range(TimeRange(datetime(2024, 3, 3, 23, 0), datetime(2024, 3, 4, 0, 0)))
+    assert result == [date(2024, 2, 26)]
+
+    result = weeks_in_range(TimeRange(datetime(2024, 3, 3, 23, 0), datetime(2024, 3, 4, 1, 0)))
+    assert result == [date(2024, 2, 26), date(2024, 3, 4)]
+
+    result = weeks_in_range(TimeRange(datetime(2024, 2, 28), datetime(2024, 3, 20)))
+    assert result == [date(2024, 2, 26), date(2024, 3, 4), date(2024, 3, 11), date(2024, 3, 18)]
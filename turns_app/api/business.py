@@ -0,0 +1,82 @@
+from flask import Blueprint, Response, current_app
+from flask_restx import Api, fields, Resource, abort
+
+from turns_app.api.users import user_model
+from turns_app.utils.flask_utils import ApiState, conditional_get
+from turns_app.utils.json_utils import output_json
+from turns_app.utils.metrics_utils import METRICS, PROMETHEUS_CONTENT_TYPE
+
+
+api_blueprint = Blueprint('turns_app_api', __name__)
+api_extension = Api(
+    api_blueprint,
+    title='Turns APP API',
+    version='0.1',
+    description='Turns PP API for general services',
+    doc='/doc'
+)
+api_extension.representation('application/json')(output_json)
+
+
+heartbeat_model = api_extension.model('Heartbeat', {
+    "status": fields.String(required=True, description="Service status"),
+    "message": fields.String(required=True, description="Service message")
+})
+
+
+business_config_model = api_extension.model('BusinessConfig', {
+    "name": fields.String(required=True, description="Business name"),
+    "start_time": fields.String(required=True, description="Business address"),
+    "end_time": fields.String(required=True, description="Business phone"),
+    "min_module_time": fields.Integer(required=True, description="Business minimum module time in minutes"),
+    "offices": fields.List(fields.String, required=True, description="List of office names")
+})
+
+business_info_model = api_extension.model('BusinessInfo', {
+    "business_config": fields.Nested(business_config_model, required=True, description="Business configuration"),
+    "users": fields.List(fields.Nested(user_model), required=True, description="List of users")
+})
+
+
+@api_extension.route('/heartbeat', methods=['GET'])
+class Heartbeat(Resource):
+
+    @api_extension.marshal_with(heartbeat_model)
+    def get(self):
+        return {'status': 'ok',
+                'message': 'The service is running'}
+
+
+@api_extension.route('/metrics', methods=['GET'])
+class Metrics(Resource):
+
+    @api_extension.response(200, 'The metrics of the process, in the Prometheus text format')
+    @api_extension.response(404, 'The metrics are disabled')
+    def get(self):
+        if not current_app.config.get("metrics_enabled"):
+            abort(404, "The metrics are disabled, enable them with the metrics option of the server config")
+        return Response(METRICS.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def _business_info_etag() -> str:
+    api_state: ApiState = current_app.config["api_config"]
+    return f"business-{api_state.business_hash}-users-v{api_state.users_manager.current_version()}"
+
+
+@api_extension.route('/business_info', methods=['GET'])
+class BusinessInfo(Resource):
+
+    @api_extension.response(304, 'Not modified since the business info of the If-None-Match ETag')
+    @conditional_get(_business_info_etag)
+    @api_extension.marshal_with(business_info_model)
+    def get(self):
+        api_state: ApiState = current_app.config["api_config"]
+        users_manager = api_state.users_manager
+
+        # Both are kept in memory, the config since startup and the users in the users directory
+        business_info = {
+            "business_config": api_state.business_config,
+            "users": users_manager.user_dicts()
+        }
+
+        return business_info
@@ -1,11 +1,24 @@
 import datetime
+import json
+from itertools import chain
 
-from flask import Blueprint, request, current_app
-from flask_restx import Resource, fields, Api
+from flask import Blueprint, request, current_app, g
+from flask_restx import Resource, fields, Api, marshal, abort
 
-from turns_app.model.turns import get_week_turns
-from turns_app.utils.time_utils import DATE_FORMAT
-from turns_app.utils.flask_utils import ApiState
+from turns_app.model.availability import get_available_slots
+from turns_app.model.turns import get_week_turns, iter_raw_week_turns
+from turns_app.utils.config_utils import AppConfig
+from turns_app.utils.mongo_utils import encode_page_cursor, decode_page_cursor
+from turns_app.utils.time_utils import DATE_FORMAT, TimeRange
+from turns_app.utils.flask_utils import ApiState, stream_mode, stream_response, json_array_parts, ndjson_parts, \
+    conditional_get
+from turns_app.utils.json_utils import output_json
+
+# Longest range of days that an availability search can cover
+MAX_AVAILABILITY_DAYS = 62
+# Number of turns of the range pages
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
 
 
 turns_api_blueprint = Blueprint('turns_api', __name__, url_prefix='/turns')
@@ -16,9 +29,12 @@ turns_api_extension = Api(
     description='Turns API for the turns service',
     doc='/doc'
 )
+turns_api_extension.representation('application/json')(output_json)
 
 day_model = turns_api_extension.model('Day', {
-    "day": fields.String(required=True, description="Day as string. Format: 'DD.MM.YYYY'")
+    "day": fields.String(required=True, description="Day as string. Format: 'DD.MM.YYYY'"),
+    "stream": fields.String(required=False, description="Stream the turns as they are read from the database. "
+                                                        "'json' for the same document, 'ndjson' for a turn per line")
 })
 
 named_user_model = turns_api_extension.model('NamedUser', {
@@ -48,22 +64,192 @@ week_turns_model = turns_api_extension.model('WeekTurns', {
     "sunday": fields.Nested(turns_list_model, required=True, description="Sunday turns")
     })
 
+range_query_model = turns_api_extension.model('RangeQuery', {
+    "start_day": fields.String(required=True, description="First day of the range. Format: 'DD.MM.YYYY'"),
+    "end_day": fields.String(required=True, description="Last day of the range, included. Format: 'DD.MM.YYYY'"),
+    "office_id": fields.String(required=False, description="Only get the turns of this office"),
+    "user_id": fields.String(required=False, description="Only get the turns of this user"),
+    "limit": fields.Integer(required=False, description=f"Turns per page, up to {MAX_PAGE_SIZE}. "
+                                                        f"Default: {DEFAULT_PAGE_SIZE}"),
+    "cursor": fields.String(required=False, description="The next_cursor of the previous page")
+})
+turns_page_model = turns_api_extension.model('TurnsPage', {
+    "turns": fields.List(fields.Nested(turn_model), required=True, description="Turns in start time order"),
+    "next_cursor": fields.String(required=False, description="Cursor of the next page, null in the last page")
+})
+
+cache_stats_model = turns_api_extension.model('CacheStats', {
+    "hits": fields.Integer(required=True, description="Requests answered from the cache"),
+    "misses": fields.Integer(required=True, description="Requests read from the database"),
+    "invalidations": fields.Integer(required=True, description="Weeks dropped by inserted turns"),
+    "hit_rate": fields.Float(required=True, description="Hits over total requests")
+})
+
+availability_query_model = turns_api_extension.model('AvailabilityQuery', {
+    "start_day": fields.String(required=True, description="First day to search. Format: 'DD.MM.YYYY'"),
+    "end_day": fields.String(required=True, description="Last day to search, included. Format: 'DD.MM.YYYY'"),
+    "office_id": fields.String(required=False, description="Only search this office"),
+    "user_id": fields.String(required=False, description="Only return the slots in which this user is free"),
+    "modules": fields.Integer(required=False, description="Minimum number of contiguous free modules. Default: 1")
+})
+available_slot_model = turns_api_extension.model('AvailableSlot', {
+    "office_id": fields.String(required=True, description="Office unique identifier"),
+    "start_time": fields.String(required=True, description="Slot start time. Format: 'DD.MM.YYYY_HH.MM'"),
+    "end_time": fields.String(required=True, description="Slot end time. Format: 'DD.MM.YYYY_HH.MM'")
+})
+availability_model = turns_api_extension.model('Availability', {
+    "slots": fields.List(fields.Nested(available_slot_model), required=True, description="Free slots")
+})
+
+
+def _week_etag() -> str:
+    day = _day_param(request.args, 'day')
+    api_state: ApiState = current_app.config["api_config"]
+    version = api_state.turns_manager.week_version(day)
+    # The cached week must be the one of this version, see get_week_turns
+    g.week_version = version
+    return f"week-{day - datetime.timedelta(days=day.weekday()):%Y%m%d}-v{version}-{request.args.get('stream', 'full')}"
+
 
 @turns_api_extension.route('/get_week', methods=['GET'])
 class GetWeek(Resource):
+    # Build the response straight from the projected documents instead of marshalling Turns
+    raw_read = True
 
     @turns_api_extension.expect(day_model)
-    @turns_api_extension.marshal_with(week_turns_model)
+    @turns_api_extension.response(200, 'Success', week_turns_model)
+    @turns_api_extension.response(304, 'Not modified since the week of the If-None-Match ETag')
+    @conditional_get(_week_etag)
+    def get(self):
+        api_state: ApiState = current_app.config["api_config"]
+        db_manager = api_state.turns_manager
+
+        # get request dict
+        params = dict(request.args)
+
+        formatted_day = _day_param(params, 'day')
+
+        # Streamed weeks are read from the database, the cache keeps whole weeks
+        mode = stream_mode()
+        if mode == "json":
+            return stream_response(_week_json_parts(iter_raw_week_turns(db_manager, formatted_day)), mode)
+        if mode == "ndjson":
+            days = iter_raw_week_turns(db_manager, formatted_day)
+            return stream_response(ndjson_parts(chain.from_iterable(turns for _, _, turns in days)), mode)
+
+        week_version = g.get("week_version")
+        if self.raw_read:
+            return get_week_turns(db_manager, formatted_day, raw=True, week_version=week_version)
+
+        week_turns = get_week_turns(db_manager, formatted_day, week_version=week_version)
+
+        return marshal(week_turns, week_turns_model)
+
+
+def _day_param(params: dict[str, str], name: str) -> datetime.datetime:
+    """Parse a required day of the query, answering with a 400 if it is missing or not a day"""
+    try:
+        return datetime.datetime.strptime(params[name], DATE_FORMAT)
+    except (KeyError, ValueError):
+        abort(400, f"The {name} must be a day with the format DD.MM.YYYY")
+
+
+def _int_param(params: dict[str, str], name: str, default: int) -> int:
+    """Parse an optional integer of the query, answering with a 400 if it is not an integer"""
+    try:
+        return int(params.get(name, default))
+    except ValueError:
+        abort(400, f"The {name} must be an integer")
+
+
+def _week_json_parts(days):
+    yield "{"
+    for i, (name, date, turns) in enumerate(days):
+        yield f'{"," if i else ""}"{name}":{{"turns":'
+        yield from json_array_parts(turns)
+        yield f',"date":{json.dumps(date)}}}'
+    yield "}"
+
+
+@turns_api_extension.route('/range', methods=['GET'])
+class GetRange(Resource):
+
+    @turns_api_extension.expect(range_query_model)
+    @turns_api_extension.marshal_with(turns_page_model)
+    def get(self):
+        api_state: ApiState = current_app.config["api_config"]
+        db_manager = api_state.turns_manager
+
+        # get request dict
+        params = dict(request.args)
+
+        start_day = _day_param(params, 'start_day')
+        end_day = _day_param(params, 'end_day') + datetime.timedelta(days=1)
+        if end_day <= start_day:
+            abort(400, "The end day can not be before the start day")
+
+        limit = _int_param(params, 'limit', DEFAULT_PAGE_SIZE)
+        if not 0 < limit <= MAX_PAGE_SIZE:
+            abort(400, f"The limit must be between 1 and {MAX_PAGE_SIZE}")
+
+        after = None
+        if params.get('cursor'):
+            try:
+                after = decode_page_cursor(params['cursor'])
+            except ValueError as e:
+                abort(400, str(e))
+
+        page = db_manager.get_turns_page(TimeRange(start_day, end_day), limit, after,
+                                         office_id=params.get('office_id'), user_id=params.get('user_id'))
+        next_cursor = encode_page_cursor(*page.next_key) if page.next_key is not None else None
+        return {"turns": page.turns, "next_cursor": next_cursor}
+
+
+@turns_api_extension.route('/availability', methods=['GET'])
+class Availability(Resource):
+
+    @turns_api_extension.expect(availability_query_model)
+    @turns_api_extension.marshal_with(availability_model)
     def get(self):
         api_state: ApiState = current_app.config["api_config"]
         db_manager = api_state.turns_manager
+        app_config: AppConfig = AppConfig.get_instance()  # type: ignore
 
         # get request dict
         params = dict(request.args)
 
-        day_str: str = params.get('day')
-        formatted_day = datetime.datetime.strptime(day_str, DATE_FORMAT)
+        start_day = _day_param(params, 'start_day')
+        end_day = _day_param(params, 'end_day') + datetime.timedelta(days=1)
+        if not 0 < (end_day - start_day).days <= MAX_AVAILABILITY_DAYS:
+            abort(400, f"The range must include between 1 and {MAX_AVAILABILITY_DAYS} days")
+
+        days = TimeRange(start_day, end_day)
+        office_id = params.get('office_id')
+        user_id = params.get('user_id')
+        modules = _int_param(params, 'modules', 1)
+        if modules < 1:
+            abort(400, "The number of modules must be at least 1")
 
-        week_turns = get_week_turns(db_manager, formatted_day)
+        # The occupancy bitmaps answer each day in constant time, the turns are swept otherwise
+        occupancy = api_state.occupancy
+        if occupancy is not None and occupancy.covers(days):
+            db_manager.refresh_weeks(occupancy, days)
+            slots = occupancy.free_slots(days, modules, office_id=office_id, user_id=user_id)
+        else:
+            slots = get_available_slots(db_manager, app_config.business, days, office_id=office_id, user_id=user_id,
+                                        min_modules=modules)
+
+        return {"slots": [slot.to_str_dict() for slot in slots]}
+
+
+@turns_api_extension.route('/cache_stats', methods=['GET'])
+class CacheStats(Resource):
+
+    @turns_api_extension.marshal_with(cache_stats_model)
+    def get(self):
+        api_state: ApiState = current_app.config["api_config"]
+        week_cache = api_state.turns_manager.week_cache
 
-        return week_turns
+        if week_cache is None:
+            return {"hits": 0, "misses": 0, "invalidations": 0, "hit_rate": 0.0}
+        return week_cache.stats.to_dict()
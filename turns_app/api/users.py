@@ -1,8 +1,10 @@
 from flask import Blueprint, request, current_app, jsonify
-from flask_restx import Resource, fields, Api
+from flask_restx import Resource, fields, Api, marshal
 
 
-from turns_app.utils.flask_utils import ApiState
+from turns_app.utils.flask_utils import ApiState, stream_mode, stream_response, json_array_parts, ndjson_parts, \
+    conditional_get
+from turns_app.utils.json_utils import output_json
 
 
 users_api_blueprint = Blueprint('users_api', __name__, url_prefix='/users')
@@ -13,6 +15,7 @@ users_api_extension = Api(
     description='Turns API for the turns service',
     doc='/doc'
 )
+users_api_extension.representation('application/json')(output_json)
 
 named_user_model = users_api_extension.model('NamedUser', {
     "id": fields.String(required=True, description="User unique identifier"),
@@ -35,6 +38,11 @@ users_model = users_api_extension.model('Users', {
     "users": fields.List(fields.Nested(user_model), required=True, description="List of users")
 })
 
+stream_model = users_api_extension.model('Stream', {
+    "stream": fields.String(required=False, description="Stream the users as they are read from the database. "
+                                                        "'json' for the same document, 'ndjson' for a user per line")
+})
+
 
 @users_api_extension.route('/get_user', methods=['GET'])
 class GetWeek(Resource):
@@ -53,14 +61,35 @@ class GetWeek(Resource):
         return user
 
 
+def _users_etag() -> str:
+    api_state: ApiState = current_app.config["api_config"]
+    return f"users-v{api_state.users_manager.current_version()}-{request.args.get('stream', 'full')}"
+
+
 @users_api_extension.route('/get_users', methods=['GET'])
 class GetUsers(Resource):
 
-    @users_api_extension.marshal_with(users_model)
+    @users_api_extension.expect(stream_model)
+    @users_api_extension.response(200, 'Success', users_model)
+    @users_api_extension.response(304, 'Not modified since the users of the If-None-Match ETag')
+    @conditional_get(_users_etag)
     def get(self):
         api_state: ApiState = current_app.config["api_config"]
         db_manager = api_state.users_manager
 
+        mode = stream_mode()
+        if mode == "json":
+            return stream_response(_users_json_parts(db_manager.iter_users()), mode)
+        if mode == "ndjson":
+            return stream_response(ndjson_parts(db_manager.iter_users()), mode)
+
         users = db_manager.get_users()
 
-        return {"users": users}
+        return marshal({"users": users}, users_model)
+
+
+def _users_json_parts(users):
+    yield '{"users":'
+    yield from json_array_parts(users)
+    yield '}'
+
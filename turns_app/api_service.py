@@ -1,105 +1,96 @@
 # Swagger API with Flask
-import json
+import argparse
+import importlib
+from pathlib import Path
+from typing import Iterable
 
-from flask import Flask, jsonify, Blueprint
+from flask import Flask, Blueprint
 from flask_cors import CORS
-from flask_restx import Api, fields, Resource
 
-from turns_app.api.turns import turns_api_blueprint as turns_api
-from turns_app.api.users import users_api_blueprint as users_api, user_model
-from turns_app.defaults import CONFIGS_PATH
-from turns_app.model.turns import Turn
-from turns_app.model.users import User
-from turns_app.utils.config_utils import load_app_config_from_toml, AppConfig
-from utils.flask_utils import update_werkzeug_reloader, ApiState
-
-update_werkzeug_reloader()
-app = Flask(__name__)
-CORS(app)
-
-
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Turn):
-            return obj.to_str_dict()
-        if isinstance(obj, User):
-            return obj.to_dict()
-        return json.JSONEncoder.default(self, obj)
-
-
-# Override default JSON encoder
-json.JSONEncoder = CustomJSONEncoder
-
-
-api_blueprint = Blueprint('turns_app_api', __name__)
-api_extension = Api(
-    api_blueprint,
-    title='Turns APP API',
-    version='0.1',
-    description='Turns PP API for general services',
-    doc='/doc'
-)
-
-
-heartbeat_model = api_extension.model('Heartbeat', {
-    "status": fields.String(required=True, description="Service status"),
-    "message": fields.String(required=True, description="Service message")
-})
-
-
-business_config_model = api_extension.model('BusinessConfig', {
-    "name": fields.String(required=True, description="Business name"),
-    "start_time": fields.String(required=True, description="Business address"),
-    "end_time": fields.String(required=True, description="Business phone"),
-    "min_module_time": fields.Integer(required=True, description="Business minimum module time in minutes"),
-    "offices": fields.List(fields.String, required=True, description="List of office names")
-})
-
-business_info_model = api_extension.model('BusinessInfo', {
-    "business_config": fields.Nested(business_config_model, required=True, description="Business configuration"),
-    "users": fields.List(fields.Nested(user_model), required=True, description="List of users")
-})
-
-
-@api_extension.route('/heartbeat', methods=['GET'])
-class Heartbeat(Resource):
-
-    @api_extension.marshal_with(heartbeat_model)
-    def get(self):
-        return jsonify({'status': 'ok',
-                        'message': 'The service is running'})
-
-
-@api_extension.route('/business_info', methods=['GET'])
-class BusinessInfo(Resource):
-
-    @api_extension.marshal_with(business_info_model)
-    def get(self):
-        api_state: ApiState = app.config["api_config"]
-        users_manager = api_state.users_manager
-        users = users_manager.get_users()
-
-        app_config: AppConfig = AppConfig.get_instance()  # type: ignore
-        bc = app_config.business
-
-        business_info = {
-            "business_config": bc.to_dict(),
-            "users": [user.to_dict() for user in users]
-        }
-
-        return business_info
-
-
-app.register_blueprint(api_blueprint)
-app.register_blueprint(turns_api)
-app.register_blueprint(users_api)
+from turns_app.defaults import DEFAULT_CONFIG_PATH
+from turns_app.utils.config_utils import load_app_config_from_toml, AppConfig, ServerConfig
+from turns_app.utils.json_utils import TurnsJSONProvider
+
+# Blueprints of the API by name, as (module, attribute).
+# Only the blueprints the app is created with are imported, with their models and managers.
+BLUEPRINTS = {
+    "business": ("turns_app.api.business", "api_blueprint"),
+    "turns": ("turns_app.api.turns", "turns_api_blueprint"),
+    "users": ("turns_app.api.users", "users_api_blueprint"),
+}
+
+
+def load_blueprint(name: str) -> Blueprint:
+    if name not in BLUEPRINTS:
+        raise ValueError(f"Unknown blueprint '{name}'. Options: {', '.join(BLUEPRINTS)}")
+    module_name, attribute = BLUEPRINTS[name]
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def create_app(config_path: Path | None = None, app_config: 'AppConfig | None' = None,
+               blueprints: Iterable[str] | None = None) -> Flask:
+    """
+    Build the Flask app. The ApiState, with the database connections, is built by each process before its
+    first request, so the app can be created before a server forks its workers.
+
+    :param config_path: The app config file, loaded if app_config is None. Defaults to DEFAULT_CONFIG_PATH.
+    :param app_config: An already loaded app config
+    :param blueprints: Names of the BLUEPRINTS to serve. Defaults to the ones of the server config.
+    :return: The Flask app
+    """
+    if app_config is None:
+        app_config = load_app_config_from_toml(config_path or DEFAULT_CONFIG_PATH)
+    server_config = app_config.server or ServerConfig()
+
+    app = Flask(__name__)
+    app.json = TurnsJSONProvider(app)
+    CORS(app)
+
+    for name in blueprints if blueprints is not None else server_config.blueprints:
+        app.register_blueprint(load_blueprint(name))
+
+    # Imports the managers, after the blueprints that need them
+    from turns_app.utils.flask_utils import init_api_state, init_metrics
+    if server_config.metrics:
+        # Before the ApiState, so its clients get the command listener and the first request is measured
+        init_metrics(app)
+    init_api_state(app, app_config)
+    return app
 
 
 def main():
-    app_config = load_app_config_from_toml(CONFIGS_PATH / 'app_config.dev.toml')
-    api_config = ApiState.from_app_config(app_config)
-    app.config["api_config"] = api_config
-    app.run(debug=True)
+    parser = argparse.ArgumentParser(description="Serve the turns API")
+    parser.add_argument("--config", type=Path, default=DEFAULT_CONFIG_PATH, help="App config file")
+    parser.add_argument("--dev", action="store_true", help="Use the Flask development server, with the reloader")
+    parser.add_argument("--host", type=str, default=None, help="Host to listen on")
+    parser.add_argument("--port", type=int, default=None, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
+    parser.add_argument("--threads", type=int, default=None, help="Threads of each worker")
+    parser.add_argument("--no-preload", action="store_true", help="Import the app in each worker")
+    parser.add_argument("--lazy", action="store_true", help="Skip the startup indexes and preloads of the workers")
+    parser.add_argument("--metrics", action="store_true", help="Measure the requests and serve them on /metrics")
+    args = parser.parse_args()
+
+    app_config = load_app_config_from_toml(args.config)
+    server_config = app_config.server or ServerConfig()
+    for name in ["host", "port", "workers", "threads"]:
+        if getattr(args, name) is not None:
+            setattr(server_config, name, getattr(args, name))
+    if args.no_preload:
+        server_config.preload = False
+    if args.lazy:
+        server_config.lazy = True
+    if args.metrics:
+        server_config.metrics = True
+    app_config.server = server_config
+
+    if args.dev:
+        from turns_app.utils.flask_utils import update_werkzeug_reloader
+        update_werkzeug_reloader()
+        create_app(app_config=app_config).run(host=server_config.host, port=server_config.port, debug=True)
+    else:
+        from turns_app.utils.server_utils import serve
+        serve(create_app(app_config=app_config), server_config)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,184 @@
+# Async API serving the schedule reads from a single event loop
+import argparse
+import datetime
+import os
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+from urllib.parse import parse_qsl
+
+from turns_app.defaults import DEFAULT_CONFIG_PATH, CONFIG_PATH_ENV
+from turns_app.model.async_managers import AsyncMongoTurnsManager, AsyncMongoUsersManager, get_week_turns_async
+from turns_app.model.turns import business_slot_minutes
+from turns_app.utils.config_utils import load_app_config_from_toml, AppConfig, close_async_mongo_clients
+from turns_app.utils.flask_utils import config_hash
+from turns_app.utils.json_utils import dumps
+from turns_app.utils.time_utils import DATE_FORMAT
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        super().__init__(etag)
+        self.etag = etag
+
+
+def check_etag(headers: dict[str, str], etag: str) -> str:
+    """Raise NotModified if the If-None-Match of the request matches the ETag of the resource"""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in tags or f'"{etag}"' in tags:
+            raise NotModified(etag)
+    return etag
+
+
+# A handler gets the query arguments and the request headers, and returns the body to serialize and
+# the ETag of the resource, if it has one. Handlers raise NotModified before reading unchanged resources.
+Handler = Callable[[dict[str, str], dict[str, str]], Awaitable[tuple[Any, str | None]]]
+
+
+class TurnsAsgiApp:
+    """
+    ASGI application with the read endpoints of the Flask API, with the same paths and response bodies.
+    The requests are served concurrently by the async managers, without a thread per request.
+    The managers are created at the lifespan startup, inside the event loop of the server.
+    """
+
+    def __init__(self, app_config: AppConfig):
+        self.app_config = app_config
+        self.business_config = app_config.business.to_dict()
+        self.business_hash = config_hash(app_config.business)
+        self.turns_manager: AsyncMongoTurnsManager | None = None
+        self.users_manager: AsyncMongoUsersManager | None = None
+        self.routes: dict[str, Handler] = {
+            "/heartbeat": self.heartbeat,
+            "/business_info": self.business_info,
+            "/turns/get_week": self.get_week,
+            "/users/get_user": self.get_user,
+            "/users/get_users": self.get_users,
+        }
+
+    def startup(self) -> None:
+        self.turns_manager = AsyncMongoTurnsManager(self.app_config.mongo,
+                                                    business_slot_minutes(self.app_config.business))
+        self.users_manager = AsyncMongoUsersManager(self.app_config.mongo)
+
+    def shutdown(self) -> None:
+        close_async_mongo_clients()
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        handler = self.routes.get(scope["path"])
+        try:
+            if handler is None:
+                raise HttpError(404, f"The path {scope['path']} does not exist")
+            if scope["method"] != "GET":
+                raise HttpError(405, f"The method {scope['method']} is not allowed")
+
+            if self.turns_manager is None:
+                self.startup()
+            args = dict(parse_qsl(scope["query_string"].decode("latin-1")))
+            body, etag = await handler(args, headers)
+        except NotModified as e:
+            await self._respond(send, 304, None, e.etag)
+            return
+        except HttpError as e:
+            await self._respond(send, e.status, {"message": e.message})
+            return
+
+        await self._respond(send, 200, body, etag)
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _respond(send: Callable, status: int, body: Any, etag: str | None = None) -> None:
+        headers = [(b"content-type", b"application/json")]
+        if etag is not None:
+            headers.append((b"etag", f'"{etag}"'.encode("latin-1")))
+        content = (dumps(body) + "\n").encode() if body is not None else b""
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": content})
+
+    async def heartbeat(self, args: dict[str, str], headers: dict[str, str]) -> tuple[Any, str | None]:
+        return {"status": "ok", "message": "The service is running"}, None
+
+    async def business_info(self, args: dict[str, str], headers: dict[str, str]) -> tuple[Any, str | None]:
+        etag = check_etag(headers, f"business-{self.business_hash}-users-v{await self.users_manager.version()}")
+        return {"business_config": self.business_config, "users": await self.users_manager.get_user_dicts()}, etag
+
+    async def get_week(self, args: dict[str, str], headers: dict[str, str]) -> tuple[Any, str | None]:
+        try:
+            day = datetime.datetime.strptime(args.get("day", ""), DATE_FORMAT)
+        except ValueError:
+            raise HttpError(400, f"The day must have the format {DATE_FORMAT}")
+
+        version = await self.turns_manager.week_version(day)
+        etag = check_etag(headers, f"week-{day - datetime.timedelta(days=day.weekday()):%Y%m%d}-v{version}-full")
+        return await get_week_turns_async(self.turns_manager, day), etag
+
+    async def get_user(self, args: dict[str, str], headers: dict[str, str]) -> tuple[Any, str | None]:
+        user = await self.users_manager.get_by_id(args.get("id", ""))
+        if user is None:
+            raise HttpError(404, f"The user {args.get('id')} does not exist")
+        return user.to_dict(), None
+
+    async def get_users(self, args: dict[str, str], headers: dict[str, str]) -> tuple[Any, str | None]:
+        etag = check_etag(headers, f"users-v{await self.users_manager.version()}-full")
+        return {"users": await self.users_manager.get_user_dicts()}, etag
+
+
+def create_asgi_app(config_path: Path) -> TurnsAsgiApp:
+    return TurnsAsgiApp(load_app_config_from_toml(config_path))
+
+
+def create_asgi_app_from_env() -> TurnsAsgiApp:
+    """App factory for servers that build the app in each worker, with the config file of CONFIG_PATH_ENV.
+    For example: uvicorn --factory --workers 4 turns_app.asgi_service:create_asgi_app_from_env"""
+    return create_asgi_app(Path(os.environ.get(CONFIG_PATH_ENV, DEFAULT_CONFIG_PATH)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the read endpoints of the API with an ASGI server")
+    parser.add_argument("--config", type=Path, default=DEFAULT_CONFIG_PATH, help="App config file")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to listen on")
+    parser.add_argument("--port", type=int, default=5001, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes, each with its own event loop")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError as e:
+        raise ImportError("Serving the async API needs uvicorn, install it with 'pip install uvicorn'") from e
+
+    if args.workers > 1:
+        # The workers import the app themselves
+        os.environ[CONFIG_PATH_ENV] = str(args.config)
+        uvicorn.run("turns_app.asgi_service:create_asgi_app_from_env", factory=True, host=args.host, port=args.port,
+                    workers=args.workers)
+    else:
+        uvicorn.run(create_asgi_app(args.config), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
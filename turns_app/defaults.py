@@ -4,3 +4,6 @@ from pathlib import Path
 PROJECT_PATH = Path(__file__).resolve().parent.parent
 CORE_PATH = PROJECT_PATH / 'turns_app'
 CONFIGS_PATH = PROJECT_PATH / 'configs'
+DEFAULT_CONFIG_PATH = CONFIGS_PATH / 'app_config.dev.toml'
+# Environment variable with the app config file of the WSGI and ASGI entry points
+CONFIG_PATH_ENV = 'TURNS_APP_CONFIG'
@@ -0,0 +1,37 @@
+# Store the slots of the turns that were saved without them, or with another slot length
+import argparse
+import sys
+from pathlib import Path
+
+from turns_app.defaults import DEFAULT_CONFIG_PATH
+from turns_app.model.turns import MongoTurnsManager, business_slot_minutes
+from turns_app.utils.config_utils import load_app_config_from_toml, close_mongo_clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add the slots to the stored turns. Run it with the API stopped.")
+    parser.add_argument("--config", type=Path, default=DEFAULT_CONFIG_PATH, help="App config file")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Compute the slots of every turn again, after a change of the business modules")
+    args = parser.parse_args()
+
+    app_config = load_app_config_from_toml(args.config)
+    slot_minutes = business_slot_minutes(app_config.business)
+    manager = MongoTurnsManager(app_config.mongo, slot_minutes)
+    try:
+        report = manager.backfill_slots(rebuild=args.rebuild)
+    finally:
+        close_mongo_clients()
+
+    rejected = [result for result in report if not result.accepted]
+    print(f"Stored the {slot_minutes} minute slots of {len(report) - len(rejected)} turns")
+    if rejected:
+        # These turns overlap other stored turns, the slots index can not guard them until they are fixed
+        print(f"{len(rejected)} turns overlap other turns and were left without slots:")
+        for result in rejected:
+            print(f"  {result.turn.idx}: {result.reason}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
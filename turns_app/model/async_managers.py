@@ -0,0 +1,143 @@
+import asyncio
+from datetime import datetime
+from typing import Any
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from turns_app.model.turns import Turn, TurnsInterner, not_available_error, conflict_error, turn_slots, \
+    week_version_key, make_raw_week_dict, WEEK_TURN_PROJECTION, TURNS_INDEXES
+from turns_app.model.users import User, UserExistsError, USER_PROJECTION, USERS_VERSION_KEY, USERS_INDEXES
+from turns_app.utils.config_utils import MongoConfig
+from turns_app.utils.dataclass_utils import TRUSTED_SOURCE, validation_policy
+from turns_app.utils.mongo_utils import turns_in_range_query, conflict_query, AsyncVersionCounters
+from turns_app.utils.time_utils import TimeRange, get_week_by_day, days_in_range, weeks_in_range
+
+
+class AsyncMongoTurnsManager:
+    """
+    Async counterpart of MongoTurnsManager, over Motor.
+    It writes the same documents and versions, so both managers can serve the same database.
+    The in-memory caches and indexes of the sync manager are not kept, every read goes to the database.
+    Must be created and used inside the event loop that serves the requests.
+    """
+
+    def __init__(self, mongo_config: MongoConfig, slot_minutes: int):
+        self.mongo_config = mongo_config
+        self.collection = self.mongo_config.async_db.turns
+        self.versions = AsyncVersionCounters(self.mongo_config.async_db.versions)
+        self.slot_minutes = slot_minutes
+        # Whether the slots index guards the writes, checked on the first write
+        self._slots_index: bool | None = None
+        self._slots_index_lock = asyncio.Lock()
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_indexes(TURNS_INDEXES)
+        self._slots_index = True
+
+    async def slots_index_guards(self) -> bool:
+        """Create the indexes before the first write of the manager, as MongoTurnsManager.slots_index_guards"""
+        if self._slots_index is None:
+            async with self._slots_index_lock:
+                if self._slots_index is None:
+                    try:
+                        await self.ensure_indexes()
+                    except PyMongoError:
+                        self._slots_index = "slots_unique" in await self.collection.index_information()
+        return self._slots_index
+
+    async def get_turn_by_id(self, turn_id: str) -> Turn | None:
+        turn_dict = await self.collection.find_one({"idx": turn_id})
+        return Turn.from_dict(turn_dict, TRUSTED_SOURCE) if turn_dict else None
+
+    async def get_turns_in_range(self, time_range: TimeRange) -> list[Turn]:
+        query = turns_in_range_query(time_range)
+
+        interner = TurnsInterner()
+        with validation_policy(TRUSTED_SOURCE):
+            return [interner.turn(turn) async for turn in self.collection.find(query)]
+
+    async def get_raw_turns_in_range(self, time_range: TimeRange,
+                                     projection: dict[str, int] | None = None) -> list[dict[str, Any]]:
+        query = turns_in_range_query(time_range)
+        return [document async for document in self.collection.find(query, projection or WEEK_TURN_PROJECTION)]
+
+    async def conflict_turn(self, turn: Turn) -> Turn | None:
+        turn_dict = await self.collection.find_one(conflict_query(turn.duration, turn.office_id, turn.user.id))
+        return Turn.from_dict(turn_dict, TRUSTED_SOURCE) if turn_dict else None
+
+    def turn_document(self, turn: Turn) -> dict[str, Any]:
+        document = turn.to_dict()
+        document["slots"] = turn_slots(turn, self.slot_minutes)
+        return document
+
+    async def insert_turn(self, turn: Turn) -> None:
+        if not await self.slots_index_guards():
+            conflict = await self.conflict_turn(turn)
+            if conflict is not None:
+                raise conflict_error(turn, conflict)
+
+        # The unique slots index rejects conflicting turns, even if they are inserted concurrently
+        try:
+            await self.collection.insert_one(self.turn_document(turn))
+        except DuplicateKeyError as e:
+            raise not_available_error(turn, e.details) from e
+
+        await self.versions.bump(week_version_key(week) for week in weeks_in_range(turn.duration))
+
+    async def week_version(self, day: datetime) -> int:
+        return await self.versions.get(week_version_key(get_week_by_day(day).start_time.date()))
+
+
+async def get_week_turns_async(manager: AsyncMongoTurnsManager, day: datetime) -> dict[str, Any]:
+    """Get the turns of the week of the given day in the API week model, as get_week_turns with raw=True"""
+    week = get_week_by_day(datetime.combine(day.date(), datetime.min.time()))
+    documents = await manager.get_raw_turns_in_range(week)
+    return make_raw_week_dict(documents, days_in_range(week))
+
+
+class AsyncMongoUsersManager:
+    """Async counterpart of MongoUsersManager, over Motor. Every read goes to the database."""
+
+    def __init__(self, mongo_config: MongoConfig):
+        self.mongo_config = mongo_config
+        self.collection = self.mongo_config.async_db.users
+        self.versions = AsyncVersionCounters(self.mongo_config.async_db.versions)
+        self._indexes_ready = False
+        self._indexes_lock = asyncio.Lock()
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_indexes(USERS_INDEXES)
+        self._indexes_ready = True
+
+    async def _ensure_indexes_once(self) -> None:
+        if not self._indexes_ready:
+            async with self._indexes_lock:
+                if not self._indexes_ready:
+                    await self.ensure_indexes()
+
+    async def get_by_id(self, user_id: str) -> User | None:
+        user_dict = await self.collection.find_one({"id": user_id})
+        return User.from_dict(user_dict, TRUSTED_SOURCE) if user_dict else None
+
+    async def get_users(self) -> list[User]:
+        with validation_policy(TRUSTED_SOURCE):
+            return [User.from_dict(user) async for user in self.collection.find()]
+
+    async def get_user_dicts(self) -> list[dict[str, Any]]:
+        """Get the documents of the users in the API user model, without building Users"""
+        return [user async for user in self.collection.find({}, USER_PROJECTION).sort("id", 1)]
+
+    async def create_user(self, user: User) -> None:
+        await self._ensure_indexes_once()
+        if await self.collection.find_one({"id": user.id}, {"_id": 1}):
+            raise UserExistsError(f"The user with idx {user.id} already exists")
+
+        try:
+            await self.collection.insert_one(user.to_dict())
+        except DuplicateKeyError as e:
+            raise UserExistsError(f"The user with idx {user.id} already exists") from e
+        await self.versions.bump([USERS_VERSION_KEY])
+
+    async def version(self) -> int:
+        return await self.versions.get(USERS_VERSION_KEY)
+
@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from turns_app.model.turns import Turn, MongoTurnsManager
+from turns_app.utils.config_utils import BusinessConfig
+from turns_app.utils.dataclass_utils import BaseDataclass
+from turns_app.utils.time_utils import TimeRange, Day, DATETIME_FORMAT, days_in_range, parse_datetime
+
+
+def day_modules(day: Day, bc: BusinessConfig) -> list[TimeRange]:
+    """Get the time ranges for each module in a day"""
+    modules = []
+    current_time = parse_datetime(f"{day}_{bc.start_time}")
+    day_end_time = parse_datetime(f"{day}_{bc.end_time}")
+    while current_time < day_end_time:
+        end_time = current_time + timedelta(minutes=bc.min_module_time)
+        modules.append(TimeRange(current_time, end_time))
+        current_time = end_time
+    return modules
+
+
+def merge_ranges(ranges: list[TimeRange]) -> list[TimeRange]:
+    """Merge the overlapping time ranges of a list sorted by start time"""
+    merged = []
+    for time_range in ranges:
+        if merged and time_range.start_time <= merged[-1].end_time:
+            merged[-1].end_time = max(merged[-1].end_time, time_range.end_time)
+        else:
+            merged.append(TimeRange(time_range.start_time, time_range.end_time))
+    return merged
+
+
+def free_slots(modules: list[TimeRange], busy: list[TimeRange]) -> list[TimeRange]:
+    """
+    Get the free time of the modules, as contiguous free modules merged together.
+    Both lists are swept at once, so the cost is linear in modules and busy ranges.
+
+    :param modules: The modules, sorted by start time
+    :param busy: The taken time ranges, sorted by start time and not overlapping each other
+    :return: The free slots, sorted by start time
+    """
+    slots = []
+    position = 0
+    for module in modules:
+        while position < len(busy) and busy[position].end_time <= module.start_time:
+            position += 1
+        if position < len(busy) and busy[position].start_time < module.end_time:
+            continue
+
+        if slots and slots[-1].end_time == module.start_time:
+            slots[-1].end_time = module.end_time
+        else:
+            slots.append(TimeRange(module.start_time, module.end_time))
+    return slots
+
+
+@dataclass
+class AvailableSlot(BaseDataclass):
+    office_id: str
+    start_time: datetime
+    end_time: datetime
+
+    def to_str_dict(self) -> dict[str, Any]:
+        return {
+            "office_id": self.office_id,
+            "start_time": self.start_time.strftime(DATETIME_FORMAT),
+            "end_time": self.end_time.strftime(DATETIME_FORMAT)
+        }
+
+
+def _range_turns(manager: MongoTurnsManager, time_range: TimeRange) -> list[Turn]:
+    schedule_index = manager.current_schedule_index(time_range)
+    if schedule_index is not None:
+        turns = {turn.idx: turn for schedule in schedule_index.offices.values()
+                 for turn in schedule.overlapping(time_range.start_time, time_range.end_time)}
+        return list(turns.values())
+    return manager.get_turns_in_range(time_range)
+
+
+def get_available_slots(manager: MongoTurnsManager, bc: BusinessConfig, days: TimeRange,
+                        office_id: str | None = None, user_id: str | None = None,
+                        min_modules: int = 1) -> list[AvailableSlot]:
+    """
+    Get the free slots of the offices in the days of the range, aligned to the business modules.
+
+    :param manager: The turns manager
+    :param bc: The business configuration, with the opening hours, module length and offices
+    :param days: The days to search, from the start of the first one to the start of the day after the last one
+    :param office_id: Only search this office, all the business offices if None
+    :param user_id: Only return the slots in which the user has no turns in any office
+    :param min_modules: The minimum number of contiguous free modules of a slot
+    :return: The free slots of each office, in office and time order
+    """
+    min_length = timedelta(minutes=bc.min_module_time * min_modules)
+    modules = [module for day in days_in_range(days) for module in day_modules(day, bc)]
+    turns = sorted(_range_turns(manager, days), key=lambda turn: turn.start_time)
+    user_busy = [turn.duration for turn in turns if turn.user.id == user_id]
+
+    slots = []
+    for office in ([office_id] if office_id is not None else bc.offices):
+        office_busy = [turn.duration for turn in turns if turn.office_id == office]
+        busy = merge_ranges(sorted(office_busy + user_busy, key=lambda time_range: time_range.start_time))
+        slots.extend(AvailableSlot(office, slot.start_time, slot.end_time) for slot in free_slots(modules, busy)
+                     if slot.end_time - slot.start_time >= min_length)
+    return slots
@@ -0,0 +1,151 @@
+import threading
+from datetime import datetime, date, timedelta
+from typing import Iterator
+
+from turns_app.model.availability import AvailableSlot
+from turns_app.model.turns import Turn, MongoTurnsManager, WeekVersions
+from turns_app.utils.config_utils import BusinessConfig
+from turns_app.utils.time_utils import TimeRange, TIME_FORMAT
+
+
+def _runs_start(free: int, length: int) -> int:
+    """Bits of the positions where `length` contiguous set bits of `free` start"""
+    runs = free
+    covered = 1
+    # Doubling the checked length at each step takes log(length) operations
+    while covered * 2 <= length:
+        runs &= runs >> covered
+        covered *= 2
+    if covered < length:
+        runs &= runs >> (length - covered)
+    return runs
+
+
+def _spread(bits: int, length: int) -> int:
+    """Set the `length` - 1 bits above every set bit"""
+    spread = bits
+    covered = 1
+    while covered * 2 <= length:
+        spread |= spread << covered
+        covered *= 2
+    if covered < length:
+        spread |= spread << (length - covered)
+    return spread
+
+
+def _segments(bits: int) -> list[tuple[int, int]]:
+    """Get the (first, end) positions of each run of set bits"""
+    segments = []
+    while bits:
+        first = (bits & -bits).bit_length() - 1
+        shifted = bits >> first
+        length = (~shifted & (shifted + 1)).bit_length() - 1
+        segments.append((first, first + length))
+        bits &= ~(((1 << length) - 1) << first)
+    return segments
+
+
+class OccupancyMap:
+    """
+    Taken modules of each office and user per day, as int bitsets where bit i is module i of the day.
+    Searching free modules of a day is a few bitwise operations, whatever the number of turns.
+    Built for a time range, turns outside of it are ignored. Refresh the searched weeks with
+    MongoTurnsManager.refresh_weeks first, to see the turns inserted by other processes.
+    """
+
+    def __init__(self, bc: BusinessConfig, time_range: TimeRange):
+        self.bc = bc
+        self.time_range = time_range
+        self.module = timedelta(minutes=bc.min_module_time)
+        opening = datetime.strptime(bc.start_time, TIME_FORMAT)
+        closing = datetime.strptime(bc.end_time, TIME_FORMAT)
+        self.opening = timedelta(hours=opening.hour, minutes=opening.minute)
+        # The last module may end after closing time, as in day_modules
+        self.modules_per_day = -((opening - closing) // self.module)
+        self.full_day = (1 << self.modules_per_day) - 1
+
+        self.week_versions = WeekVersions()
+        # Replaced, not modified, when a week is reloaded, so it can be read without the lock
+        self._bitmaps: dict[tuple[str, str, date], int] = {}
+        self._lock = threading.Lock()
+
+    def covers(self, time_range: TimeRange) -> bool:
+        return self.time_range.start_time <= time_range.start_time and time_range.end_time <= self.time_range.end_time
+
+    def day_start(self, day: date) -> datetime:
+        return datetime.combine(day, datetime.min.time()) + self.opening
+
+    def _turn_bits(self, turn: Turn) -> Iterator[tuple[tuple[str, str, date], int]]:
+        """The bitmap keys of the turn and the modules it takes in each of them"""
+        start_time = max(turn.start_time, self.time_range.start_time)
+        end_time = min(turn.end_time, self.time_range.end_time)
+
+        day = start_time.date()
+        while datetime.combine(day, datetime.min.time()) < end_time:
+            day_start = self.day_start(day)
+            first = max((start_time - day_start) // self.module, 0)
+            last = min(-((day_start - end_time) // self.module), self.modules_per_day)
+            if first < last:
+                bits = ((1 << (last - first)) - 1) << first
+                yield ("office", turn.office_id, day), bits
+                yield ("user", turn.user.id, day), bits
+            day += timedelta(days=1)
+
+    def add(self, turn: Turn) -> None:
+        with self._lock:
+            for key, bits in self._turn_bits(turn):
+                self._bitmaps[key] = self._bitmaps.get(key, 0) | bits
+
+    def reload_week(self, week: TimeRange, turns: list[Turn], version: int) -> None:
+        week_days = {week.start_time.date() + timedelta(days=i) for i in range(7)}
+        with self._lock:
+            bitmaps = {key: bits for key, bits in self._bitmaps.items() if key[2] not in week_days}
+            for turn in turns:
+                for key, bits in self._turn_bits(turn):
+                    bitmaps[key] = bitmaps.get(key, 0) | bits
+            self._bitmaps = bitmaps
+            self.week_versions.loaded(week.start_time.date(), version)
+
+    def occupancy(self, office_id: str, day: date) -> int:
+        return self._bitmaps.get(("office", office_id, day), 0)
+
+    def user_occupancy(self, user_id: str, day: date) -> int:
+        return self._bitmaps.get(("user", user_id, day), 0)
+
+    def free_slots(self, days: TimeRange, min_modules: int = 1, office_id: str | None = None,
+                   user_id: str | None = None) -> list[AvailableSlot]:
+        """
+        Get the free slots of at least `min_modules` contiguous modules of the offices in the days of the range.
+
+        :param days: The days to search, from the start of the first one to the start of the day after the last one
+        :param min_modules: The minimum number of contiguous free modules of a slot
+        :param office_id: Only search this office, all the business offices if None
+        :param user_id: Only return the slots in which the user has no turns in any office
+        :return: The free slots of each office, in office and time order
+        """
+        search_days = []
+        day = days.start_time.date()
+        while day < days.end_time.date():
+            search_days.append(day)
+            day += timedelta(days=1)
+
+        slots = []
+        for office in ([office_id] if office_id is not None else self.bc.offices):
+            for day in search_days:
+                taken = self.occupancy(office, day)
+                if user_id is not None:
+                    taken |= self.user_occupancy(user_id, day)
+
+                free = self.full_day & ~taken
+                runs = _spread(_runs_start(free, min_modules), min_modules) & free
+                day_start = self.day_start(day)
+                for first, end in _segments(runs):
+                    slots.append(AvailableSlot(office, day_start + first * self.module, day_start + end * self.module))
+        return slots
+
+
+def load_occupancy(manager: MongoTurnsManager, bc: BusinessConfig, time_range: TimeRange) -> OccupancyMap:
+    """Build the occupancy of the time range, updated with the turns inserted by the manager"""
+    occupancy = OccupancyMap(bc, time_range)
+    manager.add_week_view(occupancy)
+    return occupancy
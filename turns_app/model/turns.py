@@ -1,14 +1,28 @@
-from copy import deepcopy
-from datetime import datetime
-from dataclasses import dataclass
-from typing import Any, TypedDict
+import math
+import sys
+import threading
+import time
+from collections import defaultdict
+from functools import cached_property
+from itertools import groupby
+from datetime import datetime, date, timedelta
+from dataclasses import dataclass, field
+from typing import Any, TypedDict, Iterable, Iterator, Callable, Protocol
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError, BulkWriteError, PyMongoError
 
 from turns_app.model.users import NamedUser
-from turns_app.utils.config_utils import MongoConfig
-from turns_app.utils.dataclass_utils import BaseDataclass
-from turns_app.utils.mongo_utils import turns_in_range_query
+from turns_app.utils.cache_utils import CacheBackend, LRUCache, CacheStats, MISSING
+from turns_app.utils.config_utils import MongoConfig, BusinessConfig
+from turns_app.utils.dataclass_utils import BaseDataclass, TRUSTED_SOURCE, validation_policy
+from turns_app.utils.import_utils import batched
+from turns_app.utils.interval_utils import IntervalIndex
+from turns_app.utils.mongo_utils import turns_in_range_query, turns_by_day_pipeline, conflict_query, ensure_indexes, \
+    index_report, IndexReport, after_key_query, VersionCounters
 from turns_app.utils.time_utils import TimeRange, Day, TIME_FORMAT, DATETIME_FORMAT, DATE_FORMAT, get_week_by_day, \
-    days_in_range
+    days_in_range, parse_datetime, weeks_in_range
 
 
 def turn_id_generator(start_time: datetime, office_id: str) -> str:
@@ -18,7 +32,7 @@ def turn_id_generator(start_time: datetime, office_id: str) -> str:
     return f"TURN-{date}-{time}-{office_id}"
 
 
-@dataclass
+@dataclass(slots=True)
 class Turn(BaseDataclass):
     idx: str              # Unique identifier
 
@@ -43,12 +57,42 @@ class Turn(BaseDataclass):
 
 
 def turn_from_source_dict(values: dict[str, Any]) -> Turn:
-    init_dict = deepcopy(values)
-    init_dict["start_time"] = datetime.strptime(values["start_date"], DATETIME_FORMAT)
-    init_dict["end_time"] = datetime.strptime(values["end_date"], DATETIME_FORMAT)
+    # from_dict does not modify its input, so a shallow copy is enough
+    init_dict = dict(values)
+    init_dict["start_time"] = parse_datetime(values["start_date"])
+    init_dict["end_time"] = parse_datetime(values["end_date"])
     return Turn.from_dict(init_dict)
 
 
+class TurnsInterner:
+    """
+    Build the turns of a result set sharing their repeated values.
+    A week or a month of turns repeats the same few users and offices many times,
+    so equal NamedUsers are stored once and the office ids are interned.
+    The shared NamedUsers must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._users: dict[tuple[str, str], NamedUser] = {}
+
+    def named_user(self, values: dict[str, Any]) -> NamedUser:
+        key = (values["id"], values["name"])
+        user = self._users.get(key)
+        if user is None:
+            user = NamedUser(id=sys.intern(key[0]), name=key[1])
+            self._users[key] = user
+        return user
+
+    def turn(self, values: dict[str, Any]) -> Turn:
+        return Turn(
+            idx=values["idx"],
+            start_time=values["start_time"],
+            end_time=values["end_time"],
+            user=self.named_user(values["user"]),
+            office_id=sys.intern(values["office_id"])
+        )
+
+
 class DayTurns(TypedDict):
     turns: list[Turn]
     date: Day
@@ -68,66 +112,776 @@ class TurnNotAvailableError(Exception):
     pass
 
 
+@dataclass
+class TurnInsertResult:
+    turn: Turn
+    accepted: bool
+    reason: str | None = None  # Why the turn was rejected
+
+    def reject(self, reason: str) -> None:
+        self.accepted = False
+        self.reason = reason
+
+
+@dataclass
+class TurnsImport:
+    imported: int = 0
+    rejected: list[TurnInsertResult] = field(default_factory=list)  # The turns whose slots were taken
+
+
+@dataclass
+class TurnsPage:
+    turns: list[Turn]
+    next_key: tuple[datetime, str] | None = None  # (start_time, idx) of the last turn if there are more pages
+
+
+# Order of the turns in the range pages. The idx breaks the ties of turns that start at the same time.
+TURNS_PAGE_SORT = [("start_time", ASCENDING), ("idx", ASCENDING)]
+
+
+def _reject_overlaps(results: list[TurnInsertResult]) -> None:
+    """
+    Reject the turns that overlap a previous accepted turn of the same office or user.
+    The turns are swept in start time order keeping the end of the last accepted turn of each office and user,
+    so the check is linear after sorting.
+    """
+    office_ends: dict[str, datetime] = {}
+    user_ends: dict[str, datetime] = {}
+    for result in sorted(results, key=lambda result: result.turn.start_time):
+        turn = result.turn
+        if turn.start_time < office_ends.get(turn.office_id, datetime.min):
+            result.reject(f"Office {turn.office_id} has a turn at the same time.")
+        elif turn.start_time < user_ends.get(turn.user.id, datetime.min):
+            result.reject(f"User {turn.user.id} has a turn at the same time.")
+        else:
+            office_ends[turn.office_id] = turn.end_time
+            user_ends[turn.user.id] = turn.end_time
+
+
+def not_available_error(turn: Turn, error_details: dict[str, Any] | None) -> TurnNotAvailableError:
+    """Explain the duplicate key error raised when inserting the turn"""
+    key_value = (error_details or {}).get("keyValue", {})
+    if "idx" in key_value:
+        return TurnNotAvailableError(f"A turn with idx {turn.idx} already exists.")
+    if str(key_value.get("slots", "")).startswith("user:"):
+        return TurnNotAvailableError(f"User {turn.user.id} has a turn at the same time.")
+    return TurnNotAvailableError(f"Office {turn.office_id} has a turn at the same time.")
+
+
+def _is_slots_conflict(write_error: dict[str, Any]) -> bool:
+    """Whether the write error is the slots index rejecting a turn that overlaps a stored turn"""
+    if write_error.get("code") != 11000:
+        return False
+    return "slots" in (write_error.get("keyValue") or {}) or "slots_unique" in write_error.get("errmsg", "")
+
+
+def conflict_error(turn: Turn, conflict: 'Turn') -> TurnNotAvailableError:
+    """Explain the conflict of the turn with a stored turn"""
+    if conflict.user.id == turn.user.id:
+        return TurnNotAvailableError(f"User {turn.user.id} has a turn at the same time.")
+    return TurnNotAvailableError(f"Office {turn.office_id} has a turn at the same time.")
+
+
+# Range queries filter on end_time > range start, so end_time leads start_time in the
+# compound indexes. That keeps the scanned keys proportional to the turns after the range
+# start instead of to the whole history.
+TURNS_INDEXES = [
+    IndexModel([("idx", ASCENDING)], name="idx_unique", unique=True),
+    IndexModel([("office_id", ASCENDING), ("end_time", ASCENDING), ("start_time", ASCENDING)],
+               name="office_time_range"),
+    IndexModel([("user.id", ASCENDING), ("end_time", ASCENDING), ("start_time", ASCENDING)],
+               name="user_time_range"),
+    IndexModel([("end_time", ASCENDING), ("start_time", ASCENDING)], name="time_range"),
+    # Walks the turns in the order of the range pages, see MongoTurnsManager.get_turns_page
+    IndexModel([("start_time", ASCENDING), ("idx", ASCENDING)], name="start_time_idx"),
+    # A slot can only be taken by one turn, see turn_slots
+    IndexModel([("slots", ASCENDING)], name="slots_unique", unique=True,
+               partialFilterExpression={"slots": {"$exists": True}}),
+]
+
+_SLOTS_EPOCH = datetime(1970, 1, 1)
+
+
+def business_slot_minutes(bc: BusinessConfig) -> int:
+    """
+    Get the length of the slots for the modules of the business: the longest one whose slots start and end
+    with the modules, which start at the opening time plus multiples of the module length, on any day.
+
+    :param bc: The business config
+    :return: The slot length, in minutes
+    """
+    opening = datetime.strptime(bc.start_time, TIME_FORMAT)
+    return math.gcd(bc.min_module_time, opening.hour * 60 + opening.minute, 24 * 60)
+
+
+def turn_slots(turn: 'Turn', slot_minutes: int) -> list[str]:
+    """
+    Get the keys of the office and user slots taken by the turn.
+    The turn documents store them in an array with a unique index, so inserting a turn that overlaps
+    another turn of the same office or user fails atomically, without a previous query.
+    Turns are expected to start and end at multiples of the slot length, otherwise two turns that only share
+    part of a slot conflict. The keys include the length, so the slots of another length never reject a turn,
+    and the stored turns must be migrated with `migrate_slots --rebuild` when it changes.
+
+    :param turn: The turn
+    :param slot_minutes: The length of the slots, see business_slot_minutes
+    :return: The slot keys
+    """
+    slot_length = timedelta(minutes=slot_minutes)
+    first_slot = (turn.start_time - _SLOTS_EPOCH) // slot_length
+    end_slot = -((_SLOTS_EPOCH - turn.end_time) // slot_length)  # Ceiling division
+
+    slots = [f"office:{turn.office_id}:{slot_minutes}m:{slot}" for slot in range(first_slot, end_slot)]
+    slots.extend(f"user:{turn.user.id}:{slot_minutes}m:{slot}" for slot in range(first_slot, end_slot))
+    return slots
+
+
+# Fields of the turn documents that the week views send to the clients
+WEEK_TURN_PROJECTION = {"_id": 0, "idx": 1, "start_time": 1, "end_time": 1, "user.id": 1, "user.name": 1,
+                        "office_id": 1}
+
+
+# Values of the `raw` argument of get_week_turns, each one is cached separately
+WEEK_READ_MODES = (False, True, "aggregate")
+WEEK_CACHE_SIZE = 512
+WEEK_CACHE_TTL = 300  # In seconds
+
+
+class WeekTurnsCache:
+    """
+    Cache of the get_week_turns results, keyed by the first day of the week and the read mode.
+    Enabled on a MongoTurnsManager, every inserted turn drops the weeks it overlaps.
+    The values are stored with the shared version of the week they were read at, so the turns inserted
+    by other processes, which bump that version, turn the cached weeks into misses.
+    """
+
+    def __init__(self, backend: CacheBackend | None = None):
+        self.backend = backend if backend is not None else LRUCache(WEEK_CACHE_SIZE, WEEK_CACHE_TTL)
+        self.stats = CacheStats()
+        self._versions: dict[date, int] = {}
+
+    def version(self, week: date) -> int:
+        """Number of invalidations of the week"""
+        return self._versions.get(week, 0)
+
+    def get(self, week: date, raw: bool | str, shared_version: int = 0) -> Any:
+        """Get the cached value of the week, MISSING if it was read at another shared version"""
+        entry = self.backend.get((week, raw))
+        if entry is MISSING or entry[0] != shared_version:
+            self.stats.misses += 1
+            return MISSING
+        self.stats.hits += 1
+        return entry[1]
+
+    def set(self, week: date, raw: bool | str, value: Any, version: int, shared_version: int = 0) -> None:
+        """Cache a value read when the week had the given local and shared versions.
+        The value is discarded if a turn of the week was inserted by this process while it was read."""
+        if version == self.version(week):
+            self.backend.set((week, raw), (shared_version, value))
+
+    def invalidate_turn(self, turn: 'Turn') -> None:
+        for week in weeks_in_range(turn.duration):
+            self._versions[week] = self.version(week) + 1
+            for raw in WEEK_READ_MODES:
+                self.backend.delete((week, raw))
+            self.stats.invalidations += 1
+
+
+# Seconds between the checks of the shared week versions by the in-memory views
+VIEWS_POLL_INTERVAL = 1
+
+
+class WeekVersions:
+    """
+    The shared version of each week of an in-memory view, when its turns were loaded.
+    The reloads of each week are counted, so the inserts of this process only advance a week that was not
+    reloaded while they were applied: the reload may have replaced the week without their turns.
+    """
+
+    def __init__(self):
+        self.versions: dict[date, int] = {}
+        self._reloads: dict[date, int] = {}
+        self._checked_at: dict[date, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, week: date) -> int | None:
+        return self.versions.get(week)
+
+    def loaded(self, week: date, version: int) -> None:
+        """Record the version at which the turns of the week were read"""
+        with self._lock:
+            self.versions[week] = version
+            self._reloads[week] = self._reloads.get(week, 0) + 1
+
+    def reload_marks(self, weeks: Iterable[date]) -> dict[date, int]:
+        """The reloads of the weeks so far, taken before applying an insert, see advance"""
+        with self._lock:
+            return {week: self._reloads.get(week, 0) for week in weeks}
+
+    def advance(self, versions: dict[date, int], marks: dict[date, int]) -> None:
+        """
+        Take the versions bumped by an insert of this process, whose turns the view already added.
+        A week that another process changed in between, or that was reloaded since the marks, keeps its
+        old version, so it is reloaded.
+        """
+        with self._lock:
+            for week, version in versions.items():
+                if self._reloads.get(week, 0) == marks.get(week) and self.versions.get(week) == version - 1:
+                    self.versions[week] = version
+
+    def due(self, weeks: Iterable[date], now: float, poll_interval: float) -> list[date]:
+        """The weeks whose versions were not checked in the last poll_interval seconds, marked as checked now"""
+        with self._lock:
+            due = [week for week in weeks if now - self._checked_at.get(week, float("-inf")) >= poll_interval]
+            self._checked_at.update(dict.fromkeys(due, now))
+            return due
+
+
+class WeekVersionedView(Protocol):
+    """
+    In-memory view of the turns of a time range, that keeps the shared version of each week it loaded.
+    Other processes bump the versions of the weeks in which they insert turns, the manager reloads
+    those weeks before answering from the view, see MongoTurnsManager.refresh_weeks.
+    """
+    time_range: TimeRange
+    week_versions: WeekVersions
+
+    def add(self, turn: 'Turn') -> None:
+        ...
+
+    def reload_week(self, week: TimeRange, turns: list['Turn'], version: int) -> None:
+        """Replace the turns of the week with the stored ones, read at the given version"""
+        ...
+
+
+class ScheduleIndex:
+    """
+    In-memory schedules of every office and user, for the turns that overlap a time range.
+    Overlap questions inside the range are answered with binary searches instead of database queries.
+    The turns inserted by other processes are loaded when the manager refreshes their weeks, a turn
+    inserted concurrently may still be missing, the slots index of the collection rejects it.
+    """
+
+    def __init__(self, time_range: TimeRange):
+        self.time_range = time_range
+        self.week_versions = WeekVersions()
+        self.offices: dict[str, IntervalIndex] = defaultdict(IntervalIndex)
+        self.users: dict[str, IntervalIndex] = defaultdict(IntervalIndex)
+        self._lock = threading.Lock()
+
+    def covers(self, time_range: TimeRange) -> bool:
+        return self.time_range.start_time <= time_range.start_time and time_range.end_time <= self.time_range.end_time
+
+    def _add(self, turn: 'Turn') -> None:
+        if turn.end_time <= self.time_range.start_time or self.time_range.end_time <= turn.start_time:
+            return
+        self.offices[turn.office_id].add(turn.start_time, turn.end_time, turn)
+        self.users[turn.user.id].add(turn.start_time, turn.end_time, turn)
+
+    def add(self, turn: 'Turn') -> None:
+        with self._lock:
+            self._add(turn)
+
+    def reload_week(self, week: TimeRange, turns: list['Turn'], version: int) -> None:
+        with self._lock:
+            for schedule in (*self.offices.values(), *self.users.values()):
+                schedule.remove_overlapping(week.start_time, week.end_time)
+            for turn in turns:
+                self._add(turn)
+            self.week_versions.loaded(week.start_time.date(), version)
+
+    def conflict(self, turn: 'Turn') -> 'Turn | None':
+        """Get a turn of the same user or office that overlaps the turn"""
+        with self._lock:
+            for schedule in (self.users.get(turn.user.id), self.offices.get(turn.office_id)):
+                conflict = schedule.first_overlapping(turn.start_time, turn.end_time) if schedule else None
+                if conflict is not None:
+                    return conflict
+            return None
+
+    def is_free(self, time_range: TimeRange, office_id: str | None = None, user_id: str | None = None) -> bool:
+        """Whether the office and the user have no turns in the time range"""
+        with self._lock:
+            for schedule in (self.offices.get(office_id), self.users.get(user_id)):
+                if schedule and not schedule.is_free(time_range.start_time, time_range.end_time):
+                    return False
+            return True
+
+    def turns(self, time_range: TimeRange, office_id: str | None = None,
+              user_id: str | None = None) -> list['Turn']:
+        """Get the turns of the office or the user that overlap the time range, in start time order"""
+        with self._lock:
+            if office_id is not None:
+                schedule = self.offices.get(office_id)
+            else:
+                schedule = self.users.get(user_id)
+            return schedule.overlapping(time_range.start_time, time_range.end_time) if schedule else []
+
+
+def week_version_key(week_start: date) -> str:
+    return f"turns:week:{week_start.isoformat()}"
+
+
 class MongoTurnsManager:
 
-    def __init__(self, mongo_config: MongoConfig):
+    def __init__(self, mongo_config: MongoConfig, slot_minutes: int):
         self.mongo_config = mongo_config
-        self.collection = self.mongo_config.db.turns
+        self.slot_minutes = slot_minutes
+        # Called with every inserted turn
+        self.insert_listeners: list[Callable[[Turn], None]] = []
+        self.week_cache: WeekTurnsCache | None = None
+        self.schedule_index: ScheduleIndex | None = None
+        # In-memory views updated with the inserted turns, and reloaded by week when other processes insert
+        self.week_views: list[WeekVersionedView] = []
+        self.views_poll_interval = VIEWS_POLL_INTERVAL
+        # Whether the slots index guards the writes, checked on the first write
+        self._slots_index: bool | None = None
+        self._slots_index_lock = threading.Lock()
+
+    # The collections are opened on first use, creating the manager does not connect
+    @cached_property
+    def collection(self) -> Collection:
+        return self.mongo_config.db.turns
+
+    @cached_property
+    def versions(self) -> VersionCounters:
+        return VersionCounters(self.mongo_config.db.versions)
+
+    def add_insert_listener(self, listener: Callable[[Turn], None]) -> None:
+        self.insert_listeners.append(listener)
+
+    def _notify_insert(self, turns: list[Turn]) -> None:
+        weeks = sorted({week for turn in turns for week in weeks_in_range(turn.duration)})
+        marks = [(view.week_versions, view.week_versions.reload_marks(weeks)) for view in self.week_views]
+        for turn in turns:
+            for listener in self.insert_listeners:
+                listener(turn)
+
+        # The versions are shared with the other processes, which do not see the listeners
+        keys = [week_version_key(week) for week in weeks]
+        self.versions.bump(keys)
+        if not marks or not keys:
+            return
+
+        # The views already have the turns, they skip the reload of the weeks no other process changed
+        versions = self.versions.get_many(keys)
+        for week_versions, view_marks in marks:
+            week_versions.advance({week: versions[key] for week, key in zip(weeks, keys)}, view_marks)
+
+    def week_version(self, day: datetime) -> int:
+        """Get the version of the turns of the week of the day, bumped by every turn inserted in it"""
+        return self.versions.get(week_version_key(get_week_by_day(day).start_time.date()))
+
+    def enable_week_cache(self, cache: WeekTurnsCache | None = None) -> WeekTurnsCache:
+        """Cache the results of get_week_turns for this manager"""
+        self.week_cache = cache if cache is not None else WeekTurnsCache()
+        self.add_insert_listener(self.week_cache.invalidate_turn)
+        return self.week_cache
+
+    def add_week_view(self, view: WeekVersionedView) -> None:
+        """Load the turns of the time range of the view, and keep it updated with the turns inserted by this manager"""
+        # Read the versions first, a turn inserted while loading makes the next refresh reload its week
+        weeks = weeks_in_range(view.time_range)
+        versions = self.versions.get_many(week_version_key(week) for week in weeks)
+        for turn in self.get_turns_in_range(view.time_range):
+            view.add(turn)
+        for week in weeks:
+            view.week_versions.loaded(week, versions[week_version_key(week)])
+
+        self.week_views.append(view)
+        self.add_insert_listener(view.add)
+
+    def refresh_weeks(self, view: WeekVersionedView, time_range: TimeRange) -> None:
+        """
+        Reload the weeks of the time range in which other processes inserted turns since the view loaded them.
+        The versions of each week are checked at most every views_poll_interval seconds, with a single query.
+        """
+        weeks = view.week_versions.due(weeks_in_range(time_range), time.monotonic(), self.views_poll_interval)
+        if not weeks:
+            return
+        versions = self.versions.get_many(week_version_key(week) for week in weeks)
+        for week in weeks:
+            version = versions[week_version_key(week)]
+            if view.week_versions.get(week) != version:
+                week_start = datetime.combine(week, datetime.min.time())
+                week_range = TimeRange(week_start, week_start + timedelta(days=7))
+                view.reload_week(week_range, self.get_turns_in_range(week_range), version)
+
+    def remove_week_view(self, view: WeekVersionedView) -> None:
+        """Stop updating the view"""
+        self.week_views.remove(view)
+        self.insert_listeners.remove(view.add)
+
+    def load_schedule_index(self, time_range: TimeRange) -> ScheduleIndex:
+        """Keep the schedules of the time range in memory, replacing the previous ones, see current_schedule_index"""
+        schedule_index = ScheduleIndex(time_range)
+        self.add_week_view(schedule_index)
+        if self.schedule_index is not None:
+            self.remove_week_view(self.schedule_index)
+        self.schedule_index = schedule_index
+        return schedule_index
+
+    def current_schedule_index(self, time_range: TimeRange) -> ScheduleIndex | None:
+        """The schedule index, with the weeks of the time range up to date, if it covers the time range"""
+        if self.schedule_index is None or not self.schedule_index.covers(time_range):
+            return None
+        self.refresh_weeks(self.schedule_index, time_range)
+        return self.schedule_index
+
+    def ensure_indexes(self) -> None:
+        ensure_indexes(self.collection, TURNS_INDEXES)
+        self._slots_index = True
+
+    def slots_index_guards(self) -> bool:
+        """
+        Create the indexes before the first write of the manager, a single round trip if they exist.
+        If the slots index can not be created, for example because stored turns take the same slots,
+        the writes check the stored turns with a query instead.
+
+        :return: Whether the slots index rejects the conflicting turns
+        """
+        if self._slots_index is None:
+            with self._slots_index_lock:
+                if self._slots_index is None:
+                    try:
+                        self.ensure_indexes()
+                    except PyMongoError:
+                        self._slots_index = "slots_unique" in self.collection.index_information()
+        return self._slots_index
+
+    def _stored_conflict(self, turn: Turn) -> Turn | None:
+        conflict = self.collection.find_one(conflict_query(turn.duration, office_id=turn.office_id,
+                                                           user_id=turn.user.id))
+        return Turn.from_dict(conflict, TRUSTED_SOURCE) if conflict else None
+
+    def index_report(self) -> IndexReport:
+        return index_report(self.collection, TURNS_INDEXES)
 
     def get_turn_by_id(self, turn_id: str) -> Turn:
         turn_dict = self.collection.find_one({"idx": turn_id})
-        return Turn.from_dict(turn_dict)
+        return Turn.from_dict(turn_dict, TRUSTED_SOURCE)
 
     def conflict_turn(self, turn: Turn) -> Turn | None:
-        query = {"$or": [
-            {"$and": [turns_in_range_query(turn.duration),
-                      {"user.id": turn.user.id}]},
-            {"$and": [turns_in_range_query(turn.duration),
-                      {"office_id": turn.office_id}]}
-        ]}
-        conflict = self.collection.find_one(query)
-        if conflict:
-            return Turn.from_dict(conflict)
-        return None
+        schedule_index = self.current_schedule_index(turn.duration)
+        if schedule_index is not None:
+            return schedule_index.conflict(turn)
+
+        return self._stored_conflict(turn)
+
+    def turn_document(self, turn: Turn) -> dict[str, Any]:
+        """The document stored for the turn, with the slots it takes"""
+        document = turn.to_dict()
+        document["slots"] = turn_slots(turn, self.slot_minutes)
+        return document
 
     # TODO: Are exceptions the best way to handle this?
     def insert_turn(self, turn: Turn) -> None:
-        conflict = self.conflict_turn(turn)
-        if conflict:
-            if conflict.user.id == turn.user.id:
-                raise TurnNotAvailableError(f"User {turn.user.id} has a turn at the same time.")
-            if conflict.office_id == turn.office_id:
-                raise TurnNotAvailableError(f"Office {turn.office_id} has a turn at the same time.")
-
-        self.collection.insert_one(turn.to_dict())
+        # Reject the turns known to be taken without going to the database. The index may miss the turns
+        # of other processes, they are rejected by the slots index.
+        schedule_index = self.schedule_index
+        if schedule_index is not None and schedule_index.covers(turn.duration):
+            conflict = schedule_index.conflict(turn)
+            if conflict is not None:
+                raise conflict_error(turn, conflict)
+
+        if not self.slots_index_guards():
+            conflict = self._stored_conflict(turn)
+            if conflict is not None:
+                raise conflict_error(turn, conflict)
+
+        # The unique slots index rejects conflicting turns, even if they are inserted concurrently
+        try:
+            self.collection.insert_one(self.turn_document(turn))
+        except DuplicateKeyError as e:
+            raise not_available_error(turn, e.details) from e
+
+        self._notify_insert([turn])
+
+    def insert_turns(self, turns: Iterable[Turn], batch_size: int = 1000) -> list[TurnInsertResult]:
+        """
+        Insert many turns, skipping the ones that are not available.
+        Each batch is checked against itself with a sweep over its turns sorted by start time,
+        and against the stored turns with a single query on their slots.
+        The available turns are written with a single insert_many.
+
+        :param turns: The turns to insert
+        :param batch_size: The number of turns checked and written at once
+        :return: Whether each turn was inserted, in the same order as the turns
+        """
+        report = []
+        slots_index = self.slots_index_guards()
+        for batch in batched(turns, batch_size):
+            results = [TurnInsertResult(turn, accepted=True) for turn in batch]
+            _reject_overlaps(results)
+            if not slots_index:
+                # The stored turns without slots are only found by their times
+                for result in results:
+                    conflict = self._stored_conflict(result.turn) if result.accepted else None
+                    if conflict is not None:
+                        result.reject(str(conflict_error(result.turn, conflict)))
+
+            candidates = [result for result in results if result.accepted]
+            documents = [self.turn_document(result.turn) for result in candidates]
+            requested_slots = [slot for document in documents for slot in document["slots"]]
+            taken_slots = set()
+            if requested_slots:
+                for document in self.collection.find({"slots": {"$in": requested_slots}}, {"_id": 0, "slots": 1}):
+                    taken_slots.update(document["slots"])
+
+            available, available_documents = [], []
+            for result, document in zip(candidates, documents):
+                taken = taken_slots.intersection(document["slots"])
+                if taken:
+                    result.reject(str(not_available_error(result.turn, {"keyValue": {"slots": min(taken)}})))
+                else:
+                    available.append(result)
+                    available_documents.append(document)
+
+            # Turns booked concurrently since the query are rejected by the slots index
+            self._write_turns(available, available_documents)
+            report.extend(results)
+
+        return report
+
+    def _write_turns(self, results: list[TurnInsertResult], documents: list[dict[str, Any]]) -> None:
+        """
+        Write the documents of the results with a single unordered insert_many, and notify the written turns.
+        The turns whose slots are taken are rejected. Any other write error is raised, after notifying
+        the turns that were written anyway.
+        """
+        if not documents:
+            return
+
+        error = None
+        try:
+            self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            error = e
+            for write_error in e.details["writeErrors"]:
+                result = results[write_error["index"]]
+                result.reject(str(not_available_error(result.turn, write_error)))
+
+        self._notify_insert([result.turn for result in results if result.accepted])
+        if error is not None and (error.details.get("writeConcernErrors") or
+                                  not all(_is_slots_conflict(e) for e in error.details["writeErrors"])):
+            raise error
+
+    def backfill_slots(self, rebuild: bool = False) -> list[TurnInsertResult]:
+        """
+        Add the slots to the turn documents stored without them, so they are taken into account by insert_turn.
+        A migration, see migrate_slots, it scans the whole collection and must run with the API stopped.
+
+        :param rebuild: Drop the stored slots first and compute them again, after a change of the slot length
+        :return: Whether each document got its slots. The ones whose slots are taken by other turns are rejected
+            with the reason, and left without slots.
+        """
+        self.ensure_indexes()
+        if rebuild:
+            self.collection.update_many({"slots": {"$exists": True}}, {"$unset": {"slots": ""}})
+
+        report = []
+        with validation_policy(TRUSTED_SOURCE):
+            for document in self.collection.find({"slots": {"$exists": False}}):
+                result = TurnInsertResult(Turn.from_dict(document), accepted=True)
+                try:
+                    self.collection.update_one({"_id": document["_id"]},
+                                               {"$set": {"slots": turn_slots(result.turn, self.slot_minutes)}})
+                except DuplicateKeyError as e:
+                    result.reject(str(not_available_error(result.turn, e.details)))
+                report.append(result)
+        return report
+
+    def import_turns(self, records: Iterable[dict[str, Any]], batch_size: int = 1000) -> TurnsImport:
+        """
+        Insert the turns of source records, as found in the JSON exports, in batches.
+        Only one batch is kept in memory, so the records can be streamed from any size of export.
+        The turns are not checked with queries, the slots index rejects the ones that overlap a stored turn
+        or a previous turn of the export, and the others are still imported.
+
+        :param records: The source records
+        :param batch_size: The number of turns sent to Mongo in each insert
+        :return: The number of imported turns and the rejected ones
+        """
+        self.slots_index_guards()
+        report = TurnsImport()
+        for batch in batched(records, batch_size):
+            results = [TurnInsertResult(turn_from_source_dict(record), accepted=True) for record in batch]
+            self._write_turns(results, [self.turn_document(result.turn) for result in results])
+            report.imported += sum(result.accepted for result in results)
+            report.rejected.extend(result for result in results if not result.accepted)
+        return report
 
     def get_turns_in_range(self, time_range: TimeRange) -> list[Turn]:
         query = turns_in_range_query(time_range)
 
+        # The documents were validated when inserted, skip validating them again
         turns = self.collection.find(query)
-        return [Turn.from_dict(turn) for turn in turns]
-
+        interner = TurnsInterner()
+        with validation_policy(TRUSTED_SOURCE):
+            return [interner.turn(turn) for turn in turns]
+
+    def get_turns_page(self, time_range: TimeRange, limit: int, after: tuple[datetime, str] | None = None,
+                       office_id: str | None = None, user_id: str | None = None) -> TurnsPage:
+        """
+        Get a page of the turns that overlap the time range, in start time order.
+
+        :param time_range: The time range
+        :param limit: The maximum number of turns of the page
+        :param after: Key (start_time, idx) of the last turn of the previous page, None for the first page
+        :param office_id: Only get the turns of this office
+        :param user_id: Only get the turns of this user
+        :return: The page, with the key to get the next one
+        """
+        query = turns_in_range_query(time_range, office_id=office_id, user_id=user_id)
+        if after is not None:
+            query = after_key_query(query, *after)
+
+        # Read one more turn than needed to know if there is a next page
+        documents = self.collection.find(query).sort(TURNS_PAGE_SORT).limit(limit + 1)
+        interner = TurnsInterner()
+        with validation_policy(TRUSTED_SOURCE):
+            turns = [interner.turn(document) for document in documents]
+
+        if len(turns) <= limit:
+            return TurnsPage(turns)
+        turns.pop()
+        return TurnsPage(turns, (turns[-1].start_time, turns[-1].idx))
+
+    def get_raw_turns_by_day(self, time_range: TimeRange,
+                             projection: dict[str, int] | None = None) -> dict[Day, list[dict[str, Any]]]:
+        """Get the documents of the turns in the range grouped by the day they start, grouping in Mongo"""
+        pipeline = turns_by_day_pipeline(time_range, projection or WEEK_TURN_PROJECTION)
+        return {group["_id"]: group["turns"] for group in self.collection.aggregate(pipeline)}
+
+    def get_raw_turns_in_range(self, time_range: TimeRange, projection: dict[str, int] | None = None,
+                               sort: list[tuple[str, int]] | None = None) -> Iterator[dict[str, Any]]:
+        """Iterate over the documents of the turns in the range, without building Turns.
+        Only the projected fields are transferred from Mongo."""
+        query = turns_in_range_query(time_range)
+        documents = self.collection.find(query, projection or WEEK_TURN_PROJECTION)
+        return documents.sort(sort) if sort else documents
+
+
+def turn_response_dict(document: dict[str, Any]) -> dict[str, Any]:
+    """Shape a turn document as the API turn model, with the same strings that marshalling a Turn produces"""
+    user = document["user"]
+    return {
+        "idx": document["idx"],
+        "start_time": str(document["start_time"]),
+        "end_time": str(document["end_time"]),
+        "user": {"id": user["id"], "name": user["name"]},
+        "office_id": document["office_id"]
+    }
+
+
+WEEK_DAYS_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def _group_week(items: Iterable, week_days: list[Day], start_time: Callable[[Any], datetime],
+                end_time: Callable[[Any], datetime]) -> dict:
+    # Bucket by the number of days since the week start instead of formatting every start time
+    week_start = datetime.strptime(week_days[0], DATE_FORMAT)
+    week_start_ordinal = week_start.toordinal()
+    days = [{"turns": [], "date": date} for date in week_days]
+    for item in items:
+        offset = start_time(item).toordinal() - week_start_ordinal
+        # Turns that started in the previous week and end in this one belong to its first day
+        if offset < 0 and end_time(item) > week_start:
+            offset = 0
+        if not 0 <= offset < len(days):
+            raise ValueError(f"There are turns from two different weeks in the list. "
+                             f"Turns must be from the same week.")
 
-def make_week_dict(turns: list[Turn], week_days: list[Day]) -> WeekTurns:
-    week_days_names = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+        days[offset]["turns"].append(item)
 
-    week_dict = {day: {"turns": [], "date": date} for day, date in zip(week_days_names, week_days)}
-    for turn in turns:
+    return dict(zip(WEEK_DAYS_NAMES, days))
 
-        day = turn.start_time.strftime("%A").lower()
-        date = turn.start_time.strftime(DATE_FORMAT)
 
-        if week_dict[day]["date"] != date:
-            raise ValueError(f"There are turns from two different weeks in the list. "
-                             f"Turns must be from the same week.")
+def make_week_dict(turns: list[Turn], week_days: list[Day]) -> WeekTurns:
+    return _group_week(turns, week_days, lambda turn: turn.start_time, lambda turn: turn.end_time)
 
-        week_dict[day]["turns"].append(turn)
 
+def make_raw_week_dict(documents: Iterable[dict[str, Any]], week_days: list[Day]) -> dict[str, Any]:
+    """Group turn documents in the API week model shape"""
+    week_dict = _group_week(documents, week_days, lambda document: document["start_time"],
+                            lambda document: document["end_time"])
+    for day_turns in week_dict.values():
+        day_turns["turns"] = [turn_response_dict(document) for document in day_turns["turns"]]
     return week_dict
 
 
-def get_week_turns(manager: MongoTurnsManager, day: datetime) -> WeekTurns:
-    week = get_week_by_day(day)
+def make_raw_week_dict_from_groups(groups: dict[Day, list[dict[str, Any]]], week_days: list[Day]) -> dict[str, Any]:
+    """Shape turn documents already grouped by day as the API week model"""
+    if not groups.keys() <= set(week_days):
+        raise ValueError(f"There are turns from two different weeks in the list. "
+                         f"Turns must be from the same week.")
+
+    return {name: {"turns": [turn_response_dict(document) for document in groups.get(date, [])], "date": date}
+            for name, date in zip(WEEK_DAYS_NAMES, week_days)}
+
+
+def get_week_turns(manager: MongoTurnsManager, day: datetime, raw: bool | str = False,
+                   week_version: int | None = None) -> WeekTurns | dict[str, Any]:
+    """
+    Get the turns of the week of the given day, grouped by day.
+
+    :param manager: The turns manager
+    :param day: Any day of the week
+    :param raw: Build the API response shape straight from the projected documents instead of Turns.
+        With "aggregate" the documents are also grouped by day in Mongo.
+    :param week_version: The shared version of the week, if already read. Only used with the week cache.
+    :return: The week turns. Cached results are shared, they must not be modified.
+    """
+    # The whole week from Monday at 00:00, whatever the time of the day is
+    week = get_week_by_day(datetime.combine(day.date(), datetime.min.time()))
+    cache = manager.week_cache
+    if cache is None:
+        return _read_week_turns(manager, week, raw)
+
+    week_start = week.start_time.date()
+    # Read before the turns, a turn inserted meanwhile leaves the cached value behind the shared version
+    if week_version is None:
+        week_version = manager.week_version(week.start_time)
+    week_turns = cache.get(week_start, raw, week_version)
+    if week_turns is MISSING:
+        version = cache.version(week_start)
+        week_turns = _read_week_turns(manager, week, raw)
+        cache.set(week_start, raw, week_turns, version, week_version)
+    return week_turns
+
+
+def iter_raw_week_turns(manager: MongoTurnsManager,
+                        day: datetime) -> Iterator[tuple[str, Day, Iterator[dict[str, Any]]]]:
+    """
+    Iterate over the days of the week of the given day, with the turns of each day shaped as the API turn model.
+    The turns are read from a single cursor in start time order, so they are never all in memory.
+    The turns of a day must be consumed before moving to the next day.
+
+    :param manager: The turns manager
+    :param day: Any day of the week
+    :return: The name, the date and an iterator over the turns of each day of the week
+    """
+    week = get_week_by_day(datetime.combine(day.date(), datetime.min.time()))
+    week_start_ordinal = week.start_time.toordinal()
+    documents = manager.get_raw_turns_in_range(week, sort=TURNS_PAGE_SORT)
+
+    # Turns that start before the week are grouped in its first day
+    groups = groupby(documents, key=lambda document: max(document["start_time"].toordinal() - week_start_ordinal, 0))
+    group = next(groups, None)
+    for offset, (name, week_day) in enumerate(zip(WEEK_DAYS_NAMES, days_in_range(week))):
+        if group is not None and group[0] == offset:
+            yield name, week_day, map(turn_response_dict, group[1])
+            group = next(groups, None)
+        else:
+            yield name, week_day, iter(())
+
+
+def _read_week_turns(manager: MongoTurnsManager, week: TimeRange, raw: bool | str) -> WeekTurns | dict[str, Any]:
     week_days = days_in_range(week)
+    if raw == "aggregate":
+        return make_raw_week_dict_from_groups(manager.get_raw_turns_by_day(week), week_days)
+    if raw:
+        return make_raw_week_dict(manager.get_raw_turns_in_range(week), week_days)
+
     turns = manager.get_turns_in_range(week)
     return make_week_dict(turns, week_days)
@@ -1,16 +1,25 @@
+import threading
+import time
 from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Iterator
 
-from turns_app.utils.dataclass_utils import BaseDataclass
+from pymongo import ASCENDING, IndexModel
+from pymongo.collection import Collection
+from pymongo.errors import PyMongoError, DuplicateKeyError
 
+from turns_app.utils.dataclass_utils import BaseDataclass, TRUSTED_SOURCE, validation_policy
+from turns_app.utils.mongo_utils import ensure_indexes, index_report, IndexReport, VersionCounters
 
-@dataclass
+
+@dataclass(slots=True)
 class NamedUser(BaseDataclass):
     id: str
     name: str
 
 
 # TODO: Validate the email and phone fields
-@dataclass
+@dataclass(slots=True)
 class User(NamedUser):
     email: str
     phone: str
@@ -24,20 +33,174 @@ class UserExistsError(Exception):
     pass
 
 
+# Fields of the API user model
+USER_PROJECTION = {"_id": 0, "id": 1, "name": 1, "email": 1, "phone": 1, "activity": 1}
+
+USERS_VERSION_KEY = "users"
+
+USERS_INDEXES = [
+    IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+]
+
+
+# Seconds between the checks of the users version when the changes are not watched
+USERS_POLL_INTERVAL = 5
+
+
+class UsersDirectory:
+    """Snapshot of all the users, sorted by id and indexed by id.
+    Snapshots are shared by the requests, so they are replaced and never modified."""
+
+    def __init__(self, users: list[User], version: int):
+        self.users = sorted(users, key=lambda user: user.id)
+        self.by_id = {user.id: user for user in self.users}
+        self.dicts = [user.to_dict() for user in self.users]
+        self.version = version
+
+
 class MongoUsersManager:
     def __init__(self, mongo_config):
         self.mongo_config = mongo_config
-        self.collection = self.mongo_config.db.users
+        self.directory: UsersDirectory | None = None
+        self.directory_enabled = False
+        self.poll_interval = USERS_POLL_INTERVAL
+        self._watch = False
+        self._checked_at = 0.0
+        self._stale = False
+        self._directory_lock = threading.Lock()
+        self._indexes_ready = False
+        self._indexes_lock = threading.Lock()
+
+    # The collections are opened on first use, creating the manager does not connect
+    @cached_property
+    def collection(self) -> Collection:
+        return self.mongo_config.db.users
+
+    @cached_property
+    def versions(self) -> VersionCounters:
+        return VersionCounters(self.mongo_config.db.versions)
+
+    def enable_directory(self, poll_interval: float = USERS_POLL_INTERVAL, watch: bool = True,
+                         preload: bool = True) -> UsersDirectory | None:
+        """
+        Serve the users from memory. The directory is reloaded when the users version changes, which is
+        checked at most every poll_interval seconds, and right away when a change stream reports a change.
+
+        :param poll_interval: Seconds between the checks of the users version
+        :param watch: Watch the changes of the users collection. Change streams need a replica set,
+            without one the version is only polled.
+        :param preload: Load the directory now. Otherwise it is loaded by the first read of the users.
+        :return: The loaded directory, None if it is not preloaded
+        """
+        self.poll_interval = poll_interval
+        self._watch = watch
+        self.directory_enabled = True
+        if preload:
+            with self._directory_lock:
+                self._load_directory()
+        return self.directory
+
+    def _load_directory(self) -> None:
+        self._reload_directory()
+        if self._watch:
+            threading.Thread(target=self._watch_users, name="users-directory-watch", daemon=True).start()
+
+    def _reload_directory(self) -> None:
+        # Read the version first, a user created while reading makes the next check reload again
+        version = self.version()
+        with validation_policy(TRUSTED_SOURCE):
+            users = [User.from_dict(user) for user in self.collection.find()]
+        self._stale = False
+        self.directory = UsersDirectory(users, version)
+        self._checked_at = time.monotonic()
+
+    def _watch_users(self) -> None:
+        try:
+            with self.collection.watch() as stream:
+                for _ in stream:
+                    self._stale = True
+        except PyMongoError:
+            # Not a replica set, or the client was closed
+            return
+
+    def _current_directory(self) -> UsersDirectory | None:
+        if not self.directory_enabled:
+            return None
+        if self.directory is None:
+            with self._directory_lock:
+                if self.directory is None:
+                    self._load_directory()
+            return self.directory
+        if self._stale or time.monotonic() - self._checked_at >= self.poll_interval:
+            with self._directory_lock:
+                if self._stale or self.version() != self.directory.version:
+                    self._reload_directory()
+                else:
+                    self._checked_at = time.monotonic()
+        return self.directory
+
+    def current_version(self) -> int:
+        """Get the version of the users that are served, from memory when the directory is enabled"""
+        directory = self._current_directory()
+        return directory.version if directory is not None else self.version()
+
+    def user_dicts(self) -> list[dict[str, Any]]:
+        """Get all the users as dicts. From the directory they are shared and must not be modified."""
+        directory = self._current_directory()
+        if directory is not None:
+            return directory.dicts
+        return [user.to_dict() for user in self.get_users()]
+
+    def ensure_indexes(self) -> None:
+        ensure_indexes(self.collection, USERS_INDEXES)
+        self._indexes_ready = True
+
+    def _ensure_indexes_once(self) -> None:
+        # The lazy API state skips the startup indexes, the first write creates them
+        if not self._indexes_ready:
+            with self._indexes_lock:
+                if not self._indexes_ready:
+                    self.ensure_indexes()
+
+    def index_report(self) -> IndexReport:
+        return index_report(self.collection, USERS_INDEXES)
 
     def get_by_id(self, user_id: str) -> User | None:
+        directory = self._current_directory()
+        if directory is not None:
+            return directory.by_id.get(user_id)
+
         user_dict = self.collection.find_one({"id": user_id})
-        return User.from_dict(user_dict) if user_dict else None
+        return User.from_dict(user_dict, TRUSTED_SOURCE) if user_dict else None
 
     def get_users(self) -> list[User]:
-        return [User.from_dict(user) for user in self.collection.find()]
+        directory = self._current_directory()
+        if directory is not None:
+            return list(directory.users)
+
+        with validation_policy(TRUSTED_SOURCE):
+            return [User.from_dict(user) for user in self.collection.find()]
+
+    def iter_users(self, projection: dict[str, int] | None = None) -> Iterator[dict[str, Any]]:
+        """Iterate over the documents of the users as the cursor fetches them, without building Users"""
+        return self.collection.find({}, projection or USER_PROJECTION).sort("id", ASCENDING)
 
     def create_user(self, user: User) -> None:
-        if self.get_by_id(user.id):
+        self._ensure_indexes_once()
+        # Check the database, the directory may not have the users created by other processes yet
+        if self.collection.find_one({"id": user.id}, {"_id": 1}):
             raise UserExistsError(f"The user with idx {user.id} already exists")
 
-        self.collection.insert_one(user.to_dict())
+        # The unique index rejects the same user created concurrently by another request
+        try:
+            self.collection.insert_one(user.to_dict())
+        except DuplicateKeyError as e:
+            raise UserExistsError(f"The user with idx {user.id} already exists") from e
+        self.versions.bump([USERS_VERSION_KEY])
+        if self.directory is not None:
+            with self._directory_lock:
+                self._reload_directory()
+
+    def version(self) -> int:
+        """Get the version of the users, bumped by every created user"""
+        return self.versions.get(USERS_VERSION_KEY)
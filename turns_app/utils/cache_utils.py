@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Protocol
+
+
+# Returned by the backends when a key is not cached, so None can be cached
+MISSING = object()
+
+
+class CacheBackend(Protocol):
+    def get(self, key: Hashable) -> Any:
+        """Get the cached value or MISSING"""
+        ...
+
+    def set(self, key: Hashable, value: Any) -> None:
+        ...
+
+    def delete(self, key: Hashable) -> None:
+        ...
+
+    def clear(self) -> None:
+        ...
+
+
+class LRUCache:
+    """Thread-safe in-process cache that evicts the least recently used entries and the expired ones"""
+
+    def __init__(self, maxsize: int = 256, ttl: float | None = None):
+        """
+        :param maxsize: The maximum number of cached entries
+        :param ttl: Seconds after which an entry expires, None to keep entries until evicted
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return MISSING
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> dict[str, int | float]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hit_rate
+        }
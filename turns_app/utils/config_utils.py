@@ -1,9 +1,15 @@
+import os
+import threading
+from typing import Any, TYPE_CHECKING
+
 import toml
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
-from pymongo import MongoClient
-from pymongo.database import Database
+# pymongo is imported when the first client is created, so reading the config does not import it
+if TYPE_CHECKING:
+    from pymongo import MongoClient
+    from pymongo.database import Database
 
 from turns_app.utils.dataclass_utils import BaseDataclass
 
@@ -52,14 +58,116 @@ class MongoConfig(BaseDataclass):
     db_name: str
     port: int
 
+    # Connection pool settings. Timeouts are in milliseconds.
+    max_pool_size: int = 100
+    min_pool_size: int = 0
+    connect_timeout_ms: int = 20000
+    server_selection_timeout_ms: int = 30000
+
     @property
-    def client(self) -> MongoClient:
-        return MongoClient(self.server, self.port)
+    def client_key(self) -> tuple:
+        """The settings that identify a shared client in the clients registry"""
+        return (self.server, self.port, self.max_pool_size, self.min_pool_size,
+                self.connect_timeout_ms, self.server_selection_timeout_ms)
 
     @property
-    def db(self) -> Database:
+    def client(self) -> 'MongoClient':
+        return get_mongo_client(self)
+
+    @property
+    def db(self) -> 'Database':
         return self.client[self.db_name]
 
+    @property
+    def async_db(self) -> Any:
+        """The database through the async client of the running event loop"""
+        return get_async_mongo_client(self)[self.db_name]
+
+
+# Process-wide registry of MongoClients, one per connection settings.
+_mongo_clients: dict[tuple, 'MongoClient'] = {}
+_mongo_clients_lock = threading.Lock()
+
+
+def get_mongo_client(mongo_config: MongoConfig) -> 'MongoClient':
+    """Get the shared client for the given configuration, creating it on first use.
+    MongoClient is thread-safe and keeps its own connection pool, so it must be reused."""
+    key = mongo_config.client_key
+    client = _mongo_clients.get(key)
+    if client is not None:
+        return client
+
+    from pymongo import MongoClient
+    with _mongo_clients_lock:
+        if key not in _mongo_clients:
+            _mongo_clients[key] = MongoClient(
+                mongo_config.server,
+                mongo_config.port,
+                maxPoolSize=mongo_config.max_pool_size,
+                minPoolSize=mongo_config.min_pool_size,
+                connectTimeoutMS=mongo_config.connect_timeout_ms,
+                serverSelectionTimeoutMS=mongo_config.server_selection_timeout_ms
+            )
+        return _mongo_clients[key]
+
+
+def close_mongo_clients() -> None:
+    """Close all the shared clients. A new client is created if a config is used again."""
+    with _mongo_clients_lock:
+        for client in _mongo_clients.values():
+            client.close()
+        _mongo_clients.clear()
+
+
+# Registry of the async clients. Motor clients are bound to the event loop in which they are created,
+# so there is one per connection settings and loop.
+_async_mongo_clients: dict[tuple, Any] = {}
+
+
+def get_async_mongo_client(mongo_config: MongoConfig) -> Any:
+    """Get the shared Motor client for the given configuration and the running event loop.
+    Motor is an optional dependency, only needed by the async data layer, so it is imported here."""
+    import asyncio
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+    except ImportError as e:
+        raise ImportError("The async data layer needs motor, install it with 'pip install motor'") from e
+
+    loop = asyncio.get_running_loop()
+    key = (mongo_config.client_key, id(loop))
+    client = _async_mongo_clients.get(key)
+    if client is None:
+        # The registry is only used from the event loop thread, no lock needed
+        client = _async_mongo_clients[key] = AsyncIOMotorClient(
+            mongo_config.server,
+            mongo_config.port,
+            maxPoolSize=mongo_config.max_pool_size,
+            minPoolSize=mongo_config.min_pool_size,
+            connectTimeoutMS=mongo_config.connect_timeout_ms,
+            serverSelectionTimeoutMS=mongo_config.server_selection_timeout_ms,
+            io_loop=loop
+        )
+    return client
+
+
+def close_async_mongo_clients() -> None:
+    """Close all the shared async clients"""
+    for client in _async_mongo_clients.values():
+        client.close()
+    _async_mongo_clients.clear()
+
+
+def _forget_mongo_clients() -> None:
+    """Drop the clients inherited from the parent process, without closing the sockets the parent still uses.
+    MongoClient is not fork-safe, so every forked worker creates its own clients on first use."""
+    global _mongo_clients_lock
+    _mongo_clients.clear()
+    _async_mongo_clients.clear()
+    _mongo_clients_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_mongo_clients)
+
 
 @dataclass
 class BusinessConfig(BaseDataclass):
@@ -70,11 +178,24 @@ class BusinessConfig(BaseDataclass):
     offices: list[str]
 
 
+@dataclass
+class ServerConfig(BaseDataclass):
+    host: str = "127.0.0.1"
+    port: int = 5000
+    workers: int = 1        # Processes forked by the server
+    threads: int = 8        # Threads serving requests in each worker
+    preload: bool = True    # Import the app before forking, so the workers share the imported code
+    lazy: bool = False      # Connect on the first request and skip the startup preloads, see ApiState
+    blueprints: list[str] = field(default_factory=lambda: ["business", "turns", "users"])  # Served blueprints
+    metrics: bool = False   # Measure the requests, Mongo commands and conversions, and serve them on /metrics
+
+
 @singleton
 @dataclass
 class AppConfig(BaseDataclass):
     mongo: MongoConfig
     business: BusinessConfig
+    server: ServerConfig | None = None
 
 
 def is_app_config_instantiated() -> bool:
@@ -1,50 +1,194 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
-from typing import Any, get_type_hints, TypeVar, get_args
+from enum import Enum
+from itertools import count
+from types import NoneType, UnionType
+from typing import Any, get_type_hints, TypeVar, get_args, Iterator, Callable
+
+
+class ValidationMode(Enum):
+    STRICT = "strict"    # Validate every instance
+    SAMPLED = "sampled"  # Validate one of every `sample_rate` instances of each class
+    OFF = "off"          # Do not validate, for data from trusted sources
+
+
+@dataclass(frozen=True)
+class ValidationPolicy:
+    mode: ValidationMode = ValidationMode.STRICT
+    sample_rate: int = 100
+
+
+STRICT_VALIDATION = ValidationPolicy(ValidationMode.STRICT)
+SAMPLED_VALIDATION = ValidationPolicy(ValidationMode.SAMPLED)
+TRUSTED_SOURCE = ValidationPolicy(ValidationMode.OFF)
+
+_validation_policy: ContextVar[ValidationPolicy] = ContextVar("validation_policy", default=STRICT_VALIDATION)
+
+
+@contextmanager
+def validation_policy(policy: ValidationPolicy) -> Iterator[ValidationPolicy]:
+    """Apply the validation policy to the dataclasses constructed inside the context"""
+    token = _validation_policy.set(policy)
+    try:
+        yield policy
+    finally:
+        _validation_policy.reset(token)
+
+
+@dataclass(frozen=True)
+class FieldPlan:
+    """How a single dataclass field is decoded, encoded and validated"""
+    name: str
+    attr_type: Any                          # The annotated type
+    item_type: Any = None                   # Inner type of list fields
+    nested: 'DataclassCodec | None' = None  # Codec of nested dataclass fields
+
+
+class DataclassCodec:
+    """
+    Conversion plan of a BaseDataclass subclass.
+    The type hints of the class are resolved once, when the codec is compiled,
+    so converting an instance only iterates over the cached field plans.
+    """
+
+    def __init__(self, cls: type):
+        self.cls = cls
+        self.fields: tuple[FieldPlan, ...] = ()
+        self._validations = count()
+
+    def compile(self) -> None:
+        plans = []
+        for name, attr_type in get_type_hints(self.cls).items():
+            # Optional nested dataclasses, as `Nested | None`
+            nested_type = attr_type
+            if isinstance(attr_type, UnionType) and NoneType in get_args(attr_type) and len(get_args(attr_type)) == 2:
+                nested_type = next(arg for arg in get_args(attr_type) if arg is not NoneType)
+
+            if getattr(attr_type, "__origin__", None) is list:
+                plans.append(FieldPlan(name, attr_type, item_type=get_args(attr_type)[0]))
+            elif isinstance(nested_type, type) and issubclass(nested_type, BaseDataclass):
+                plans.append(FieldPlan(name, attr_type, nested=get_codec(nested_type)))
+            else:
+                plans.append(FieldPlan(name, attr_type))
+        self.fields = tuple(plans)
+
+    def decode(self, values: dict[str, Any]) -> 'BaseDataclass':
+        init_args = {}
+        for plan in self.fields:
+            if plan.name in values:
+                value = values[plan.name]
+                init_args[plan.name] = plan.nested.decode(value) if plan.nested and value is not None else value
+
+        return self.cls(**init_args)
+
+    def encode(self, instance: 'BaseDataclass') -> dict[str, Any]:
+        result = {}
+        for plan in self.fields:
+            value = getattr(instance, plan.name)
+            result[plan.name] = plan.nested.encode(value) if plan.nested and value is not None else value
+
+        return result
+
+    def should_validate(self, policy: ValidationPolicy) -> bool:
+        if policy.mode is ValidationMode.STRICT:
+            return True
+        if policy.mode is ValidationMode.SAMPLED:
+            return next(self._validations) % policy.sample_rate == 0
+        return False
+
+    def validate(self, instance: 'BaseDataclass') -> None:
+        for plan in self.fields:
+            value = getattr(instance, plan.name)
+            if plan.item_type is not None:
+                if not all(isinstance(item, plan.item_type) for item in value):
+                    raise TypeError(f"Attribute '{plan.name}' must be a list of type '{plan.item_type}', "
+                                    f"got '{type(value)}'")
+            elif not isinstance(value, plan.attr_type):
+                raise TypeError(f"Attribute '{plan.name}' must be of type '{plan.attr_type}', got '{type(value)}'")
+
+
+# Only compiled codecs are published, so they are read without the lock
+_codecs: dict[type, DataclassCodec] = {}
+# Codecs being compiled by the thread that holds the lock, so self-referencing dataclasses reuse them
+_compiling: dict[type, DataclassCodec] = {}
+_codecs_lock = threading.RLock()
+
+
+def get_codec(cls: type) -> DataclassCodec:
+    """Get the codec of a dataclass, compiling it the first time it is requested"""
+    codec = _codecs.get(cls)
+    if codec is not None:
+        return codec
+
+    with _codecs_lock:
+        codec = _codecs.get(cls) or _compiling.get(cls)
+        if codec is None:
+            codec = DataclassCodec(cls)
+            # The nested codecs reference each other, they are published together once all are compiled
+            outermost = not _compiling
+            _compiling[cls] = codec
+            try:
+                codec.compile()
+                if outermost:
+                    _codecs.update(_compiling)
+            finally:
+                if outermost:
+                    _compiling.clear()
+    return codec
+
+
+# Called by from_dict and to_dict with the class, "decode" or "encode" and the seconds taken.
+# None when they are not measured, the only cost is then checking it.
+_codec_observer: Callable[[type, str, float], None] | None = None
+
+
+def set_codec_observer(observer: Callable[[type, str, float], None] | None) -> None:
+    """Measure the conversions of the dataclasses from and to dicts with the observer, or stop if None"""
+    global _codec_observer
+    _codec_observer = observer
 
 
 @dataclass
 class BaseDataclass:
+    # Empty so that subclasses declared with slots=True do not get a __dict__
+    __slots__ = ()
 
     @classmethod
-    def from_dict(cls, values: dict[str, Any]) -> 'BaseDataclass':
+    def from_dict(cls, values: dict[str, Any], policy: ValidationPolicy | None = None) -> 'BaseDataclass':
         """
         Construct a dataclass from a dictionary of values.
         Allows extra values to be passed in, but will ignore them.
         Also allows nested dataclasses to be constructed.
 
         :param values: The dictionary of values to use to construct the dataclass
+        :param policy: The validation policy to apply, defaults to the one of the current context
         :return: A new instance of the dataclass
         """
 
-        hints = get_type_hints(cls)
-        constructor_args = {key: value for key, value in values.items()
-                            if key in hints}
+        observer = _codec_observer
+        start = time.perf_counter() if observer is not None else 0.0
 
-        init_args = {}
-        for key, value in constructor_args.items():
-            attr_type = hints[key]
-            if issubclass(attr_type, BaseDataclass):
-                init_args[key] = attr_type.from_dict(value)
-            else:
-                init_args[key] = value
+        if policy is None:
+            instance = get_codec(cls).decode(values)
+        else:
+            with validation_policy(policy):
+                instance = get_codec(cls).decode(values)
 
-        # noinspection PyArgumentList
-        return cls(**init_args)
+        if observer is not None:
+            observer(cls, "decode", time.perf_counter() - start)
+        return instance
 
     def __post_init__(self):
         """Ensure that the dataclass has been constructed with the correct types.
-        Raises a TypeError if at least one type is incorrect."""
-
-        hints = get_type_hints(self)
-        for attr, attr_type in hints.items():
-            value = getattr(self, attr)
-            if hasattr(attr_type, "__origin__") and attr_type.__origin__ == list:
-                # If the attribute type is a list, get its inner type
-                inner_type = get_args(attr_type)[0]
-                if not all(isinstance(item, inner_type) for item in value):
-                    raise TypeError(f"Attribute '{attr}' must be a list of type '{inner_type}', got '{type(value)}'")
-            elif not isinstance(value, attr_type):
-                raise TypeError(f"Attribute '{attr}' must be of type '{attr_type}', got '{type(value)}'")
+        Raises a TypeError if at least one type is incorrect.
+        Skipped or sampled according to the current validation policy."""
+
+        codec = get_codec(self.__class__)
+        if codec.should_validate(_validation_policy.get()):
+            codec.validate(self)
 
     def to_dict(self) -> dict[str, Any]:
         """
@@ -54,15 +198,13 @@ class BaseDataclass:
         :return: A dictionary representation of the dataclass
         """
 
-        hints = get_type_hints(self.__class__)
-        result = {}
-        for key, attr_type in hints.items():
-            value = getattr(self, key)
-            if issubclass(attr_type, BaseDataclass):
-                result[key] = value.to_dict()
-            else:
-                result[key] = value
+        observer = _codec_observer
+        if observer is None:
+            return get_codec(self.__class__).encode(self)
 
+        start = time.perf_counter()
+        result = get_codec(self.__class__).encode(self)
+        observer(self.__class__, "encode", time.perf_counter() - start)
         return result
 
 
@@ -1,36 +1,286 @@
+import atexit
+import functools
+import hashlib
 import os
 import subprocess
+import threading
+import time
 from dataclasses import dataclass
+from datetime import datetime, date, timedelta
+from typing import Any, Iterable, Iterator, Callable
 
-# noinspection PyProtectedMember
-import werkzeug._reloader
-# noinspection PyProtectedMember
-from werkzeug._reloader import _log, _get_args_for_reloading
+from flask import Flask, Response, request, stream_with_context, current_app, g
+from flask_restx import abort
+from pymongo import monitoring
+from werkzeug.http import quote_etag
 
-from turns_app.model.turns import MongoTurnsManager
+from turns_app.model.occupancy import OccupancyMap, load_occupancy
+from turns_app.model.turns import MongoTurnsManager, business_slot_minutes
 from turns_app.model.users import MongoUsersManager
-from turns_app.utils.config_utils import AppConfig
-from turns_app.utils.dataclass_utils import BaseDataclass
+from turns_app.utils.config_utils import AppConfig, ServerConfig, close_mongo_clients
+from turns_app.utils.dataclass_utils import BaseDataclass, set_codec_observer
+from turns_app.utils.json_utils import dumps
+from turns_app.utils.metrics_utils import METRICS, REQUEST_DURATION, Gauge, observe_codec
+from turns_app.utils.mongo_utils import CommandMetricsListener
+from turns_app.utils.time_utils import TimeRange, get_week_by_day
+
+
+# Weeks, from the current one, whose schedules are kept in memory
+SCHEDULE_INDEX_WEEKS = 8
+
+
+def schedule_index_range() -> TimeRange:
+    week = get_week_by_day(datetime.combine(date.today(), datetime.min.time()))
+    return TimeRange(week.start_time, week.start_time + timedelta(weeks=SCHEDULE_INDEX_WEEKS))
+
+
+# Held while the in-memory views are moved to a new week, see ApiState.roll_views
+_views_lock = threading.Lock()
+
+
+# Streamed responses: a JSON document written as the items are read, or one JSON item per line
+STREAM_MIMETYPES = {"json": "application/json", "ndjson": "application/x-ndjson"}
+# Size, in characters, of the chunks written to the socket
+STREAM_CHUNK_SIZE = 1 << 16
+
+
+def stream_mode() -> str | None:
+    """Get the stream mode asked in the 'stream' request argument, None to build the whole response"""
+    mode = request.args.get("stream")
+    if mode is not None and mode not in STREAM_MIMETYPES:
+        abort(400, f"The stream mode must be one of {', '.join(STREAM_MIMETYPES)}")
+    return mode
+
+
+def json_array_parts(items: Iterable[Any]) -> Iterator[str]:
+    """Serialize the items as the parts of a JSON array"""
+    yield "["
+    for i, item in enumerate(items):
+        yield "," + dumps(item) if i else dumps(item)
+    yield "]"
+
+
+def ndjson_parts(items: Iterable[Any]) -> Iterator[str]:
+    """Serialize the items as JSON lines"""
+    for item in items:
+        yield dumps(item) + "\n"
+
+
+def join_chunks(parts: Iterable[str], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """Join small parts in chunks of at least chunk_size characters, except the last one"""
+    buffer, size = [], 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream_response(parts: Iterable[str], mode: str) -> Response:
+    """Stream the parts of a response as they are generated, keeping the request context alive"""
+    return Response(stream_with_context(join_chunks(parts)), mimetype=STREAM_MIMETYPES[mode])
+
+
+def config_hash(config: BaseDataclass) -> str:
+    """Short hash of the values of a configuration, to tell apart its versions"""
+    return hashlib.sha1(dumps(config.to_dict()).encode()).hexdigest()[:16]
+
+
+def conditional_get(etag: Callable[[], str | None]):
+    """
+    Answer the requests whose If-None-Match matches the current ETag of the resource with an empty 304,
+    without running the resource method. The other responses get the ETag header.
+    Goes above marshal_with, so unchanged resources are not built or marshalled.
+
+    :param etag: Computes the ETag of the requested resource, cheaply compared to building it.
+        None skips the check, for example for invalid requests.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            tag = etag()
+            if tag is None:
+                return method(*args, **kwargs)
+
+            if request.if_none_match.contains_weak(tag):
+                response = current_app.response_class(status=304)
+                response.set_etag(tag)
+                return response
+
+            result = method(*args, **kwargs)
+            if isinstance(result, Response):
+                result.set_etag(tag)
+                return result
+            return result, 200, {"ETag": quote_etag(tag)}
+        return wrapper
+    return decorator
 
 
 @dataclass
 class ApiState(BaseDataclass):
     turns_manager: MongoTurnsManager
     users_manager: MongoUsersManager
+    occupancy: OccupancyMap | None = None
+    # The business config is loaded once, its dict and hash are built once too
+    business_config: dict | None = None
+    business_hash: str | None = None
+    # The time range of the schedule index and the occupancy maps, None when they are not loaded
+    views_range: TimeRange | None = None
 
     @classmethod
-    def from_app_config(cls, app_config: AppConfig) -> 'ApiState':
+    def from_app_config(cls, app_config: AppConfig, lazy: bool | None = None) -> 'ApiState':
+        """
+        Build the managers of the API.
+
+        :param app_config: The app configuration
+        :param lazy: Skip the startup work: the indexes are created by the first write of each manager, the users
+            directory is loaded by the first read, and the schedule index and occupancy maps are not built, so the
+            queries go to the database. Nothing connects until the first query. Defaults to the lazy option of the
+            server config.
+        :return: The API state
+        """
+        if lazy is None:
+            lazy = (app_config.server or ServerConfig()).lazy
+
+        # The managers share the process-wide client, close it when the process exits.
+        atexit.unregister(close_mongo_clients)
+        atexit.register(close_mongo_clients)
+
+        turns_manager = MongoTurnsManager(app_config.mongo, business_slot_minutes(app_config.business))
+        users_manager = MongoUsersManager(app_config.mongo)
+        occupancy = None
+        views_range = None
+        if lazy:
+            users_manager.enable_directory(preload=False)
+            turns_manager.enable_week_cache()
+        else:
+            turns_manager.ensure_indexes()
+            users_manager.ensure_indexes()
+            users_manager.enable_directory()
+            turns_manager.enable_week_cache()
+            views_range = schedule_index_range()
+            turns_manager.load_schedule_index(views_range)
+            occupancy = load_occupancy(turns_manager, app_config.business, views_range)
+
         return cls(
-            turns_manager=MongoTurnsManager(app_config.mongo),
-            users_manager=MongoUsersManager(app_config.mongo)
+            turns_manager=turns_manager,
+            users_manager=users_manager,
+            occupancy=occupancy,
+            business_config=app_config.business.to_dict(),
+            business_hash=config_hash(app_config.business),
+            views_range=views_range
         )
 
+    def roll_views(self) -> None:
+        """
+        Move the schedule index and the occupancy maps to the weeks from the current one, once a new week starts.
+        Checked before every request, only the first request of the week loads the new views. The other
+        requests keep answering from the previous views meanwhile.
+        """
+        if self.views_range is None or self.views_range.start_time == schedule_index_range().start_time:
+            return
+
+        with _views_lock:
+            views_range = schedule_index_range()
+            if self.views_range.start_time == views_range.start_time:
+                return
+            self.turns_manager.load_schedule_index(views_range)
+            if self.occupancy is not None:
+                self.turns_manager.remove_week_view(self.occupancy)
+                self.occupancy = load_occupancy(self.turns_manager, self.occupancy.bc, views_range)
+            self.views_range = views_range
+
+    def close(self) -> None:
+        """Release the Mongo connections used by the managers"""
+        close_mongo_clients()
+
+
+def init_api_state(app: Flask, app_config: AppConfig) -> None:
+    """
+    Build the ApiState of the app in each process, before its first request.
+    Servers that fork workers after creating the app get one ApiState per worker, with its own connections,
+    caches and indexes, instead of the ones of the parent process.
+
+    :param app: The Flask app, the ApiState is kept in app.config["api_config"]
+    :param app_config: The app configuration
+    """
+    lock = threading.Lock()
+
+    def load_api_state() -> None:
+        if app.config.get("api_config_pid") != os.getpid():
+            with lock:
+                if app.config.get("api_config_pid") != os.getpid():
+                    app.config["api_config"] = ApiState.from_app_config(app_config)
+                    app.config["api_config_pid"] = os.getpid()
+        app.config["api_config"].roll_views()
+
+    app.before_request(load_api_state)
+
+
+def _week_cache_requests() -> dict[tuple[str, ...], float]:
+    api_state: ApiState | None = current_app.config.get("api_config")
+    if api_state is None or api_state.turns_manager.week_cache is None:
+        return {}
+    stats = api_state.turns_manager.week_cache.stats
+    return {("hit",): stats.hits, ("miss",): stats.misses}
+
+
+def _week_cache_hit_ratio() -> dict[tuple[str, ...], float]:
+    api_state: ApiState | None = current_app.config.get("api_config")
+    if api_state is None or api_state.turns_manager.week_cache is None:
+        return {}
+    return {(): api_state.turns_manager.week_cache.stats.hit_rate}
+
+
+_mongo_listener_registered = False
+
+
+def init_metrics(app: Flask) -> None:
+    """
+    Measure the latency of the requests of the app, the Mongo round trips and the dataclass conversions,
+    and serve them, with the week cache hit rates, on /metrics. Without it nothing is measured.
+    The metrics belong to the process, each worker of a multi-process server serves its own.
+    Must be called before the first Mongo client is created, the command listener only applies to new clients.
+
+    :param app: The Flask app, before the hooks that must be included in the request latency
+    """
+    global _mongo_listener_registered
+    if not _mongo_listener_registered:
+        monitoring.register(CommandMetricsListener())
+        _mongo_listener_registered = True
+    set_codec_observer(observe_codec)
+    METRICS.register(Gauge("turns_week_cache_requests", "Week requests answered from the cache, or not",
+                           _week_cache_requests, ("result",)))
+    METRICS.register(Gauge("turns_week_cache_hit_ratio", "Week requests answered from the cache over all of them",
+                           _week_cache_hit_ratio))
+    app.config["metrics_enabled"] = True
+
+    def start_timer() -> None:
+        g.request_start = time.perf_counter()
+
+    def observe_latency(response: Response) -> Response:
+        start = g.get("request_start")
+        if start is not None:
+            endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            REQUEST_DURATION.observe(time.perf_counter() - start,
+                                     (request.method, endpoint, str(response.status_code)))
+        return response
+
+    app.before_request(start_timer)
+    app.after_request(observe_latency)
+
 
 # pycharm_flask_debug_patch.py
 def restart_with_reloader_patch(self) -> int:
     """Spawn a new Python interpreter with the same arguments as the
     current one, but running the reloader thread.
     """
+    # noinspection PyProtectedMember
+    from werkzeug._reloader import _log, _get_args_for_reloading
+
     while True:
         _log("info", f" * Restarting with {self.name}")
         args = _get_args_for_reloading()
@@ -49,4 +299,5 @@ def restart_with_reloader_patch(self) -> int:
 
 # noinspection PyProtectedMember
 def update_werkzeug_reloader():
+    import werkzeug._reloader
     werkzeug._reloader.ReloaderLoop.restart_with_reloader = restart_with_reloader_patch
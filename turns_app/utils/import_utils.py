@@ -0,0 +1,73 @@
+import json
+import re
+from itertools import islice
+from pathlib import Path
+from typing import Any, Iterable, Iterator, TypeVar
+
+
+T = TypeVar('T')
+
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def iter_json_records(file_path: Path, chunk_size: int = 1 << 16, max_record_size: int = 1 << 20) -> Iterator[Any]:
+    """
+    Iterate over the records of a JSON array file or a JSON lines file.
+    The file is read in chunks, so only the current chunk and record are kept in memory.
+
+    :param file_path: The path to the file
+    :param chunk_size: The number of characters to read at once
+    :param max_record_size: The number of characters of a record that fails to decode, after which
+        the file is taken as invalid instead of reading more chunks
+    :return: An iterator over the decoded records
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, "r", encoding="utf-8") as f:
+        buffer = ""
+        pos = 0
+        eof = False
+        in_array = None
+
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos == len(buffer) and not eof:
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            if pos == len(buffer):
+                return
+
+            if in_array is None:
+                in_array = buffer[pos] == "["
+                if in_array:
+                    pos += 1
+                continue
+            if in_array and buffer[pos] == "]":
+                return
+
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof or len(buffer) - pos > max_record_size:
+                    raise
+                end = len(buffer)
+
+            # The record may continue in the next chunk
+            if end == len(buffer) and not eof:
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+
+            yield record
+            pos = end
+
+
+def batched(iterable: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Split an iterable in lists of at most `size` items"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -0,0 +1,64 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Any
+
+
+class IntervalIndex:
+    """
+    Sorted arrays of half-open [start, end) intervals with a value each.
+    The intervals are sorted by start, and the running maximum of their ends is sorted too,
+    so overlap queries are two binary searches. Intervals may overlap each other, as turns
+    stored before the slots index, the queries then skip the ones that end before the range.
+    """
+
+    def __init__(self):
+        self._starts: list[datetime] = []
+        self._ends: list[datetime] = []
+        self._max_ends: list[datetime] = []  # Latest end of the intervals up to each position
+        self._values: list[Any] = []
+
+    def _update_max_ends(self, position: int) -> None:
+        latest = self._max_ends[position - 1] if position else datetime.min
+        del self._max_ends[position:]
+        for end in self._ends[position:]:
+            latest = max(latest, end)
+            self._max_ends.append(latest)
+
+    def add(self, start: datetime, end: datetime, value: Any) -> None:
+        position = bisect_right(self._starts, start)
+        self._starts.insert(position, start)
+        self._ends.insert(position, end)
+        self._values.insert(position, value)
+        self._update_max_ends(position)
+
+    def _overlapping_positions(self, start: datetime, end: datetime) -> range:
+        """Positions of the intervals that may overlap [start, end), all of them do if the intervals do not overlap"""
+        return range(bisect_right(self._max_ends, start), bisect_left(self._starts, end))
+
+    def overlapping(self, start: datetime, end: datetime) -> list[Any]:
+        """Get the values of the intervals that overlap [start, end), in start order"""
+        return [self._values[i] for i in self._overlapping_positions(start, end) if self._ends[i] > start]
+
+    def first_overlapping(self, start: datetime, end: datetime) -> Any | None:
+        """Get the value of the first interval that overlaps [start, end), None if it is free"""
+        # The first interval whose running maximum end is after start ends after start itself
+        first = bisect_right(self._max_ends, start)
+        if first < len(self._starts) and self._starts[first] < end:
+            return self._values[first]
+        return None
+
+    def remove_overlapping(self, start: datetime, end: datetime) -> None:
+        """Remove the intervals that overlap [start, end)"""
+        positions = self._overlapping_positions(start, end)
+        if not positions:
+            return
+        kept = [i for i in positions if self._ends[i] <= start]
+        for values in (self._starts, self._ends, self._values):
+            values[positions.start:positions.stop] = [values[i] for i in kept]
+        self._update_max_ends(positions.start)
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        return self.first_overlapping(start, end) is None
+
+    def __len__(self) -> int:
+        return len(self._starts)
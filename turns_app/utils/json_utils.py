@@ -0,0 +1,118 @@
+import json
+from datetime import datetime, date
+from typing import Any, Protocol
+
+from flask import Flask, make_response, current_app
+from flask.json.provider import JSONProvider
+
+from turns_app.utils.dataclass_utils import BaseDataclass
+from turns_app.utils.time_utils import DATETIME_FORMAT, DATE_FORMAT
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_default(obj: Any) -> Any:
+    """Convert the objects that JSON does not support to JSON values"""
+    if isinstance(obj, datetime):
+        return obj.strftime(DATETIME_FORMAT)
+    if isinstance(obj, date):
+        return obj.strftime(DATE_FORMAT)
+    if isinstance(obj, BaseDataclass):
+        # Turns format their times as strings
+        to_str_dict = getattr(obj, "to_str_dict", None)
+        return to_str_dict() if to_str_dict is not None else obj.to_dict()
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+class JSONBackend(Protocol):
+    name: str
+
+    def dumps(self, obj: Any) -> str:
+        ...
+
+    def loads(self, s: str | bytes) -> Any:
+        ...
+
+
+class StdlibJSONBackend:
+    name = "json"
+
+    def __init__(self):
+        # A private encoder, the json module defaults are left alone
+        self.encoder = json.JSONEncoder(default=json_default, ensure_ascii=False, separators=(",", ":"))
+
+    def dumps(self, obj: Any) -> str:
+        return self.encoder.encode(obj)
+
+    def loads(self, s: str | bytes) -> Any:
+        return json.loads(s)
+
+
+class OrjsonJSONBackend:
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise RuntimeError("The orjson backend needs the orjson package")
+        # Datetimes and dataclasses go through json_default to keep the API formats
+        self.options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj: Any) -> str:
+        return orjson.dumps(obj, default=json_default, option=self.options).decode()
+
+    def loads(self, s: str | bytes) -> Any:
+        return orjson.loads(s)
+
+
+JSON_BACKENDS = {
+    StdlibJSONBackend.name: StdlibJSONBackend,
+    OrjsonJSONBackend.name: OrjsonJSONBackend,
+}
+
+
+def get_json_backend(name: str | None = None) -> JSONBackend:
+    """
+    Get a JSON backend by name.
+
+    :param name: The backend name, one of JSON_BACKENDS. The fastest installed one if None.
+    :return: The backend
+    """
+    if name is None:
+        name = OrjsonJSONBackend.name if orjson is not None else StdlibJSONBackend.name
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"Unknown JSON backend '{name}'. Options: {', '.join(JSON_BACKENDS)}")
+    return JSON_BACKENDS[name]()
+
+
+_default_backend = get_json_backend()
+
+
+def dumps(obj: Any) -> str:
+    """Serialize an object to JSON with the default backend"""
+    return _default_backend.dumps(obj)
+
+
+class TurnsJSONProvider(JSONProvider):
+    """Flask JSON provider that serializes with a pluggable backend.
+    Datetimes are formatted with DATETIME_FORMAT and the dataclasses of the model are serialized directly."""
+
+    def __init__(self, app: Flask, backend: JSONBackend | None = None):
+        super().__init__(app)
+        self.backend = backend if backend is not None else _default_backend
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self.backend.dumps(obj)
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return self.backend.loads(s)
+
+
+def output_json(data: Any, code: int, headers: dict | None = None):
+    """flask_restx representation that serializes the responses with the application JSON provider"""
+    response = make_response(current_app.json.dumps(data) + "\n", code)
+    response.headers.extend(headers or {})
+    response.mimetype = "application/json"
+    return response
@@ -0,0 +1,157 @@
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Iterator, TypeVar
+
+# Upper bounds, in seconds, of the latency histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels_text(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """The sample lines of the metric, one per label values"""
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield from self.samples()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = ()):
+        super().__init__(name, description, label_names)
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, labels: tuple[str, ...] = (), value: float = 1) -> None:
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self.values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels_text(self.label_names, labels)} {_number(value)}"
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: the count of each bucket, not cumulative, plus the +Inf one
+        self.counts: dict[tuple[str, ...], list[int]] = {}
+        self.sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, labels: tuple[str, ...] = ()) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self.counts.get(labels)
+            if counts is None:
+                counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+                self.sums[labels] = 0.0
+            counts[index] += 1
+            self.sums[labels] += value
+
+    def count(self, labels: tuple[str, ...] = ()) -> int:
+        with self._lock:
+            return sum(self.counts.get(labels, ()))
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = [(labels, list(counts), self.sums[labels]) for labels, counts in self.counts.items()]
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket_labels = _labels_text(self.label_names, labels, f'le="{le}"')
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_labels_text(self.label_names, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels_text(self.label_names, labels)} {cumulative}"
+
+
+class Gauge(Metric):
+    """Metric read when the metrics are rendered. The function returns the value of each label values."""
+    type = "gauge"
+
+    def __init__(self, name: str, description: str, function: Callable[[], dict[tuple[str, ...], float]],
+                 label_names: tuple[str, ...] = ()):
+        super().__init__(name, description, label_names)
+        self.function = function
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self.function().items():
+            yield f"{self.name}{_labels_text(self.label_names, labels)} {_number(value)}"
+
+
+MetricType = TypeVar("MetricType", bound=Metric)
+
+
+class MetricsRegistry:
+    """The metrics of a process, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: MetricType) -> MetricType:
+        """Add a metric. If one with the same name exists, it is kept and returned instead."""
+        with self._lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def get(self, name: str) -> Metric | None:
+        return self.metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+REQUEST_DURATION = METRICS.register(Histogram(
+    "http_request_duration_seconds", "Latency of the API requests", ("method", "endpoint", "status")))
+MONGO_COMMAND_DURATION = METRICS.register(Histogram(
+    "mongo_command_duration_seconds", "Duration of the Mongo round trips", ("command",)))
+MONGO_COMMAND_FAILURES = METRICS.register(Counter(
+    "mongo_command_failures_total", "Mongo commands that failed", ("command",)))
+DATACLASS_CODEC_DURATION = METRICS.register(Histogram(
+    "dataclass_codec_duration_seconds", "Time to build dataclasses from dicts and to convert them to dicts",
+    ("dataclass", "operation"), buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.01)))
+
+
+def observe_codec(cls: type, operation: str, seconds: float) -> None:
+    """Codec observer of dataclass_utils that records the (de)serialization times"""
+    DATACLASS_CODEC_DURATION.observe(seconds, (cls.__name__, operation))
@@ -1,24 +1,200 @@
-from turns_app.utils.time_utils import TimeRange
-
-
-def turns_in_range_query(time_range: TimeRange) -> dict:
-    query = {"$or": [
-        # End time between the range
-        {"$and": [
-            {"end_time": {"$gt": time_range.start_time}},
-            {"end_time": {"$lte": time_range.end_time}}
-        ]},
-
-        # Start time between the range
-        {"$and": [
-            {"start_time": {"$gte": time_range.start_time}},
-            {"start_time": {"$lt": time_range.end_time}}
-        ]},
-
-        # Starts before and ends after the range
-        {"$and": [
-            {"start_time": {"$lt": time_range.start_time}},
-            {"end_time": {"$gt": time_range.end_time}}
-        ]}
-    ]}
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable
+
+from pymongo import IndexModel, UpdateOne, monitoring
+from pymongo.collection import Collection
+
+from turns_app.utils.metrics_utils import MONGO_COMMAND_DURATION, MONGO_COMMAND_FAILURES
+from turns_app.utils.time_utils import TimeRange, DATE_FORMAT
+
+
+def turns_in_range_query(time_range: TimeRange, office_id: str | None = None, user_id: str | None = None) -> dict:
+    """
+    Query the turns that overlap the time range, optionally for a single office or user.
+    Two intervals overlap when each one starts before the other ends, which is a single
+    range predicate per field and can be answered with the turns indexes.
+
+    :param time_range: The time range to overlap
+    :param office_id: Only match the turns of this office
+    :param user_id: Only match the turns of this user
+    :return: The Mongo filter document
+    """
+    query = {}
+    if office_id is not None:
+        query["office_id"] = office_id
+    if user_id is not None:
+        query["user.id"] = user_id
+
+    query["end_time"] = {"$gt": time_range.start_time}
+    query["start_time"] = {"$lt": time_range.end_time}
     return query
+
+
+def conflict_query(time_range: TimeRange, office_id: str, user_id: str) -> dict:
+    """Query the turns of the office or of the user that overlap the time range.
+    Each branch of the $or is resolved with its own index."""
+    return {"$or": [
+        turns_in_range_query(time_range, office_id=office_id),
+        turns_in_range_query(time_range, user_id=user_id)
+    ]}
+
+
+def after_key_query(query: dict, start_time: datetime, idx: str) -> dict:
+    """Restrict a turns query to the turns after the (start_time, idx) key, in that sort order.
+    Pages that continue from the last key do not skip documents as offsets do, whatever the page number."""
+    return {**query, "$or": [
+        {"start_time": {"$gt": start_time}},
+        {"start_time": start_time, "idx": {"$gt": idx}}
+    ]}
+
+
+def encode_page_cursor(start_time: datetime, idx: str) -> str:
+    """Encode a (start_time, idx) key as an opaque URL safe string"""
+    key = json.dumps([start_time.isoformat(), idx], separators=(",", ":"))
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def decode_page_cursor(cursor: str) -> tuple[datetime, str]:
+    """
+    Decode a cursor made by encode_page_cursor.
+
+    :param cursor: The cursor string
+    :return: The (start_time, idx) key
+    :raises ValueError: If the cursor is not valid
+    """
+    try:
+        start_time, idx = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(start_time), str(idx)
+    except (binascii.Error, UnicodeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid page cursor '{cursor}'") from e
+
+
+class VersionCounters:
+    """Version counters of views of the data, kept in a collection so every API process sees the same versions.
+    A view changes when its counter is bumped, which is what the conditional GETs validate against."""
+
+    def __init__(self, collection: Collection):
+        self.collection = collection
+
+    def get(self, key: str) -> int:
+        document = self.collection.find_one({"_id": key}, {"version": 1})
+        return document["version"] if document else 0
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, int]:
+        """Get the versions of the keys, with a single round trip"""
+        versions = dict.fromkeys(keys, 0)
+        for document in self.collection.find({"_id": {"$in": list(versions)}}, {"version": 1}):
+            versions[document["_id"]] = document["version"]
+        return versions
+
+    def bump(self, keys: Iterable[str]) -> None:
+        """Increment the counters of the keys, with a single round trip"""
+        updates = [UpdateOne({"_id": key}, {"$inc": {"version": 1}}, upsert=True) for key in sorted(set(keys))]
+        if updates:
+            self.collection.bulk_write(updates, ordered=False)
+
+
+class AsyncVersionCounters:
+    """VersionCounters over an async (Motor) collection"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def get(self, key: str) -> int:
+        document = await self.collection.find_one({"_id": key}, {"version": 1})
+        return document["version"] if document else 0
+
+    async def bump(self, keys: Iterable[str]) -> None:
+        updates = [UpdateOne({"_id": key}, {"$inc": {"version": 1}}, upsert=True) for key in sorted(set(keys))]
+        if updates:
+            await self.collection.bulk_write(updates, ordered=False)
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Records the duration of the Mongo round trips, and the failed commands, in the metrics"""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        MONGO_COMMAND_DURATION.observe(event.duration_micros / 1_000_000, (event.command_name,))
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        MONGO_COMMAND_DURATION.observe(event.duration_micros / 1_000_000, (event.command_name,))
+        MONGO_COMMAND_FAILURES.inc((event.command_name,))
+
+
+def turns_by_day_pipeline(time_range: TimeRange, projection: dict[str, int]) -> list[dict]:
+    """Aggregation pipeline grouping the projected turns that overlap the time range by their start day.
+    The groups are identified by the day as a string in DATE_FORMAT.
+    Turns that start before the range are grouped in its first day."""
+    return [
+        {"$match": turns_in_range_query(time_range)},
+        {"$sort": {"start_time": 1}},
+        {"$project": projection},
+        {"$group": {
+            "_id": {"$dateToString": {"format": DATE_FORMAT,
+                                      "date": {"$max": ["$start_time", time_range.start_time]}}},
+            "turns": {"$push": "$$ROOT"}
+        }}
+    ]
+
+
+def winning_plan_stages(explain: dict) -> set[str]:
+    """Get all the stage names of the winning plan of an explain() output"""
+    winning_plan = explain["queryPlanner"]["winningPlan"]
+    # Queries run by the slot based engine nest the plan in a queryPlan key
+    winning_plan = winning_plan.get("queryPlan", winning_plan)
+
+    stages = set()
+    pending = [winning_plan]
+    while pending:
+        stage = pending.pop()
+        stages.add(stage["stage"])
+        if "inputStage" in stage:
+            pending.append(stage["inputStage"])
+        pending.extend(stage.get("inputStages", []))
+    return stages
+
+
+def index_name(index: IndexModel) -> str:
+    return index.document["name"]
+
+
+def ensure_indexes(collection: Collection, indexes: list[IndexModel]) -> list[str]:
+    """Create the declared indexes on the collection.
+    Mongo skips indexes that already exist with the same specification, so this is safe to call on every startup.
+
+    :param collection: The collection to index
+    :param indexes: The declared indexes
+    :return: The names of the declared indexes
+    """
+    if not indexes:
+        return []
+    return collection.create_indexes(indexes)
+
+
+@dataclass
+class IndexReport:
+    missing: list[str]     # Declared but not present in the collection
+    unused: list[str]      # Present but without any recorded access since the server started
+    undeclared: list[str]  # Present but not declared
+
+
+def index_report(collection: Collection, indexes: list[IndexModel]) -> IndexReport:
+    """Compare the declared indexes with the ones present in the collection"""
+    declared = {index_name(index) for index in indexes}
+    existing = set(collection.index_information()) - {"_id_"}
+
+    unused = [stats["name"] for stats in collection.aggregate([{"$indexStats": {}}])
+              if stats["name"] != "_id_" and stats["accesses"]["ops"] == 0]
+
+    return IndexReport(
+        missing=sorted(declared - existing),
+        unused=sorted(unused),
+        undeclared=sorted(existing - declared)
+    )
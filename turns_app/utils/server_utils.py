@@ -0,0 +1,42 @@
+from flask import Flask
+from werkzeug.serving import run_simple
+
+from turns_app.utils.config_utils import ServerConfig
+
+
+def gunicorn_options(server_config: ServerConfig) -> dict:
+    """Gunicorn settings for the server configuration"""
+    return {
+        "bind": f"{server_config.host}:{server_config.port}",
+        "workers": server_config.workers,
+        "threads": server_config.threads,
+        # Threads need the gthread worker, the sync worker serves one request at a time
+        "worker_class": "gthread" if server_config.threads > 1 else "sync",
+        "preload_app": server_config.preload,
+    }
+
+
+def serve(app: Flask, server_config: ServerConfig) -> None:
+    """
+    Serve the app with gunicorn, forking server_config.workers processes.
+    Gunicorn is an optional dependency, without it the app is served by werkzeug from a single process.
+
+    :param app: The Flask app. Its ApiState must be built per process, see init_api_state.
+    :param server_config: The server configuration
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("gunicorn is not installed, serving from a single process with werkzeug")
+        run_simple(server_config.host, server_config.port, app, threaded=server_config.threads > 1)
+        return
+
+    class TurnsApplication(BaseApplication):
+        def load_config(self):
+            for key, value in gunicorn_options(server_config).items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    TurnsApplication().run()
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 
 
 @dataclass
@@ -14,6 +14,19 @@ DATE_FORMAT = "%d.%m.%Y"
 DATETIME_FORMAT = f"{DATE_FORMAT}_{TIME_FORMAT}"
 
 
+def parse_datetime(value: str) -> datetime:
+    """Parse a datetime in DATETIME_FORMAT ("DD.MM.YYYY_HH.MM").
+    Slicing the fixed positions is several times faster than datetime.strptime, which still parses
+    the values without the leading zeros, as "1.02.2024_8.00"."""
+    if len(value) != 16 or value[2] != "." or value[5] != "." or value[10] != "_" or value[13] != ".":
+        return datetime.strptime(value, DATETIME_FORMAT)
+    # int() accepts signs and spaces, anything but ASCII digits is left to strptime
+    digits = value[0:2] + value[3:5] + value[6:10] + value[11:13] + value[14:16]
+    if not (digits.isascii() and digits.isdigit()):
+        return datetime.strptime(value, DATETIME_FORMAT)
+    return datetime(int(value[6:10]), int(value[3:5]), int(value[0:2]), int(value[11:13]), int(value[14:16]))
+
+
 def get_week_by_day(day: datetime) -> TimeRange:
     """Get the week of the given day, starting from Monday"""
     start_of_week = day - timedelta(days=day.weekday())
@@ -29,3 +42,16 @@ def days_in_range(time_range: TimeRange) -> list[Day]:
         days.append(current_day.strftime(DATE_FORMAT))
         current_day += timedelta(days=1)
     return days
+
+
+def weeks_in_range(time_range: TimeRange) -> list[date]:
+    """Get the first day of each week that overlaps the given time range"""
+    # The range does not include its end time
+    last_day = (time_range.end_time - timedelta(microseconds=1)).date()
+
+    weeks = []
+    current_week = time_range.start_time.date() - timedelta(days=time_range.start_time.weekday())
+    while current_week <= last_day:
+        weeks.append(current_week)
+        current_week += timedelta(days=7)
+    return weeks
@@ -0,0 +1,8 @@
+# WSGI entry point, for example: gunicorn --workers 4 --threads 8 --preload turns_app.wsgi:app
+import os
+from pathlib import Path
+
+from turns_app.api_service import create_app
+from turns_app.defaults import DEFAULT_CONFIG_PATH, CONFIG_PATH_ENV
+
+app = create_app(Path(os.environ.get(CONFIG_PATH_ENV, DEFAULT_CONFIG_PATH)))